@@ -0,0 +1,39 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Benchmark for the ramp solvers of input_parameters.ring_options
+"""
+
+import time as timing
+import numpy as np
+
+from blond.input_parameters.ring_options import RingOptions
+from blond.beam.beam import Proton
+
+circumference = 2*np.pi*100
+mass = Proton().mass
+time = np.linspace(0, 0.5, 20)
+momentum = 2e9 + 12e9*np.sin(np.linspace(0, 0.5*np.pi, 20))**2
+iterations = 3
+
+for interpolation in ['linear', 'cubic', 'akima', 'derivative']:
+    results = []
+    for ramp_solver in ['turn_by_turn', 'chunked']:
+        options = RingOptions(interpolation=interpolation,
+                              ramp_solver=ramp_solver)
+        t0 = timing.time()
+        for i in range(iterations):
+            result = options.preprocess(mass, circumference, time, momentum)
+        elapsed = (timing.time() - t0)/iterations
+        results.append(result)
+        print("%-10s %-12s %d turns, %.3f s" % (interpolation, ramp_solver,
+                                                len(result[0]), elapsed))
+    print("Identical results:",
+          all(np.array_equal(a, b) for a, b in zip(*results)))
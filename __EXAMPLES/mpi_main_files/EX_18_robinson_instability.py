@@ -25,7 +25,7 @@ from blond.input_parameters.rf_parameters import RFStation
 from blond.trackers.tracker import RingAndRFTracker, FullRingAndRF
 from blond.beam.beam import Beam, Proton
 from blond.beam.distributions import matched_from_distribution_function
-from blond.beam.profile import Profile, CutOptions
+from blond.beam.profile import Profile, CutOptions, OtherSlicesOptions
 from blond.impedances.impedance import InducedVoltageFreq, TotalInducedVoltage
 from blond.impedances.impedance_sources import Resonators
 from scipy.constants import c, e, m_p
@@ -104,8 +104,11 @@ bucket_length = 2.0 * np.pi / RF_sct_par.omega_rf[0,0]
 # DEFINE SLICES ---------------------------------------------------------------
 
 number_slices = 100
+# The reduction of the profile over the workers overlaps with the beam
+# statistics, see the tracking loop below
 slice_beam = Profile(beam, CutOptions(cut_left=0, 
-                    cut_right=bucket_length, n_slices=number_slices)) 
+                    cut_right=bucket_length, n_slices=number_slices),
+                    OtherSlicesOptions=OtherSlicesOptions(overlap_reduce=True))
                 
 # LOAD IMPEDANCE TABLES -------------------------------------------------------
 
@@ -169,8 +172,6 @@ matched_from_distribution_function(beam, full_tracker,
 
 # ACCELERATION MAP ------------------------------------------------------------
 
-map_ = [slice_beam] + [total_ind_volt] + [ring_RF_section]
-
 if worker.isMaster:
     # For testing purposes
     test_string = ''
@@ -187,14 +188,19 @@ bunch_center = np.zeros(n_turns)
 bunch_std = np.zeros(n_turns)
 
 beam.split()
+# The map is rotated to start with the RF tracking, so that the local beam
+# statistics are computed while the profile is reduced over the workers
+slice_beam.track()
+total_ind_volt.track()
 # TRACKING --------------------------------------------------------------------
 for i in range(n_turns):
     
     print(i)
-    for m in map_:
-        m.track()
-
+    ring_RF_section.track()
+    slice_beam.track()
     beam.statistics()
+    total_ind_volt.track()
+
     beam.gather_statistics()
     bunch_center[i] = beam.mean_dt
     
@@ -213,6 +219,7 @@ for i in range(n_turns):
         beam.split()
 
 beam.gather()
+worker.print_comm_timing()
 worker.finalize()
 print(time.time() - t0)
 
@@ -127,6 +127,10 @@ class Beam(object):
         total number of macroparticles.
     intensity : float
         total intensity of the beam (in number of charge).
+    compaction_threshold : float
+        fraction of lost macro-particles above which the losses methods
+        compact the beam (see compact_lost_particles); default is None (no
+        automatic compaction).
 
     Attributes
     ----------
@@ -154,6 +158,10 @@ class Beam(object):
         standard deviation of beam arrival time [s].
     sigma_dE : float
         standard deviation of beam energy offset [eV].
+    min_dt, max_dt : float
+        extent of the beam arrival times [s].
+    min_dE, max_dE : float
+        extent of the beam energy offsets [eV].
     intensity : float
         total intensity of the beam in number of charges [].
     n_macroparticles : int
@@ -164,6 +172,17 @@ class Beam(object):
         number of macro-particles marked as 'lost' [].
     id : numpy_array, int
         unique macro-particle ID number; zero if particle is 'lost'.
+    compaction_threshold : float
+        fraction of lost macro-particles above which the beam is compacted.
+    tracking_time : float
+        MPI only: kick and drift time of the worker since the last load
+        balancing [s].
+    tracked_particles : int
+        MPI only: number of macro-particles tracked (summed over the turns)
+        in tracking_time [].
+    balance_report : list
+        MPI only: load imbalance before and after each balancing and
+        number of macro-particles migrated, see balance().
 
     See Also
     ---------
@@ -188,7 +207,8 @@ class Beam(object):
     >>> my_beam = Beam(ring, n_macroparticle, intensity)
     """
 
-    def __init__(self, Ring, n_macroparticles, intensity):
+    def __init__(self, Ring, n_macroparticles, intensity,
+                 compaction_threshold=None):
 
         self.Particle = Ring.Particle
         self.beta = Ring.beta[0][0]
@@ -201,16 +221,32 @@ class Beam(object):
         self.mean_dE = 0.
         self.sigma_dt = 0.
         self.sigma_dE = 0.
+        self.min_dt = 0.
+        self.max_dt = 0.
+        self.min_dE = 0.
+        self.max_dE = 0.
         self.intensity = float(intensity)
         self.n_macroparticles = int(n_macroparticles)
         self.ratio = self.intensity/self.n_macroparticles
         self.id = np.arange(1, self.n_macroparticles + 1, dtype=int)
+        if compaction_threshold is not None and \
+                not 0 <= compaction_threshold < 1:
+            #InputDataError
+            raise RuntimeError("ERROR in Beam: compaction_threshold should " +
+                               "be in [0, 1)!")
+        self.compaction_threshold = compaction_threshold
+        # Lost macro-particles removed from the arrays by the compaction
+        self._n_compacted = 0
         # For MPI
         self.n_total_macroparticles_lost = 0
         self.n_total_macroparticles = n_macroparticles
         self.is_splitted = False
-        self._sumsq_dt = 0.
-        self._sumsq_dE = 0.
+        self.tracking_time = 0.
+        self.tracked_particles = 0
+        self.balance_report = []
+        # Partial statistics of the last call to statistics(), see
+        # bm.beam_statistics
+        self._statistics = np.zeros(9)
 
     @property
     def n_macroparticles_lost(self):
@@ -223,7 +259,7 @@ class Beam(object):
 
         '''
 
-        return len(np.where(self.id == 0)[0])
+        return self._n_compacted + len(np.where(self.id == 0)[0])
 
     @property
     def n_macroparticles_alive(self):
@@ -236,7 +272,44 @@ class Beam(object):
 
         '''
 
-        return self.n_macroparticles - self.n_macroparticles_lost
+        return self.n_macroparticles - len(np.where(self.id == 0)[0])
+
+    def compact_lost_particles(self):
+        """Move the particles that are not lost to the front of the beam
+        coordinate arrays, in place and keeping their ids; dt, dE and id
+        become views of their first n_macroparticles_alive elements, so that
+        only these particles are tracked from then on. Contrary to
+        eliminate_lost_particles, nothing is reallocated and the compacted
+        particles are still counted in n_macroparticles_lost.
+        """
+
+        if self.id.dtype != np.int_:
+            self.id = self.id.astype(np.int_)
+
+        n_alive = bm.compact_particles(self.dt, self.dE, self.id)
+        if n_alive == 0:
+            #AllParticlesLost
+            raise RuntimeError("ERROR in Beams: all particles lost and" +
+                               " eliminated!")
+
+        self._n_compacted += len(self.id) - n_alive
+        self.dt = self.dt[:n_alive]
+        self.dE = self.dE[:n_alive]
+        self.id = self.id[:n_alive]
+        self.n_macroparticles = n_alive
+
+    def _apply_compaction_policy(self):
+        """Compact the beam if the fraction of lost particles in the arrays
+        exceeds compaction_threshold (and some particles are alive).
+        """
+
+        if self.compaction_threshold is None:
+            return
+
+        n_lost = len(self.id) - np.count_nonzero(self.id)
+        if 0 < n_lost < len(self.id) and \
+                n_lost > self.compaction_threshold * len(self.id):
+            self.compact_lost_particles()
 
     def eliminate_lost_particles(self):
         """Eliminate lost particles from the beam coordinate arrays
@@ -250,6 +323,7 @@ class Beam(object):
                 self.dE[indexalive], dtype=bm.precision.real_t)
             self.n_macroparticles = len(self.dt)
             self.id = np.arange(1, self.n_macroparticles + 1, dtype=int)
+            self._n_compacted = 0
         else:
             # AllParticlesLost
             raise RuntimeError("ERROR in Beams: all particles lost and" +
@@ -257,31 +331,51 @@ class Beam(object):
 
     def statistics(self):
         '''
-        Calculation of the mean and standard deviation of beam coordinates,
-        as well as beam emittance using different definitions.
+        Calculation of the mean, standard deviation and extent of beam
+        coordinates, as well as beam emittance using different definitions.
         Take no arguments, statistics stored in
 
         - mean_dt
         - mean_dE
         - sigma_dt
         - sigma_dE
+        - min_dt, max_dt
+        - min_dE, max_dE
+
+        The particles flagged as lost are masked in a single pass over the
+        coordinates (bm.beam_statistics), in double precision.
         '''
 
         # Statistics only for particles that are not flagged as lost
-        itemindex = np.where(self.id != 0)[0]
-        # itemindex = bm.where(self.id, 0)
-        self.mean_dt = bm.mean(self.dt[itemindex])
-        self.sigma_dt = bm.std(self.dt[itemindex])
-        self._sumsq_dt = np.dot(self.dt[itemindex], self.dt[itemindex])
-        # self.min_dt = np.min(self.dt[itemindex])
-        # self.max_dt = np.max(self.dt[itemindex])
+        bm.beam_statistics(self.dt, self.dE, self.id,
+                           result=self._statistics)
+        self._set_statistics(self._statistics.reshape(1, -1))
 
-        self.mean_dE = bm.mean(self.dE[itemindex])
-        self.sigma_dE = bm.std(self.dE[itemindex])
-        self._sumsq_dE = np.dot(self.dE[itemindex], self.dE[itemindex])
+    def _set_statistics(self, partials):
+        '''
+        Statistics of the beam from the partial statistics of one or several
+        parts of the beam (one row of bm.beam_statistics per part), combined
+        exactly with the parallel variance algorithm.
+        '''
 
-        # self.min_dE = np.min(self.dE[itemindex])
-        # self.max_dE = np.max(self.dE[itemindex])
+        partials = partials[partials[:, 0] > 0]
+        n_alive = np.sum(partials[:, 0])
+
+        statistics = []
+        for column in [1, 5]:
+            if n_alive == 0:
+                statistics += [np.nan] * 4
+                continue
+            mean = np.sum(partials[:, 0] * partials[:, column]) / n_alive
+            sumsq = np.sum(partials[:, column+1] + partials[:, 0] *
+                           (partials[:, column] - mean)**2)
+            statistics += [mean, np.sqrt(sumsq / n_alive),
+                           np.min(partials[:, column+2]),
+                           np.max(partials[:, column+3])]
+
+        self.mean_dt, self.sigma_dt, self.min_dt, self.max_dt, \
+            self.mean_dE, self.sigma_dE, self.min_dE, self.max_dE = \
+            [float(value) for value in statistics]
 
         # R.m.s. emittance in Gaussian approximation
         self.epsn_rms_l = np.pi*self.sigma_dE*self.sigma_dt  # in eVs
@@ -304,6 +398,7 @@ class Beam(object):
 
         if itemindex.size != 0:
             self.id[itemindex] = 0
+            self._apply_compaction_policy()
 
     def losses_longitudinal_cut(self, dt_min, dt_max):
         '''Beam losses based on longitudinal cuts.
@@ -323,6 +418,7 @@ class Beam(object):
 
         if itemindex.size != 0:
             self.id[itemindex] = 0
+            self._apply_compaction_policy()
 
     def losses_energy_cut(self, dE_min, dE_max):
         '''Beam losses based on energy cuts, e.g. on collimators.
@@ -341,6 +437,7 @@ class Beam(object):
 
         if itemindex.size != 0:
             self.id[itemindex] = 0
+            self._apply_compaction_policy()
 
     def losses_below_energy(self, dE_min):
         '''Beam losses based on lower energy cut.
@@ -357,6 +454,7 @@ class Beam(object):
 
         if itemindex.size != 0:
             self.id[itemindex] = 0
+            self._apply_compaction_policy()
 
     def add_particles(self, new_particles):
         '''
@@ -381,9 +479,11 @@ class Beam(object):
 
         nNew = len(newdt)
 
-        self.id = np.concatenate((self.id, np.arange(self.n_macroparticles + 1,
-                                                     self.n_macroparticles
-                                                     + nNew + 1, dtype=int)))
+        # The ids of the compacted particles are not reused
+        last_id = self.n_macroparticles + self._n_compacted
+        self.id = np.concatenate((self.id, np.arange(last_id + 1,
+                                                     last_id + nNew + 1,
+                                                     dtype=int)))
         self.n_macroparticles += nNew
 
         self.dt = np.concatenate((self.dt, newdt))
@@ -406,7 +506,7 @@ class Beam(object):
         self.dt = np.concatenate((self.dt, other_beam.dt))
         self.dE = np.concatenate((self.dE, other_beam.dE))
 
-        counter = itl.count(self.n_macroparticles + 1)
+        counter = itl.count(self.n_macroparticles + self._n_compacted + 1)
         newids = np.zeros(other_beam.n_macroparticles)
 
         for i in range(other_beam.n_macroparticles):
@@ -456,7 +556,7 @@ class Beam(object):
             raise RuntimeError(
                 'ERROR: Cannot use this routine unless in MPI Mode')
 
-        from ..utils.mpi_config import worker
+        worker = bm.get_worker()
         if worker.isMaster and random:
             import random
             random.shuffle(self.id)
@@ -474,6 +574,10 @@ class Beam(object):
 
         assert (len(self.dt) == len(self.dE) and len(self.dt) == len(self.id))
 
+        # The compacted particles are counted by the master only
+        if not worker.isMaster:
+            self._n_compacted = 0
+
         self.n_macroparticles = len(self.dt)
         self.is_splitted = True
 
@@ -490,18 +594,22 @@ class Beam(object):
         if not bm.mpiMode():
             raise RuntimeError(
                 'ERROR: Cannot use this routine unless in MPI Mode')
-        from ..utils.mpi_config import worker
+        worker = bm.get_worker()
 
         if all:
             self.dt = worker.allgather(self.dt)
             self.dE = worker.allgather(self.dE)
             self.id = worker.allgather(self.id)
+            self._n_compacted = int(np.sum(
+                worker.allgather(np.array([self._n_compacted]))))
             self.is_splitted = False
         else:
             self.dt = worker.gather(self.dt)
             self.dE = worker.gather(self.dE)
             self.id = worker.gather(self.id)
+            n_compacted = worker.gather(np.array([self._n_compacted]))
             if worker.isMaster:
+                self._n_compacted = int(np.sum(n_compacted))
                 self.is_splitted = False
 
         self.n_macroparticles = len(self.dt)
@@ -520,77 +628,20 @@ class Beam(object):
             raise RuntimeError(
                 'ERROR: Cannot use this routine unless in MPI Mode')
 
-        from ..utils.mpi_config import worker
-        if all:
-
-            self.mean_dt = worker.allreduce(
-                np.array([self.mean_dt]), operator='mean')[0]
-
-            self.mean_dE = worker.allreduce(
-                np.array([self.mean_dE]), operator='mean')[0]
-
-            self.n_total_macroparticles_lost = worker.allreduce(
-                np.array([self.n_macroparticles_lost]), operator='sum')[0]
-
-            # self.n_total_macroparticles_alive = worker.allreduce(
-            # np.array([self.n_macroparticles_alive]), operator='sum')[0]
-
-            self.sigma_dt = worker.allreduce(
-                np.array([self._sumsq_dt]), operator='sum')[0]
-            self.sigma_dt = np.sqrt(
-                self.sigma_dt/(self.n_total_macroparticles -
-                               self.n_total_macroparticles_lost)
-                - self.mean_dt**2)
-
-            self.sigma_dE = worker.allreduce(
-                np.array([self._sumsq_dE]), operator='sum')[0]
-            self.sigma_dE = np.sqrt(
-                self.sigma_dE/(self.n_total_macroparticles -
-                               self.n_total_macroparticles_lost)
-                - self.mean_dE**2)
-
-            # self.sigma_dt = worker.allreduce(
-            #     np.array([self.mean_dt, self.sigma_dt, self.n_macroparticles_alive]),
-            #     operator='std')[0]
-
-            # self.sigma_dE = worker.allreduce(
-            #     np.array([self.mean_dE, self.sigma_dE,
-            #               self.n_macroparticles_alive]),
-            #     operator='std')[0]
+        worker = bm.get_worker()
 
+        # The partial statistics of the workers (from statistics()) are
+        # gathered in a single call and combined exactly
+        if all:
+            partials = worker.allgather(self._statistics)
         else:
-            self.mean_dt = worker.reduce(
-                np.array([self.mean_dt]), operator='mean')[0]
-
-            self.mean_dE = worker.reduce(
-                np.array([self.mean_dE]), operator='mean')[0]
-
-            self.n_total_macroparticles_lost = worker.reduce(
-                np.array([self.n_macroparticles_lost]), operator='sum')[0]
-
-            self.sigma_dt = worker.reduce(
-                np.array([self._sumsq_dt]), operator='sum')[0]
-            self.sigma_dt = np.sqrt(
-                self.sigma_dt/(self.n_total_macroparticles -
-                               self.n_total_macroparticles_lost)
-                - self.mean_dt**2)
-
-            self.sigma_dE = worker.reduce(
-                np.array([self._sumsq_dE]), operator='sum')[0]
-            self.sigma_dE = np.sqrt(
-                self.sigma_dE/(self.n_total_macroparticles -
-                               self.n_total_macroparticles_lost)
-                - self.mean_dE**2)
-
-            # self.sigma_dt = worker.reduce(
-            #     np.array([self.mean_dt, self.sigma_dt,
-            #               self.n_macroparticles_alive]),
-            #     operator='std')[0]
-
-            # self.sigma_dE = worker.reduce(
-            #     np.array([self.mean_dE, self.sigma_dE,
-            #               self.n_macroparticles_alive]),
-            #     operator='std')[0]
+            partials = worker.gather(self._statistics)
+
+        if all or worker.isMaster:
+            partials = partials.reshape(-1, len(self._statistics))
+            self._set_statistics(partials)
+            self.n_total_macroparticles_lost = int(
+                self.n_total_macroparticles - np.sum(partials[:, 0]))
 
     def gather_losses(self, all=False):
         '''
@@ -606,7 +657,7 @@ class Beam(object):
             raise RuntimeError(
                 'ERROR: Cannot use this routine unless in MPI Mode')
 
-        from ..utils.mpi_config import worker
+        worker = bm.get_worker()
 
         if all:
             temp = worker.allgather(np.array([self.n_macroparticles_lost]))
@@ -614,3 +665,94 @@ class Beam(object):
         else:
             temp = worker.gather(np.array([self.n_macroparticles_lost]))
             self.n_total_macroparticles_lost = np.sum(temp)
+
+    def balance(self, tolerance=0.05):
+        '''
+        MPI ONLY ROUTINE: Migrate macro-particles between the workers to
+        balance their kick and drift times, e.g. every few hundred turns.
+        The lost macro-particles are first removed from the arrays (they are
+        still counted in n_macroparticles_lost but, as with
+        compact_lost_particles, no longer tracked nor sliced), then the alive
+        ones are shared in proportion to the speed of each worker, measured
+        as the number of macro-particles tracked per second of kick and drift
+        since the last balancing. The global order of the macro-particles is
+        kept.
+
+        Parameters
+        ----------
+        tolerance : float
+            The macro-particles are only migrated if the load imbalance
+            (maximum over mean kick and drift time of the workers) exceeds
+            1 + tolerance
+
+        Returns
+        -------
+        list
+            Load imbalance before and after the balancing (predicted from
+            the speeds) and number of macro-particles migrated; also
+            appended to balance_report
+        '''
+        if not bm.mpiMode():
+            raise RuntimeError(
+                'ERROR: Cannot use this routine unless in MPI Mode')
+
+        worker = bm.get_worker()
+
+        alive = self.id != 0
+        n_lost = len(self.id) - np.count_nonzero(alive)
+        if n_lost > 0:
+            self._n_compacted += n_lost
+            self.dt = self.dt[alive]
+            self.dE = self.dE[alive]
+            self.id = self.id[alive]
+
+        load = worker.allgather(np.array(
+            [len(self.dt), self.tracked_particles, self.tracking_time],
+            dtype=float)).reshape(-1, 3)
+        n_alive, tracked_particles, tracking_time = load.T
+
+        # Macro-particles per second; equal speeds if not measured yet
+        if np.all(tracking_time > 0) and np.all(tracked_particles > 0):
+            speed = tracked_particles / tracking_time
+        else:
+            speed = np.ones(worker.workers)
+
+        # Shares of the alive macro-particles proportional to the speeds,
+        # the remainder going to the largest fractional parts
+        share = np.sum(n_alive) * speed / np.sum(speed)
+        counts = np.floor(share).astype(int)
+        remainder = int(np.sum(n_alive)) - np.sum(counts)
+        counts[np.argsort(counts - share)[:remainder]] += 1
+
+        imbalance_before = _load_imbalance(n_alive / speed)
+        imbalance_after = _load_imbalance(counts / speed)
+
+        if imbalance_before > 1 + tolerance:
+            self.dt = worker.redistribute(self.dt, counts)
+            self.dE = worker.redistribute(self.dE, counts)
+            self.id = worker.redistribute(self.id, counts)
+            # Macro-particles not kept by their worker
+            old_edges = np.append([0], np.cumsum(n_alive))
+            new_edges = np.append([0], np.cumsum(counts))
+            n_migrated = int(np.sum(n_alive) - np.sum(np.maximum(
+                np.minimum(old_edges[1:], new_edges[1:]) -
+                np.maximum(old_edges[:-1], new_edges[:-1]), 0)))
+        else:
+            imbalance_after = imbalance_before
+            n_migrated = 0
+
+        self.n_macroparticles = len(self.dt)
+        self.tracking_time = 0.
+        self.tracked_particles = 0
+
+        report = [imbalance_before, imbalance_after, n_migrated]
+        self.balance_report.append(report)
+        worker.logger.info('balance: imbalance {:.3f} -> {:.3f}, {} '
+                           'macro-particles migrated'.format(*report))
+        return report
+
+
+def _load_imbalance(times):
+    # Maximum over mean time of the workers; 1 if balanced or idle
+    mean_time = np.mean(times)
+    return float(np.max(times) / mean_time) if mean_time > 0 else 1.
@@ -26,7 +26,8 @@ import matplotlib.pyplot as plt
 from scipy.integrate import cumtrapz
 from ..trackers.utilities import is_in_separatrix
 from ..beam.profile import Profile, CutOptions
-from ..trackers.utilities import potential_well_cut, minmax_location
+from ..trackers.utilities import potential_well_cut, minmax_location,\
+    action_integrals
 from ..utils import bmath as bm
 
 def matched_from_line_density(beam, full_ring_and_RF, line_density_input=None,
@@ -450,7 +451,6 @@ def matched_from_distribution_function(beam, full_ring_and_RF,
         induced_voltage_object = copy.deepcopy(TotalInducedVoltage)
         profile = induced_voltage_object.profile
         
-    dE_trajectory = np.zeros(n_points_potential)
     for i in range(n_iterations):    
         old_potential = copy.deepcopy(total_potential)
         
@@ -492,43 +492,11 @@ def matched_from_distribution_function(beam, full_ring_and_RF,
         potential_well_grid = np.meshgrid(potential_well_low_res,
                                           potential_well_low_res)[0]
         
-        # Computing the action J by integrating the dE trajectories
-        J_array_dE0 = np.zeros(n_points_grid)
-        
-        full_ring_and_RF2 = copy.deepcopy(full_ring_and_RF)
-        for j in range(n_points_grid):
-            # Find left and right time coordinates for a given hamiltonian 
-            # value
-            time_indexes = np.where(potential_well_low_res <= 
-                                    potential_well_low_res[j])[0]
-            left_time = time_potential_low_res[np.max((0,time_indexes[0]))]
-            right_time = time_potential_low_res[np.min((time_indexes[-1],
-                                                        n_points_grid-1))]
-            # Potential well calculation with high resolution in that frame
-            time_potential_high_res = np.linspace(float(left_time), float(right_time),
-                                                  n_points_potential)
-            full_ring_and_RF2.potential_well_generation(
-                                     n_points=n_points_potential,
-                                     time_array=time_potential_high_res,
-                                     main_harmonic_option=main_harmonic_option)
-            pot_well_high_res = full_ring_and_RF2.potential_well
-            
-            if TotalInducedVoltage is not None and i != 0:
-                induced_potential_hires = np.interp(time_potential_high_res,
-                                           time_potential, induced_potential +
-                                           extra_potential, left=0, right=0)
-                pot_well_high_res += induced_potential_hires
-                pot_well_high_res -= pot_well_high_res.min()
-            
-            # Integration to calculate action
-            dE_trajectory[pot_well_high_res <= potential_well_low_res[j]] = \
-                np.sqrt((potential_well_low_res[j] - 
-                pot_well_high_res[pot_well_high_res <= 
-                potential_well_low_res[j]]) / eom_factor_dE)
-            dE_trajectory[pot_well_high_res > potential_well_low_res[j]] = 0
-            
-            J_array_dE0[j] = 1 / np.pi * np.trapz(dE_trajectory,
-                    dx=time_potential_high_res[1] - time_potential_high_res[0])
+        # Computing the action J by integrating the dE trajectories of all
+        # the hamiltonian levels at once, in the potential well with high
+        # resolution
+        J_array_dE0 = action_integrals(time_potential_sep, potential_well_sep,
+                                       potential_well_low_res, eom_factor_dE)
             
         # Sorting the H and J functions to be able to interpolate J(H)
         H_array_dE0 = potential_well_low_res
@@ -612,8 +580,6 @@ def matched_from_distribution_function(beam, full_ring_and_RF,
             induced_potential = np.interp(time_potential,
                              time_potential_low_res, induced_potential_low_res,
                              left=0, right=0)
-        del full_ring_and_RF2
-        gc.collect()            
     # Populating the bunch
     populate_bunch(beam, time_grid, deltaE_grid, density_grid, 
                    time_resolution_low, deltaE_coord_array[1] -
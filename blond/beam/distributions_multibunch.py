@@ -12,6 +12,7 @@ import matplotlib.pyplot as plt
 from scipy.integrate import cumtrapz
 import gc
 from ..utils import bmath as bm
+from ..trackers.utilities import action_integrals
 
 from ..beam.beam import Beam
 from ..beam.distributions import matched_from_distribution_function,\
@@ -730,10 +731,8 @@ def compute_X_grid(normalization_DeltaE, time_array, potential_well,
     H_grid = normalization_DeltaE * deltaE_grid**2 + potential_well_grid
 
     # Compute the action J
-    J_array = np.zeros(shape=potential_well.shape, dtype=float)
-    for i in range(len(J_array)):
-        DELTA = np.sqrt((potential_well[i]-potential_well)[potential_well <= potential_well[i]]/normalization_DeltaE)
-        J_array[i] = 1./np.pi*np.trapz(DELTA, dx=time_array[1]-time_array[0])
+    J_array = action_integrals(time_array, potential_well, potential_well,
+                               normalization_DeltaE)
 
     # Compute J grid
     sorted_H = potential_well[potential_well.argsort()]
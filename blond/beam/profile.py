@@ -269,22 +269,147 @@ class OtherSlicesOptions(object):
         If set True, the profile is calculated when the Profile class below
         is created. If False the user has to manually track the Profile object
         in the main file after its creation
+    histogram_strategy : str
+        Strategy of the (non smooth) histogram, see HistogramWorkspace below
+    overlap_reduce : boolean
+        If set True, in MPI mode the reduction of the histogram over the
+        workers is only started by the slicing (non-blocking), and completed
+        when the histogram is first used; the local work done in between,
+        e.g. Beam.statistics, overlaps with the communication
+    reduce_every : int
+        In MPI mode, the histogram is reduced exactly over the workers only
+        every reduce_every slicings (default 1, always); in between, the
+        local histogram of each worker is scaled by the ratio of the total
+        to the local number of alive macro-particles (see
+        Profile.scale_histo), which requires the beam to be split randomly
+        (Beam.split(random=True)). The error of the scaled
+        histogram is measured at each exact reduction, see
+        Profile.reduce_error
 
     Attributes
     ----------
 
     smooth : boolean
     direct_slicing : boolean
+    histogram_strategy : str
+    overlap_reduce : boolean
+    reduce_every : int
 
     """
 
-    def __init__(self, smooth=False, direct_slicing=False):
+    def __init__(self, smooth=False, direct_slicing=False,
+                 histogram_strategy='auto', overlap_reduce=False,
+                 reduce_every=1):
         """
         Constructor
         """
 
         self.smooth = smooth
         self.direct_slicing = direct_slicing
+        self.histogram_strategy = histogram_strategy
+        self.overlap_reduce = overlap_reduce
+
+        if int(reduce_every) != reduce_every or reduce_every < 1:
+            # ReduceError
+            raise RuntimeError("ERROR in OtherSlicesOptions: reduce_every " +
+                               "should be a positive integer!")
+        self.reduce_every = int(reduce_every)
+
+
+class HistogramWorkspace(object):
+    """
+    This class holds the work arrays of the histogram of the Profile class
+    below, allocated once and reused turn after turn, and chooses how the
+    histogram is computed with several threads.
+
+    Parameters
+    ----------
+
+    strategy : str
+        'private' for one sub-histogram per thread, reduced at the end,
+        'atomic' for atomic additions to a single histogram, 'sort' for a
+        sort of the bin indices, or 'auto' (default) to choose from the
+        number of threads, slices and particles
+
+    Attributes
+    ----------
+
+    strategy_input : str
+        Strategy requested
+    strategy : str
+        Strategy used by the last call of slice
+
+    """
+
+    def __init__(self, strategy='auto'):
+        """
+        Constructor
+        """
+
+        if strategy not in ['auto', 'private', 'atomic', 'sort']:
+            # StrategyError
+            raise RuntimeError("ERROR in HistogramWorkspace: strategy " +
+                               "should be 'auto', 'private', 'atomic' or " +
+                               "'sort'")
+
+        self.strategy_input = strategy
+        self.strategy = None
+
+        self._sub_histograms = None
+        self._bins = None
+
+    def choose_strategy(self, n_slices, n_macroparticles, n_threads):
+        """
+        Strategy used for n_slices, n_macroparticles and n_threads. The
+        sub-histograms are used as long as their reduction costs less than
+        the binning; for more slices than particles the bin indices are
+        sorted, otherwise atomic additions are used.
+        """
+
+        if self.strategy_input != 'auto':
+            return self.strategy_input
+
+        if n_threads == 1 or n_threads * n_slices <= n_macroparticles:
+            return 'private'
+        elif n_slices >= n_macroparticles:
+            return 'sort'
+        else:
+            return 'atomic'
+
+    def slice(self, dt, profile, cut_left, cut_right):
+        """
+        Histogram of dt between cut_left and cut_right, in profile.
+        """
+
+        n_threads = bm.histogram_max_threads()
+        self.strategy = self.choose_strategy(len(profile), len(dt), n_threads)
+
+        sub_histograms = None
+        bins = None
+        if self.strategy in ['private', 'atomic']:
+            sub_histograms = self.sub_histograms(len(profile))
+        elif self.strategy == 'sort':
+            if self._bins is None or len(self._bins) < len(dt):
+                self._bins = np.empty(len(dt), dtype=np.int32)
+            bins = self._bins
+
+        bm.slice_workspace(dt, profile, cut_left, cut_right, self.strategy,
+                           sub_histograms=sub_histograms, bins=bins)
+
+    def sub_histograms(self, n_slices):
+        """
+        Work array of one double precision sub-histogram of n_slices per
+        thread, reused as long as the number of slices and of threads do not
+        change (also used by the fused tracking with slicing).
+        """
+
+        size = bm.histogram_max_threads() * n_slices
+        if (self._sub_histograms is None
+                or len(self._sub_histograms) != size
+                or self._sub_histograms.dtype != np.float64):
+            self._sub_histograms = np.empty(size, dtype=np.float64)
+
+        return self._sub_histograms
 
 
 class Profile(object):
@@ -328,7 +453,12 @@ class Profile(object):
         lenght of one bin (or slice)
     n_macroparticles : float array
         contains the histogram (or profile); its elements are real if the
-        smooth histogram tracking is used
+        smooth histogram tracking is used. In MPI mode with overlap_reduce,
+        reading it completes the pending reduction over the workers
+    reduce_error : list
+        in MPI mode with reduce_every > 1, the relative r.m.s. error of the
+        local histogram scaled by its share of the alive macro-particles
+        with respect to the exactly reduced one, at each exact reduction
     beam_spectrum : float array
         contains the spectrum of the beam (arb. units)
     beam_spectrum_freq : float array
@@ -336,6 +466,8 @@ class Profile(object):
     operations : list
         contains all the methods to be called every turn, like slice track,
         fitting, filtering etc.
+    histogram_workspace : object
+        work arrays and strategy of the histogram (see HistogramWorkspace)
     bunchPosition : float
         profile position [s]
     bunchLength : float
@@ -385,6 +517,23 @@ class Profile(object):
         # Get all computed parameters from CutOptions
         self.set_slices_parameters()
 
+        # Pending non-blocking reduction of the histogram (MPI mode) and its
+        # buffer, reused over the turns
+        self.overlap_reduce = OtherSlicesOptions.overlap_reduce
+        self._reduction = None
+        self._reduce_buffer = None
+
+        # Approximate reduction (MPI mode): number of slicings done, local
+        # scaled histogram of the last exact reduction and its errors
+        self.reduce_every = OtherSlicesOptions.reduce_every
+        self._n_slicings = 0
+        self._scaled_histogram = None
+        self.reduce_error = []
+        # Ratio of the total to the local number of alive macro-particles,
+        # updated at each exact reduction and after each Beam.balance
+        self._histo_scale = None
+        self._n_balances = None
+
         # Initialize profile array as zero array
         self.n_macroparticles = np.zeros(self.n_slices, dtype=bm.precision.real_t, order='C')
 
@@ -392,6 +541,13 @@ class Profile(object):
         self.beam_spectrum = np.array([], dtype=bm.precision.real_t, order='C')
         self.beam_spectrum_freq = np.array([], dtype=bm.precision.real_t, order='C')
 
+        # Beam spectrum arrays reused over the turns, one per FFT size
+        self._beam_spectrum_buffers = {}
+
+        # Work arrays of the histogram reused over the turns
+        self.histogram_workspace = HistogramWorkspace(
+            OtherSlicesOptions.histogram_strategy)
+
         if OtherSlicesOptions.smooth:
             self.operations = [self._slice_smooth]
         else:
@@ -420,6 +576,18 @@ class Profile(object):
             self.edges, self.bin_centers, self.bin_size = \
             self.cut_options.get_slices_parameters()
 
+    @property
+    def n_macroparticles(self):
+        if self._reduction is not None:
+            self.reduce_histo_wait()
+        return self._n_macroparticles
+
+    @n_macroparticles.setter
+    def n_macroparticles(self, n_macroparticles):
+        if self._reduction is not None:
+            self.reduce_histo_wait()
+        self._n_macroparticles = n_macroparticles
+
     def track(self):
         """
         Track method in order to update the slicing along with the tracker.
@@ -430,41 +598,150 @@ class Profile(object):
         for op in self.operations:
             op()
 
+    def track_presliced(self):
+        """
+        Track method to be used when the histogram has already been filled
+        by another object, e.g. by the fused kick-drift-slice mode of the
+        RingAndRFTracker. Only the MPI reduction and the operations following
+        the slicing (fit, filter) are applied.
+        """
+
+        if bm.mpiMode():
+            self._reduce_histo()
+
+        for op in self.operations[1:]:
+            op()
+
     def _slice(self):
         """
         Constant space slicing with a constant frame.
         """
-        bm.slice(self.Beam.dt, self.n_macroparticles, self.cut_left,
-                 self.cut_right)
+        self.histogram_workspace.slice(self.Beam.dt, self.n_macroparticles,
+                                       self.cut_left, self.cut_right)
 
         if bm.mpiMode():
-            self.reduce_histo()
+            self._reduce_histo()
+
+    def _reduce_histo(self, dtype=np.uint32):
+        if self.reduce_every > 1 and self.Beam.is_splitted:
+            exact = self._n_slicings % self.reduce_every == 0
+            self._n_slicings += 1
+            if exact or self._n_balances != len(self.Beam.balance_report):
+                self._update_histo_scale()
+            if not exact:
+                self.scale_histo()
+                return
+
+            self._scaled_histogram = self.n_macroparticles * self._histo_scale
+
+        if self.overlap_reduce:
+            self.reduce_histo_start(dtype=dtype)
+        else:
+            self.reduce_histo(dtype=dtype)
+            self._measure_reduce_error()
+
+    def _update_histo_scale(self):
+        # The workers hold different numbers of macro-particles after a
+        # load balancing, so that the local histogram is scaled by its
+        # share of the alive macro-particles
+        worker = bm.get_worker()
+        n_alive = np.array([self.Beam.n_macroparticles_alive],
+                           dtype=np.float64)
+        n_alive_total = worker.allreduce(n_alive.copy(), operator='sum')[0]
+        if n_alive[0] > 0:
+            self._histo_scale = n_alive_total / n_alive[0]
+        else:
+            self._histo_scale = 0.
+        self._n_balances = len(self.Beam.balance_report)
+
+    def _measure_reduce_error(self):
+        # Relative r.m.s. error of the last scaled local histogram
+        if self._scaled_histogram is None:
+            return
+
+        norm = np.linalg.norm(self._n_macroparticles)
+        if norm > 0:
+            error = np.linalg.norm(self._scaled_histogram -
+                                   self._n_macroparticles) / norm
+        else:
+            error = 0.
+        self.reduce_error.append(error)
+        self._scaled_histogram = None
 
     def reduce_histo(self, dtype=np.uint32):
         if not bm.mpiMode():
             raise RuntimeError(
                 'ERROR: Cannot use this routine unless in MPI Mode')
 
-        from ..utils.mpi_config import worker
+        worker = bm.get_worker()
 
         if self.Beam.is_splitted:
             # Convert to uint32t for better performance
             self.n_macroparticles = self.n_macroparticles.astype(dtype, order='C')
 
-            worker.allreduce(self.n_macroparticles)
+            worker.allreduce(self.n_macroparticles, name='reduce_histo')
 
             # Convert back to float64
             self.n_macroparticles = self.n_macroparticles.astype(dtype=bm.precision.real_t, order='C', copy=False)
 
+    def reduce_histo_start(self, dtype=np.uint32):
+        """
+        Starts the reduction of the histogram over the workers without
+        waiting for it; it is completed by reduce_histo_wait, called when the
+        histogram is first used.
+        """
+        if not bm.mpiMode():
+            raise RuntimeError(
+                'ERROR: Cannot use this routine unless in MPI Mode')
+
+        worker = bm.get_worker()
+
+        if self.Beam.is_splitted:
+            histogram = self.n_macroparticles
+            if self._reduce_buffer is None \
+                    or self._reduce_buffer.dtype != dtype \
+                    or len(self._reduce_buffer) != len(histogram):
+                self._reduce_buffer = np.empty(len(histogram), dtype=dtype)
+            # Converted to uint32 for better performance
+            self._reduce_buffer[:] = histogram
+
+            self._reduction = worker.iallreduce(self._reduce_buffer,
+                                                name='reduce_histo_start')
+
+    def reduce_histo_wait(self):
+        """
+        Completes the reduction of the histogram started by
+        reduce_histo_start, if any.
+        """
+        if self._reduction is None:
+            return
+
+        worker = bm.get_worker()
+
+        worker.wait(self._reduction)
+        self._reduction = None
+        self._n_macroparticles[:] = self._reduce_buffer
+        self._measure_reduce_error()
+
+    def _complete_state(self):
+        # Called before the profile is saved by utils.checkpoint, so that
+        # the histogram is saved reduced
+        self.reduce_histo_wait()
+
         
     def scale_histo(self):
         if not bm.mpiMode():
             raise RuntimeError(
                 'ERROR: Cannot use this routine unless in MPI Mode')
 
-        from ..utils.mpi_config import worker
+        # By the share of the alive macro-particles of the worker if known
+        # (reduce_every > 1), by the number of workers otherwise
+        if self._histo_scale is not None:
+            scale = self._histo_scale
+        else:
+            scale = bm.get_worker().workers
         if self.Beam.is_splitted:
-            bm.mul(self.n_macroparticles, worker.workers, self.n_macroparticles)
+            bm.mul(self.n_macroparticles, scale, self.n_macroparticles)
 
     def _slice_smooth(self, reduce=True):
         """
@@ -474,7 +751,7 @@ class Profile(object):
                         self.cut_right)
 
         if bm.mpiMode():
-            self.reduce_histo(dtype=np.float64)
+            self._reduce_histo(dtype=np.float64)
 
     def apply_fit(self):
         """
@@ -548,10 +825,18 @@ class Profile(object):
 
     def beam_spectrum_generation(self, n_sampling_fft):
         """
-        Beam spectrum calculation
+        Beam spectrum calculation. The result is written to an array
+        allocated at the first call for each n_sampling_fft.
         """
 
-        self.beam_spectrum = bm.rfft(self.n_macroparticles, n_sampling_fft)
+        buffer = self._beam_spectrum_buffers.get(n_sampling_fft)
+        if buffer is None or buffer.dtype != bm.precision.complex_t:
+            buffer = np.empty(n_sampling_fft//2 + 1,
+                              dtype=bm.precision.complex_t, order='C')
+            self._beam_spectrum_buffers[n_sampling_fft] = buffer
+
+        self.beam_spectrum = bm.rfft(self.n_macroparticles, n_sampling_fft,
+                                     result=buffer)
 
     def beam_profile_derivative(self, mode='gradient'):
         """
@@ -84,10 +84,17 @@ cpp_files = [
     os.path.join(basepath, 'cpp_routines/kick.cpp'),
     os.path.join(basepath, 'cpp_routines/drift.cpp'),
     os.path.join(basepath, 'cpp_routines/linear_interp_kick.cpp'),
+    os.path.join(basepath, 'cpp_routines/kick_drift_slice.cpp'),
+    os.path.join(basepath, 'cpp_routines/kick_drift_periodic.cpp'),
     os.path.join(basepath, 'cpp_routines/histogram.cpp'),
+    os.path.join(basepath, 'cpp_routines/histogram_workspace.cpp'),
+    os.path.join(basepath, 'cpp_routines/beam_statistics.cpp'),
+    os.path.join(basepath, 'cpp_routines/compact_particles.cpp'),
     os.path.join(basepath, 'cpp_routines/music_track.cpp'),
+    os.path.join(basepath, 'cpp_routines/music_track_parallel.cpp'),
     os.path.join(basepath, 'cpp_routines/blondmath.cpp'),
     os.path.join(basepath, 'cpp_routines/fast_resonator.cpp'),
+    os.path.join(basepath, 'cpp_routines/resonator_induced_voltage.cpp'),
     os.path.join(basepath, 'cpp_routines/beam_phase.cpp'),
     os.path.join(basepath, 'cpp_routines/fft.cpp'),
     os.path.join(basepath, 'cpp_routines/openmp.cpp'),
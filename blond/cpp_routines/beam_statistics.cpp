@@ -0,0 +1,101 @@
+/*
+ Copyright 2016 CERN. This software is distributed under the
+ terms of the GNU General Public Licence version 3 (GPL Version 3),
+ copied verbatim in the file LICENCE.md.
+ In applying this licence, CERN does not waive the privileges and immunities
+ granted to it by virtue of its status as an Intergovernmental Organization or
+ submit itself to any jurisdiction.
+ Project website: http://blond.web.cern.ch/
+ */
+
+// Optimised C++ routine that calculates in a single pass the statistics of
+// the beam coordinates of the particles that are not lost (id != 0):
+//   stats[0]    number of alive particles
+//   stats[1:5]  mean, sum of the squared deviations from the mean, minimum
+//               and maximum of dt
+//   stats[5:9]  the same for dE
+// The sums are accumulated in double precision around the coordinates of
+// the first alive particle, which avoids the cancellation of the single pass
+// variance. The partial statistics of several workers can be combined
+// exactly (parallel variance algorithm).
+
+#include <math.h>
+#include <float.h>
+#include "openmp.h"
+
+
+template <typename T>
+static void beam_statistics_t(const T *__restrict__ dt,
+                              const T *__restrict__ dE,
+                              const long *__restrict__ id,
+                              const int n_macroparticles,
+                              double *__restrict__ stats)
+{
+    int first = 0;
+    while (first < n_macroparticles && id[first] == 0)
+        first++;
+
+    if (first == n_macroparticles) {
+        stats[0] = 0.;
+        for (int k = 1; k < 9; k++)
+            stats[k] = NAN;
+        return;
+    }
+
+    const double shift_dt = dt[first];
+    const double shift_dE = dE[first];
+
+    long n_alive = 0;
+    double sum_dt = 0., sumsq_dt = 0., sum_dE = 0., sumsq_dE = 0.;
+    double min_dt = DBL_MAX, max_dt = -DBL_MAX;
+    double min_dE = DBL_MAX, max_dE = -DBL_MAX;
+
+    #pragma omp parallel for reduction(+:n_alive, sum_dt, sumsq_dt, sum_dE, sumsq_dE) \
+        reduction(min:min_dt, min_dE) reduction(max:max_dt, max_dE)
+    for (int i = first; i < n_macroparticles; i++) {
+        if (id[i] == 0) continue;
+        const double x = dt[i];
+        const double y = dE[i];
+        const double dx = x - shift_dt;
+        const double dy = y - shift_dE;
+        n_alive++;
+        sum_dt += dx;
+        sumsq_dt += dx * dx;
+        sum_dE += dy;
+        sumsq_dE += dy * dy;
+        min_dt = fmin(min_dt, x);
+        max_dt = fmax(max_dt, x);
+        min_dE = fmin(min_dE, y);
+        max_dE = fmax(max_dE, y);
+    }
+
+    stats[0] = n_alive;
+    stats[1] = shift_dt + sum_dt / n_alive;
+    stats[2] = fmax(sumsq_dt - sum_dt * sum_dt / n_alive, 0.);
+    stats[3] = min_dt;
+    stats[4] = max_dt;
+    stats[5] = shift_dE + sum_dE / n_alive;
+    stats[6] = fmax(sumsq_dE - sum_dE * sum_dE / n_alive, 0.);
+    stats[7] = min_dE;
+    stats[8] = max_dE;
+}
+
+
+extern "C" void beam_statistics(const double *__restrict__ dt,
+                                const double *__restrict__ dE,
+                                const long *__restrict__ id,
+                                const int n_macroparticles,
+                                double *__restrict__ stats)
+{
+    beam_statistics_t<double>(dt, dE, id, n_macroparticles, stats);
+}
+
+
+extern "C" void beam_statisticsf(const float *__restrict__ dt,
+                                 const float *__restrict__ dE,
+                                 const long *__restrict__ id,
+                                 const int n_macroparticles,
+                                 double *__restrict__ stats)
+{
+    beam_statistics_t<float>(dt, dE, id, n_macroparticles, stats);
+}
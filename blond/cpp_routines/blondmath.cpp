@@ -313,9 +313,10 @@ extern "C" {
         return sqrt(sum_deviation / n);
     }
 
+    // The single precision statistics are accumulated in double precision
     float meanf(const float * __restrict__ data, const int n)
     {
-        float m = 0;
+        double m = 0;
         #pragma omp parallel for reduction(+:m)
         for (int i = 0; i < n; ++i) {
             m += data[i];
@@ -327,7 +328,7 @@ extern "C" {
                  const int n)
     {
         const float m = meanf(data, n);
-        float sum_deviation = 0.0;
+        double sum_deviation = 0.0;
 
         #pragma omp parallel for reduction(+:sum_deviation)
         for (int i = 0; i < n; ++i)
@@ -0,0 +1,53 @@
+/*
+ Copyright 2016 CERN. This software is distributed under the
+ terms of the GNU General Public Licence version 3 (GPL Version 3),
+ copied verbatim in the file LICENCE.md.
+ In applying this licence, CERN does not waive the privileges and immunities
+ granted to it by virtue of its status as an Intergovernmental Organization or
+ submit itself to any jurisdiction.
+ Project website: http://blond.web.cern.ch/
+ */
+
+// Optimised C++ routine that moves the particles that are not lost
+// (id != 0) to the front of the beam coordinate arrays, in place and in
+// their original order, and returns their number. The particles are only
+// moved towards the front, so that no work array is needed.
+
+
+template <typename T>
+static int compact_particles_t(T *__restrict__ dt,
+                               T *__restrict__ dE,
+                               long *__restrict__ id,
+                               const int n_macroparticles)
+{
+    int n_alive = 0;
+    for (int i = 0; i < n_macroparticles; i++) {
+        if (id[i] == 0) continue;
+        if (i != n_alive) {
+            dt[n_alive] = dt[i];
+            dE[n_alive] = dE[i];
+            id[n_alive] = id[i];
+        }
+        n_alive++;
+    }
+
+    return n_alive;
+}
+
+
+extern "C" int compact_particles(double *__restrict__ dt,
+                                 double *__restrict__ dE,
+                                 long *__restrict__ id,
+                                 const int n_macroparticles)
+{
+    return compact_particles_t<double>(dt, dE, id, n_macroparticles);
+}
+
+
+extern "C" int compact_particlesf(float *__restrict__ dt,
+                                  float *__restrict__ dE,
+                                  long *__restrict__ id,
+                                  const int n_macroparticles)
+{
+    return compact_particles_t<float>(dt, dE, id, n_macroparticles);
+}
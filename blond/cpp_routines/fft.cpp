@@ -32,12 +32,51 @@
 // May yield better performance but the input is not usable any more.
 // Can be combined with all the above
 
+// The plans are kept in least recently used order, the most recently used
+// plan being the last one.
 static std::vector<fft_plan_t> planV;
 static std::vector<fftf_plan_t> planVf;
+static unsigned maxPlans = 64;
 static bool hasBeenInit = false;
 const unsigned FFTW_FLAGS = FFTW_MEASURE | FFTW_DESTROY_INPUT;
 
 using namespace std;
+
+static void destroy_plan(fft_plan_t &plan)
+{
+    fftw_destroy_plan(plan.p);
+    fftw_free(plan.in);
+    fftw_free(plan.out);
+}
+
+static void destroy_plan(fftf_plan_t &plan)
+{
+    fftwf_destroy_plan(plan.p);
+    fftwf_free(plan.in);
+    fftwf_free(plan.out);
+}
+
+// Destroy the least recently used plans until there is room for
+// n_free new plans
+template <typename P>
+static void evict_plans(vector<P> &v, const unsigned n_free)
+{
+    if (maxPlans == 0)
+        return;
+    while (!v.empty() && v.size() + n_free > maxPlans) {
+        destroy_plan(v.front());
+        v.erase(v.begin());
+    }
+}
+
+// Mark the plan pointed by it as the most recently used one
+template <typename P>
+static P &touch_plan(vector<P> &v, typename vector<P>::iterator it)
+{
+    rotate(it, it + 1, v.end());
+    return v.back();
+}
+
 // Parameters are like python's numpy.fft.rfft
 // @in:  input data
 // @n:   number of points to use. If n < in.size() then the input is cropped
@@ -148,13 +187,15 @@ extern "C" {
     {
         // const uint flag = FFTW_FLAGS;
         auto it =
-        find_if(v.begin(), v.end(), [inSize, fftSize, type](const fft_plan_t &s) {
+        find_if(v.begin(), v.end(), [inSize, fftSize, type, threads](const fft_plan_t &s) {
             return ((s.inSize == inSize) && (s.fftSize == fftSize) && (s.type == type)
-                    && (s.howmany == 1));
+                    && (s.howmany == 1) && (s.threads == threads));
         });
 
         if (it == v.end()) {
+            evict_plans(v, 1);
             fft_plan_t plan;
+            plan.threads = threads;
             plan.inSize = inSize;
             plan.fftSize = fftSize;
             plan.type = type;
@@ -212,7 +253,7 @@ extern "C" {
             v.push_back(plan);
             return plan;
         } else {
-            return *it;
+            return touch_plan(v, it);
         }
     }
 
@@ -223,13 +264,15 @@ extern "C" {
     {
         // const uint flag = FFTW_FLAGS;
         auto it =
-        find_if(v.begin(), v.end(), [inSize, fftSize, howmany, type](const fft_plan_t &s) {
+        find_if(v.begin(), v.end(), [inSize, fftSize, howmany, type, threads](const fft_plan_t &s) {
             return ((s.inSize == inSize) && (s.fftSize == fftSize) && (s.type == type)
-                    && (s.howmany == howmany));
+                    && (s.howmany == howmany) && (s.threads == threads));
         });
 
         if (it == v.end()) {
+            evict_plans(v, 1);
             fft_plan_t plan;
+            plan.threads = threads;
             plan.inSize = inSize;
             plan.fftSize = fftSize;
             plan.howmany = howmany;
@@ -254,7 +297,7 @@ extern "C" {
             v.push_back(plan);
             return plan;
         } else {
-            return *it;
+            return touch_plan(v, it);
         }
     }
 
@@ -262,22 +305,47 @@ extern "C" {
 
     void destroy_plans()
     {
-        for (auto &i : planV) {
-            fftw_destroy_plan(i.p);
-            fftw_free(i.in);
-            fftw_free(i.out);
-        }
+        for (auto &i : planV)
+            destroy_plan(i);
         planV.clear();
 
-        for (auto &i : planVf) {
-            fftwf_destroy_plan(i.p);
-            fftwf_free(i.in);
-            fftwf_free(i.out);
-        }
+        for (auto &i : planVf)
+            destroy_plan(i);
         planVf.clear();
 
     }
 
+    void set_max_plans(const int max_plans)
+    {
+        maxPlans = max_plans > 0 ? max_plans : 0;
+        evict_plans(planV, 0);
+        evict_plans(planVf, 0);
+    }
+
+    int get_n_plans() { return planV.size(); }
+
+    int get_n_plansf() { return planVf.size(); }
+
+    int import_wisdom(const char *filename)
+    {
+        return fftw_import_wisdom_from_filename(filename);
+    }
+
+    int export_wisdom(const char *filename)
+    {
+        return fftw_export_wisdom_to_filename(filename);
+    }
+
+    int import_wisdomf(const char *filename)
+    {
+        return fftwf_import_wisdom_from_filename(filename);
+    }
+
+    int export_wisdomf(const char *filename)
+    {
+        return fftwf_export_wisdom_to_filename(filename);
+    }
+
     // rfft
     // @in: input vector which must be the result of a rfft
     // @out: irfft of input, always real
@@ -559,13 +627,15 @@ extern "C" {
     {
         // const uint flag = FFTW_FLAGS;
         auto it =
-        find_if(v.begin(), v.end(), [inSize, fftSize, type](const fftf_plan_t &s) {
+        find_if(v.begin(), v.end(), [inSize, fftSize, type, threads](const fftf_plan_t &s) {
             return ((s.inSize == inSize) && (s.fftSize == fftSize) && (s.type == type)
-                    && (s.howmany == 1));
+                    && (s.howmany == 1) && (s.threads == threads));
         });
 
         if (it == v.end()) {
+            evict_plans(v, 1);
             fftf_plan_t plan;
+            plan.threads = threads;
             plan.inSize = inSize;
             plan.fftSize = fftSize;
             plan.type = type;
@@ -623,7 +693,7 @@ extern "C" {
             v.push_back(plan);
             return plan;
         } else {
-            return *it;
+            return touch_plan(v, it);
         }
     }
 
@@ -634,13 +704,15 @@ extern "C" {
     {
         // const uint flag = FFTW_FLAGS;
         auto it =
-        find_if(v.begin(), v.end(), [inSize, fftSize, howmany, type](const fftf_plan_t &s) {
+        find_if(v.begin(), v.end(), [inSize, fftSize, howmany, type, threads](const fftf_plan_t &s) {
             return ((s.inSize == inSize) && (s.fftSize == fftSize) && (s.type == type)
-                    && (s.howmany == howmany));
+                    && (s.howmany == howmany) && (s.threads == threads));
         });
 
         if (it == v.end()) {
+            evict_plans(v, 1);
             fftf_plan_t plan;
+            plan.threads = threads;
             plan.inSize = inSize;
             plan.fftSize = fftSize;
             plan.howmany = howmany;
@@ -665,7 +737,7 @@ extern "C" {
             v.push_back(plan);
             return plan;
         } else {
-            return *it;
+            return touch_plan(v, it);
         }
     }
 
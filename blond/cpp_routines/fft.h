@@ -20,6 +20,7 @@ struct fft_plan_t {
     int inSize;       // input size
     int fftSize;      // fft size
     int howmany = 1;  // for packed ffts
+    int threads = 1;  // number of threads used by the plan
     fft_type_t type;
     void *in;
     void *out;
@@ -31,6 +32,7 @@ struct fftf_plan_t {
     int inSize;       // input size
     int fftSize;      // fft size
     int howmany = 1;  // for packed ffts
+    int threads = 1;  // number of threads used by the plan
     fft_type_t type;
     void *in;
     void *out;
@@ -41,6 +43,25 @@ struct fftf_plan_t {
 extern "C" {
     void destroy_plans();
 
+// Maximum number of plans kept per precision. When the limit is reached the
+// least recently used plan is destroyed. 0 means no limit.
+    void set_max_plans(const int max_plans);
+
+    int get_n_plans();
+
+    int get_n_plansf();
+
+// Import/export the accumulated FFTW wisdom from/to a file, so that
+// the FFTW_MEASURE planning cost is paid only once across runs.
+// @return: 1 on success, 0 on failure
+    int import_wisdom(const char *filename);
+
+    int export_wisdom(const char *filename);
+
+    int import_wisdomf(const char *filename);
+
+    int export_wisdomf(const char *filename);
+
     void rfft(double *in, const int inSize,
               complex128_t *out, int fftSize = 0,
               const int threads = 1);
@@ -0,0 +1,178 @@
+/*
+ Copyright 2016 CERN. This software is distributed under the
+ terms of the GNU General Public Licence version 3 (GPL Version 3),
+ copied verbatim in the file LICENCE.md.
+ In applying this licence, CERN does not waive the privileges and immunities
+ granted to it by virtue of its status as an Intergovernmental Organization or
+ submit itself to any jurisdiction.
+ Project website: http://blond.web.cern.ch/
+ */
+
+// Optimised C++ routine that calculates the histogram in work arrays
+// allocated once by the caller, with one of three strategies:
+//   PRIVATE: one sub-histogram per thread, reduced at the end, for many
+//            particles per slice
+//   ATOMIC:  a single sub-histogram updated with atomic additions
+//   SORT:    the bin indices are sorted and the histogram is filled with the
+//            lengths of the runs of equal indices, for more slices than
+//            particles
+// The sub-histograms are in double precision, so that the counts stay exact
+// with single precision coordinates.
+
+#include <string.h>     // memset()
+#include <math.h>
+#include "openmp.h"
+
+#ifdef PARALLEL
+#include <parallel/algorithm>
+#else
+#include <algorithm>
+#endif
+
+enum histogram_strategy_t { H_PRIVATE, H_ATOMIC, H_SORT };
+
+
+template <typename T>
+static void histogram_workspace_t(const T *__restrict__ input,
+                                  T *__restrict__ output,
+                                  const T cut_left, const T cut_right,
+                                  const int n_slices,
+                                  const int n_macroparticles,
+                                  const int strategy,
+                                  double *__restrict__ sub_histograms,
+                                  int *__restrict__ bins)
+{
+    const T inv_bin_width = n_slices / (cut_right - cut_left);
+
+    if (strategy == H_SORT) {
+        // Bin index of every particle, n_slices for the particles outside
+        // (the index is checked after the conversion, which also excludes
+        // NaN coordinates)
+        #pragma omp parallel for
+        for (int i = 0; i < n_macroparticles; i++) {
+            const int bin = (int) floor((input[i] - cut_left) * inv_bin_width);
+            bins[i] = (bin < 0 || bin >= n_slices) ? n_slices : bin;
+        }
+#ifdef PARALLEL
+        __gnu_parallel::sort(bins, bins + n_macroparticles);
+#else
+        std::sort(bins, bins + n_macroparticles);
+#endif
+        #pragma omp parallel
+        {
+            #pragma omp for
+            for (int i = 0; i < n_slices; i++)
+                output[i] = 0.;
+
+            // Every run of equal indices is counted by the thread owning its
+            // first element
+            #pragma omp for
+            for (int i = 0; i < n_macroparticles; i++) {
+                if (bins[i] == n_slices || (i > 0 && bins[i] == bins[i - 1]))
+                    continue;
+                int j = i + 1;
+                while (j < n_macroparticles && bins[j] == bins[i])
+                    j++;
+                output[bins[i]] = j - i;
+            }
+        }
+
+    } else if (strategy == H_ATOMIC) {
+        #pragma omp parallel
+        {
+            #pragma omp for
+            for (int i = 0; i < n_slices; i++)
+                sub_histograms[i] = 0.;
+
+            #pragma omp for
+            for (int i = 0; i < n_macroparticles; i++) {
+                const int bin = (int) floor((input[i] - cut_left) * inv_bin_width);
+                if (bin < 0 || bin >= n_slices) continue;
+                #pragma omp atomic
+                sub_histograms[bin] += 1.;
+            }
+
+            #pragma omp for
+            for (int i = 0; i < n_slices; i++)
+                output[i] = sub_histograms[i];
+        }
+
+    } else {
+        // Number of Iterations of the inner loop
+        const int STEP = 16;
+
+        #pragma omp parallel
+        {
+            const int id = omp_get_thread_num();
+            const int threads = omp_get_num_threads();
+            double *histo = sub_histograms + id * n_slices;
+            memset(histo, 0., n_slices * sizeof(double));
+            T fbin[STEP];
+
+            #pragma omp for
+            for (int i = 0; i < n_macroparticles; i += STEP) {
+
+                const int loop_count = n_macroparticles - i > STEP ?
+                                       STEP : n_macroparticles - i;
+
+                // First calculate the index to update
+                for (int j = 0; j < loop_count; j++) {
+                    fbin[j] = floor((input[i + j] - cut_left) * inv_bin_width);
+                }
+                // Then update the corresponding bins
+                for (int j = 0; j < loop_count; j++) {
+                    const int bin = (int) fbin[j];
+                    if (bin < 0 || bin >= n_slices) continue;
+                    histo[bin] += 1.;
+                }
+            }
+
+            // Reduce to a single histogram
+            #pragma omp for
+            for (int i = 0; i < n_slices; i++) {
+                double count = 0.;
+                for (int t = 0; t < threads; t++)
+                    count += sub_histograms[t * n_slices + i];
+                output[i] = count;
+            }
+        }
+    }
+}
+
+
+extern "C" int histogram_max_threads()
+{
+    return omp_get_max_threads();
+}
+
+
+extern "C" void histogram_workspace(const double *__restrict__ input,
+                                    double *__restrict__ output,
+                                    const double cut_left,
+                                    const double cut_right,
+                                    const int n_slices,
+                                    const int n_macroparticles,
+                                    const int strategy,
+                                    double *__restrict__ sub_histograms,
+                                    int *__restrict__ bins)
+{
+    histogram_workspace_t<double>(input, output, cut_left, cut_right,
+                                  n_slices, n_macroparticles, strategy,
+                                  sub_histograms, bins);
+}
+
+
+extern "C" void histogram_workspacef(const float *__restrict__ input,
+                                     float *__restrict__ output,
+                                     const float cut_left,
+                                     const float cut_right,
+                                     const int n_slices,
+                                     const int n_macroparticles,
+                                     const int strategy,
+                                     double *__restrict__ sub_histograms,
+                                     int *__restrict__ bins)
+{
+    histogram_workspace_t<float>(input, output, cut_left, cut_right,
+                                 n_slices, n_macroparticles, strategy,
+                                 sub_histograms, bins);
+}
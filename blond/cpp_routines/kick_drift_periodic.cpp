@@ -0,0 +1,181 @@
+/*
+Copyright 2016 CERN. This software is distributed under the
+terms of the GNU General Public Licence version 3 (GPL Version 3),
+copied verbatim in the file LICENCE.md.
+In applying this licence, CERN does not waive the privileges and immunities
+granted to it by virtue of its status as an Intergovernmental Organization or
+submit itself to any jurisdiction.
+Project website: http://blond.web.cern.ch/
+*/
+
+// Optimised C++ routine that applies the kick and the drift with periodic
+// boundary conditions. The wrap-around of the particles leaving the frame
+// [0, t_rev] is done in place, particle by particle, without gathering the
+// particles outside the frame in temporary arrays.
+
+#include <string.h>     // strcmp()
+#include <math.h>
+#include <cmath>
+#include "sin.h"
+
+using namespace vdt;
+
+enum periodic_solver_t { P_SIMPLE, P_LEGACY, P_EXACT };
+
+
+static inline double periodic_sin(const double x) { return fast_sin(x); }
+static inline float periodic_sin(const float x) { return fast_sinf(x); }
+
+
+template <typename T>
+struct periodic_map_t {
+    int n_rf;
+    const T * __restrict__ voltage;
+    const T * __restrict__ omega_RF;
+    const T * __restrict__ phi_RF;
+    T acc_kick;
+    periodic_solver_t solver;
+    T T_drift, simple_coeff, eta0, eta1, eta2;
+    T alpha_zero, alpha_one, alpha_two;
+    T energy, invbetasq, invenesq;
+
+    // Kick and drift of a single particle
+    inline void operator()(T &dt, T &dE) const
+    {
+        for (int k = 0; k < n_rf; k++)
+            dE += voltage[k] * periodic_sin(omega_RF[k] * dt + phi_RF[k]);
+        dE += acc_kick;
+
+        if (solver == P_SIMPLE) {
+            dt += simple_coeff * dE;
+        } else if (solver == P_LEGACY) {
+            dt += T_drift * (1. / (1. - eta0 * dE - eta1 * dE * dE
+                                   - eta2 * dE * dE * dE) - 1.);
+        } else {
+            const T beam_delta = std::sqrt(1. + invbetasq *
+                                           (dE * dE * invenesq
+                                            + 2. * dE / energy)) - 1.;
+            dt += T_drift * (
+                      (1. + alpha_zero * beam_delta +
+                       alpha_one * (beam_delta * beam_delta) +
+                       alpha_two * (beam_delta * beam_delta * beam_delta)) *
+                      (1. + dE / energy) / (1. + beam_delta) - 1.);
+        }
+    }
+};
+
+
+template <typename T>
+static void kick_drift_periodic_t(T * __restrict__ beam_dt,
+                                  T * __restrict__ beam_dE,
+                                  const int n_macroparticles,
+                                  const int n_rf,
+                                  const T * __restrict__ voltage,
+                                  const T * __restrict__ omega_RF,
+                                  const T * __restrict__ phi_RF,
+                                  const T acc_kick,
+                                  const char * __restrict__ solver,
+                                  const T T0, const T length_ratio,
+                                  const T alpha_order, const T eta_zero,
+                                  const T eta_one, const T eta_two,
+                                  const T alpha_zero, const T alpha_one,
+                                  const T alpha_two,
+                                  const T beta, const T energy)
+{
+    periodic_map_t<T> map;
+    map.n_rf = n_rf;
+    map.voltage = voltage;
+    map.omega_RF = omega_RF;
+    map.phi_RF = phi_RF;
+    map.acc_kick = acc_kick;
+    map.solver = P_EXACT;
+    if (strcmp(solver, "simple") == 0)
+        map.solver = P_SIMPLE;
+    else if (strcmp(solver, "legacy") == 0)
+        map.solver = P_LEGACY;
+
+    const T coeff = 1. / (beta * beta * energy);
+    map.T_drift = T0 * length_ratio;
+    map.simple_coeff = map.T_drift * eta_zero * coeff;
+    map.eta0 = eta_zero * coeff;
+    map.eta1 = (alpha_order > 0) ? eta_one * coeff * coeff : 0.;
+    map.eta2 = (alpha_order > 1) ? eta_two * coeff * coeff * coeff : 0.;
+    map.alpha_zero = alpha_zero;
+    map.alpha_one = alpha_one;
+    map.alpha_two = alpha_two;
+    map.energy = energy;
+    map.invbetasq = 1. / (beta * beta);
+    map.invenesq = 1. / (energy * energy);
+
+    #pragma omp parallel for
+    for (int i = 0; i < n_macroparticles; i++) {
+        T dt = beam_dt[i];
+        T dE = beam_dE[i];
+
+        if (dt > T0) {
+            // Particles on the right-hand side of the frame change
+            // reference and skip one kick and drift
+            dt -= T0;
+        } else {
+            map(dt, dE);
+        }
+
+        if (dt < 0) {
+            // Particles on the left-hand side of the updated frame change
+            // reference and get a second kick and drift
+            dt += T0;
+            map(dt, dE);
+        }
+
+        beam_dt[i] = dt;
+        beam_dE[i] = dE;
+    }
+}
+
+
+extern "C" void kick_drift_periodic(double * __restrict__ beam_dt,
+                                    double * __restrict__ beam_dE,
+                                    const int n_macroparticles,
+                                    const int n_rf,
+                                    const double * __restrict__ voltage,
+                                    const double * __restrict__ omega_RF,
+                                    const double * __restrict__ phi_RF,
+                                    const double acc_kick,
+                                    const char * __restrict__ solver,
+                                    const double T0, const double length_ratio,
+                                    const double alpha_order, const double eta_zero,
+                                    const double eta_one, const double eta_two,
+                                    const double alpha_zero, const double alpha_one,
+                                    const double alpha_two,
+                                    const double beta, const double energy)
+{
+    kick_drift_periodic_t<double>(beam_dt, beam_dE, n_macroparticles,
+                                  n_rf, voltage, omega_RF, phi_RF, acc_kick,
+                                  solver, T0, length_ratio, alpha_order,
+                                  eta_zero, eta_one, eta_two, alpha_zero,
+                                  alpha_one, alpha_two, beta, energy);
+}
+
+
+extern "C" void kick_drift_periodicf(float * __restrict__ beam_dt,
+                                     float * __restrict__ beam_dE,
+                                     const int n_macroparticles,
+                                     const int n_rf,
+                                     const float * __restrict__ voltage,
+                                     const float * __restrict__ omega_RF,
+                                     const float * __restrict__ phi_RF,
+                                     const float acc_kick,
+                                     const char * __restrict__ solver,
+                                     const float T0, const float length_ratio,
+                                     const float alpha_order, const float eta_zero,
+                                     const float eta_one, const float eta_two,
+                                     const float alpha_zero, const float alpha_one,
+                                     const float alpha_two,
+                                     const float beta, const float energy)
+{
+    kick_drift_periodic_t<float>(beam_dt, beam_dE, n_macroparticles,
+                                 n_rf, voltage, omega_RF, phi_RF, acc_kick,
+                                 solver, T0, length_ratio, alpha_order,
+                                 eta_zero, eta_one, eta_two, alpha_zero,
+                                 alpha_one, alpha_two, beta, energy);
+}
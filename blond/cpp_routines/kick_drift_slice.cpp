@@ -0,0 +1,260 @@
+/*
+Copyright 2016 CERN. This software is distributed under the
+terms of the GNU General Public Licence version 3 (GPL Version 3),
+copied verbatim in the file LICENCE.md.
+In applying this licence, CERN does not waive the privileges and immunities
+granted to it by virtue of its status as an Intergovernmental Organization or
+submit itself to any jurisdiction.
+Project website: http://blond.web.cern.ch/
+*/
+
+// Optimised C++ routine that applies, in a single pass over the beam
+// coordinates, the RF kick, the kick of an interpolated voltage (induced
+// and/or RF voltage sampled at the bin centers), the drift and the slicing of
+// the profile of the next turn. The particles are processed in chunks small
+// enough to stay in cache between the different steps. The work arrays (the
+// coefficients of the interpolated kick and the per-thread sub-histograms,
+// in double precision so that the counts stay exact with single precision
+// coordinates) are allocated once by the caller.
+
+#include <string.h>     // memset(), strcmp()
+#include <math.h>
+#include <cmath>
+#include "sin.h"
+#include "openmp.h"
+
+using namespace vdt;
+
+enum drift_solver_t { SIMPLE, LEGACY, EXACT };
+
+
+static inline double rf_sin(const double x) { return fast_sin(x); }
+static inline float rf_sin(const float x) { return fast_sinf(x); }
+
+
+template <typename T>
+static void kick_drift_slice_t(T * __restrict__ beam_dt,
+                               T * __restrict__ beam_dE,
+                               const int n_macroparticles,
+                               const int n_rf,
+                               const T * __restrict__ voltage,
+                               const T * __restrict__ omega_RF,
+                               const T * __restrict__ phi_RF,
+                               const T * __restrict__ interp_voltage,
+                               const T * __restrict__ bin_centers,
+                               const int n_bins,
+                               const T charge,
+                               const T interp_acc_kick,
+                               const T acc_kick,
+                               const char * __restrict__ solver,
+                               const T T0, const T length_ratio,
+                               const T alpha_order, const T eta_zero,
+                               const T eta_one, const T eta_two,
+                               const T alpha_zero, const T alpha_one,
+                               const T alpha_two,
+                               const T beta, const T energy,
+                               T * __restrict__ profile,
+                               const T cut_left, const T cut_right,
+                               const int n_slices,
+                               T * __restrict__ kick_coefficients,
+                               double * __restrict__ sub_histograms)
+{
+    // Number of particles processed together in each step
+    const int STEP = 64;
+
+    // Drift constants
+    const T T_drift = T0 * length_ratio;
+    drift_solver_t solver_t = EXACT;
+    if (strcmp(solver, "simple") == 0)
+        solver_t = SIMPLE;
+    else if (strcmp(solver, "legacy") == 0)
+        solver_t = LEGACY;
+    const T coeff = 1. / (beta * beta * energy);
+    const T simple_coeff = T_drift * eta_zero * coeff;
+    const T eta0 = eta_zero * coeff;
+    const T eta1 = (alpha_order > 0) ? eta_one * coeff * coeff : 0.;
+    const T eta2 = (alpha_order > 1) ? eta_two * coeff * coeff * coeff : 0.;
+    const T invbetasq = 1. / (beta * beta);
+    const T invenesq = 1. / (energy * energy);
+
+    // Interpolated kick constants
+    const bool interp = (interp_voltage != NULL) && (n_bins > 1);
+    T inv_bin_width_kick = 0.;
+    T *voltageKick = NULL;
+    T *factor = NULL;
+    if (interp) {
+        inv_bin_width_kick = (n_bins - 1) / (bin_centers[n_bins - 1]
+                                             - bin_centers[0]);
+        voltageKick = kick_coefficients;
+        factor = kick_coefficients + (n_bins - 1);
+    }
+
+    // Slicing constants
+    const T inv_bin_width = n_slices / (cut_right - cut_left);
+
+    #pragma omp parallel
+    {
+        const int id = omp_get_thread_num();
+        const int threads = omp_get_num_threads();
+        double *histo = sub_histograms + id * n_slices;
+        memset(histo, 0., n_slices * sizeof(double));
+        int fbin[STEP];
+
+        if (interp) {
+            #pragma omp for
+            for (int i = 0; i < n_bins - 1; i++) {
+                voltageKick[i] = charge * (interp_voltage[i + 1] - interp_voltage[i])
+                                 * inv_bin_width_kick;
+                factor[i] = charge * interp_voltage[i] - bin_centers[i] * voltageKick[i]
+                            + interp_acc_kick;
+            }
+        }
+
+        #pragma omp for
+        for (int i = 0; i < n_macroparticles; i += STEP) {
+
+            const int loop_count = n_macroparticles - i > STEP ?
+                                   STEP : n_macroparticles - i;
+            T * __restrict__ dt = beam_dt + i;
+            T * __restrict__ dE = beam_dE + i;
+
+            // KICK: interpolated voltage
+            if (interp) {
+                // The index is checked after the conversion, which also
+                // excludes NaN coordinates
+                for (int j = 0; j < loop_count; j++) {
+                    const int fb = (int) std::floor((dt[j] - bin_centers[0])
+                                                    * inv_bin_width_kick);
+                    fbin[j] = (fb < 0 || fb >= n_bins - 1) ? -1 : fb;
+                }
+                for (int j = 0; j < loop_count; j++) {
+                    if (fbin[j] >= 0)
+                        dE[j] += dt[j] * voltageKick[fbin[j]] + factor[fbin[j]];
+                }
+            }
+
+            // KICK: RF systems and synchronous energy change
+            for (int k = 0; k < n_rf; k++) {
+                for (int j = 0; j < loop_count; j++)
+                    dE[j] += voltage[k] * rf_sin(omega_RF[k] * dt[j] + phi_RF[k]);
+            }
+            for (int j = 0; j < loop_count; j++)
+                dE[j] += acc_kick;
+
+            // DRIFT
+            if (solver_t == SIMPLE) {
+                for (int j = 0; j < loop_count; j++)
+                    dt[j] += simple_coeff * dE[j];
+            } else if (solver_t == LEGACY) {
+                for (int j = 0; j < loop_count; j++)
+                    dt[j] += T_drift * (1. / (1. - eta0 * dE[j]
+                                              - eta1 * dE[j] * dE[j]
+                                              - eta2 * dE[j] * dE[j] * dE[j]) - 1.);
+            } else {
+                for (int j = 0; j < loop_count; j++) {
+                    const T beam_delta = std::sqrt(1. + invbetasq *
+                                                   (dE[j] * dE[j] * invenesq
+                                                    + 2. * dE[j] / energy)) - 1.;
+                    dt[j] += T_drift * (
+                                 (1. + alpha_zero * beam_delta +
+                                  alpha_one * (beam_delta * beam_delta) +
+                                  alpha_two * (beam_delta * beam_delta * beam_delta)) *
+                                 (1. + dE[j] / energy) / (1. + beam_delta) - 1.);
+                }
+            }
+
+            // SLICE
+            for (int j = 0; j < loop_count; j++) {
+                const int fb = (int) std::floor((dt[j] - cut_left) * inv_bin_width);
+                fbin[j] = (fb < 0 || fb >= n_slices) ? -1 : fb;
+            }
+            for (int j = 0; j < loop_count; j++) {
+                if (fbin[j] >= 0)
+                    histo[fbin[j]] += 1.;
+            }
+        }
+
+        // Reduce to a single histogram
+        #pragma omp for
+        for (int i = 0; i < n_slices; i++) {
+            double count = 0.;
+            for (int t = 0; t < threads; t++)
+                count += sub_histograms[t * n_slices + i];
+            profile[i] = count;
+        }
+    }
+}
+
+
+extern "C" void kick_drift_slice(double * __restrict__ beam_dt,
+                                 double * __restrict__ beam_dE,
+                                 const int n_macroparticles,
+                                 const int n_rf,
+                                 const double * __restrict__ voltage,
+                                 const double * __restrict__ omega_RF,
+                                 const double * __restrict__ phi_RF,
+                                 const double * __restrict__ interp_voltage,
+                                 const double * __restrict__ bin_centers,
+                                 const int n_bins,
+                                 const double charge,
+                                 const double interp_acc_kick,
+                                 const double acc_kick,
+                                 const char * __restrict__ solver,
+                                 const double T0, const double length_ratio,
+                                 const double alpha_order, const double eta_zero,
+                                 const double eta_one, const double eta_two,
+                                 const double alpha_zero, const double alpha_one,
+                                 const double alpha_two,
+                                 const double beta, const double energy,
+                                 double * __restrict__ profile,
+                                 const double cut_left, const double cut_right,
+                                 const int n_slices,
+                                 double * __restrict__ kick_coefficients,
+                                 double * __restrict__ sub_histograms)
+{
+    kick_drift_slice_t<double>(beam_dt, beam_dE, n_macroparticles,
+                               n_rf, voltage, omega_RF, phi_RF,
+                               interp_voltage, bin_centers, n_bins, charge,
+                               interp_acc_kick, acc_kick, solver, T0, length_ratio,
+                               alpha_order, eta_zero, eta_one, eta_two,
+                               alpha_zero, alpha_one, alpha_two, beta, energy,
+                               profile, cut_left, cut_right, n_slices,
+                               kick_coefficients, sub_histograms);
+}
+
+
+extern "C" void kick_drift_slicef(float * __restrict__ beam_dt,
+                                  float * __restrict__ beam_dE,
+                                  const int n_macroparticles,
+                                  const int n_rf,
+                                  const float * __restrict__ voltage,
+                                  const float * __restrict__ omega_RF,
+                                  const float * __restrict__ phi_RF,
+                                  const float * __restrict__ interp_voltage,
+                                  const float * __restrict__ bin_centers,
+                                  const int n_bins,
+                                  const float charge,
+                                  const float interp_acc_kick,
+                                  const float acc_kick,
+                                  const char * __restrict__ solver,
+                                  const float T0, const float length_ratio,
+                                  const float alpha_order, const float eta_zero,
+                                  const float eta_one, const float eta_two,
+                                  const float alpha_zero, const float alpha_one,
+                                  const float alpha_two,
+                                  const float beta, const float energy,
+                                  float * __restrict__ profile,
+                                  const float cut_left, const float cut_right,
+                                  const int n_slices,
+                                  float * __restrict__ kick_coefficients,
+                                  double * __restrict__ sub_histograms)
+{
+    kick_drift_slice_t<float>(beam_dt, beam_dE, n_macroparticles,
+                              n_rf, voltage, omega_RF, phi_RF,
+                              interp_voltage, bin_centers, n_bins, charge,
+                              interp_acc_kick, acc_kick, solver, T0, length_ratio,
+                              alpha_order, eta_zero, eta_one, eta_two,
+                              alpha_zero, alpha_one, alpha_two, beta, energy,
+                              profile, cut_left, cut_right, n_slices,
+                              kick_coefficients, sub_histograms);
+}
@@ -0,0 +1,89 @@
+/*
+Copyright 2014-2017 CERN. This software is distributed under the
+terms of the GNU General Public Licence version 3 (GPL Version 3),
+copied verbatim in the file LICENCE.md.
+In applying this licence, CERN does not waive the privileges and immunities
+granted to it by virtue of its status as an Intergovernmental Organization or
+submit itself to any jurisdiction.
+Project website: http://blond.web.cern.ch/
+*/
+
+// Adaptive in-place sort of the particles with respect to dt, for the MuSiC
+// algorithm. The particles are kept sorted from one turn to the next, and
+// they move only a small fraction of the bunch length per turn, so the
+// coordinates are almost sorted. The particles out of order are moved to a
+// small buffer, which is sorted and merged back, at a cost
+// O(n + m log m) for m particles out of order.
+
+#ifndef _MUSIC_SORT_H_
+#define _MUSIC_SORT_H_
+
+#ifdef PARALLEL
+#include <parallel/algorithm>
+#else
+#include <algorithm>
+#endif
+
+#include <vector>
+
+
+template <typename T>
+struct sort_particle {
+    T dt;
+    T de;
+    bool operator<(const sort_particle &o) const
+    {
+        return dt < o.dt;
+    }
+};
+
+
+template <typename T>
+static void music_sort(T *__restrict__ beam_dt,
+                       T *__restrict__ beam_dE,
+                       const int n_macroparticles)
+{
+    // Sorted subsequence kept in place in [0, n_kept), the other particles
+    // go to the buffer. When a particle is smaller than the last kept one,
+    // both go to the buffer so that a single particle out of order does not
+    // drop all the following ones.
+    std::vector<sort_particle<T>> buffer;
+    int n_kept = 0;
+    for (int i = 0; i < n_macroparticles; i++) {
+        if (n_kept > 0 && beam_dt[i] < beam_dt[n_kept - 1]) {
+            n_kept--;
+            buffer.push_back({beam_dt[n_kept], beam_dE[n_kept]});
+            buffer.push_back({beam_dt[i], beam_dE[i]});
+        } else {
+            beam_dt[n_kept] = beam_dt[i];
+            beam_dE[n_kept] = beam_dE[i];
+            n_kept++;
+        }
+    }
+
+    if (buffer.empty())
+        return;
+
+#ifdef PARALLEL
+    __gnu_parallel::sort(buffer.begin(), buffer.end());
+#else
+    std::sort(buffer.begin(), buffer.end());
+#endif
+
+    // Merge from the end, the kept particles being at the beginning
+    int i = n_kept - 1;
+    int j = (int) buffer.size() - 1;
+    for (int k = n_macroparticles - 1; j >= 0; k--) {
+        if (i >= 0 && beam_dt[i] > buffer[j].dt) {
+            beam_dt[k] = beam_dt[i];
+            beam_dE[k] = beam_dE[i];
+            i--;
+        } else {
+            beam_dt[k] = buffer[j].dt;
+            beam_dE[k] = buffer[j].de;
+            j--;
+        }
+    }
+}
+
+#endif // _MUSIC_SORT_H_
@@ -17,12 +17,7 @@ Project website: http://blond.web.cern.ch/
 #include "exp.h"
 
 #include "openmp.h"
-
-#ifdef PARALLEL
-#include <parallel/algorithm>
-#else
-#include <algorithm>
-#endif
+#include "music_sort.h"
 
 #include <cmath>
 #include <chrono>
@@ -32,18 +27,6 @@ Project website: http://blond.web.cern.ch/
 using namespace vdt;
 
 
-// Definition of struct particle
-template <typename T>
-struct particle {
-    T de;
-    T dt;
-    bool operator<(const particle &o) const
-    {
-        return dt < o.dt;
-    }
-};
-
-
 extern "C" void music_track(double *__restrict__ beam_dt,
                             double *__restrict__ beam_dE,
                             double *__restrict__ induced_voltage,
@@ -85,19 +68,9 @@ extern "C" void music_track(double *__restrict__ beam_dt,
     */
 
 
-    // Particle sorting with respect to dt
-    std::vector<particle<double>> particles; particles.reserve(n_macroparticles);
-    for (int i = 0; i < n_macroparticles; i++)
-        particles.push_back({beam_dE[i], beam_dt[i]});
-#ifdef PARALLEL
-    __gnu_parallel::sort(particles.begin(), particles.end());
-#else
-    std::sort(particles.begin(), particles.end());
-#endif
-    for (int i = 0; i < n_macroparticles; i++) {
-        beam_dE[i] = particles[i].de;
-        beam_dt[i] = particles[i].dt;
-    }
+    // Particle sorting with respect to dt, adaptive since the particles are
+    // kept sorted from one turn to the next
+    music_sort(beam_dt, beam_dE, n_macroparticles);
 
     // MuSiC algorithm
     beam_dE[0] += induced_voltage[0];
@@ -151,19 +124,9 @@ extern "C" void music_track_multiturn(double *__restrict__ beam_dt,
     */
 
 
-    // Particle sorting with respect to dt
-    std::vector<particle<double>> particles; particles.reserve(n_macroparticles);
-    for (int i = 0; i < n_macroparticles; i++)
-        particles.push_back({beam_dE[i], beam_dt[i]});
-#ifdef PARALLEL
-    __gnu_parallel::sort(particles.begin(), particles.end());
-#else
-    std::sort(particles.begin(), particles.end());
-#endif
-    for (int i = 0; i < n_macroparticles; i++) {
-        beam_dE[i] = particles[i].de;
-        beam_dt[i] = particles[i].dt;
-    }
+    // Particle sorting with respect to dt, adaptive since the particles are
+    // kept sorted from one turn to the next
+    music_sort(beam_dt, beam_dE, n_macroparticles);
 
     // First computation of MuSiC relative to the voltage coming from the
     // previous turn
@@ -258,19 +221,9 @@ extern "C" void music_trackf(float *__restrict__ beam_dt,
     */
 
 
-    // Particle sorting with respect to dt
-    std::vector<particle<float>> particles; particles.reserve(n_macroparticles);
-    for (int i = 0; i < n_macroparticles; i++)
-        particles.push_back({beam_dE[i], beam_dt[i]});
-#ifdef PARALLEL
-    __gnu_parallel::sort(particles.begin(), particles.end());
-#else
-    std::sort(particles.begin(), particles.end());
-#endif
-    for (int i = 0; i < n_macroparticles; i++) {
-        beam_dE[i] = particles[i].de;
-        beam_dt[i] = particles[i].dt;
-    }
+    // Particle sorting with respect to dt, adaptive since the particles are
+    // kept sorted from one turn to the next
+    music_sort(beam_dt, beam_dE, n_macroparticles);
 
     // MuSiC algorithm
     beam_dE[0] += induced_voltage[0];
@@ -324,19 +277,9 @@ extern "C" void music_track_multiturnf(float *__restrict__ beam_dt,
     */
 
 
-    // Particle sorting with respect to dt
-    std::vector<particle<float>> particles; particles.reserve(n_macroparticles);
-    for (int i = 0; i < n_macroparticles; i++)
-        particles.push_back({beam_dE[i], beam_dt[i]});
-#ifdef PARALLEL
-    __gnu_parallel::sort(particles.begin(), particles.end());
-#else
-    std::sort(particles.begin(), particles.end());
-#endif
-    for (int i = 0; i < n_macroparticles; i++) {
-        beam_dE[i] = particles[i].de;
-        beam_dt[i] = particles[i].dt;
-    }
+    // Particle sorting with respect to dt, adaptive since the particles are
+    // kept sorted from one turn to the next
+    music_sort(beam_dt, beam_dE, n_macroparticles);
 
     // First computation of MuSiC relative to the voltage coming from the
     // previous turn
@@ -389,4 +332,21 @@ extern "C" void music_track_multiturnf(float *__restrict__ beam_dt,
 }
 
 
+extern "C" void music_sort_particles(double *__restrict__ beam_dt,
+                                     double *__restrict__ beam_dE,
+                                     const int n_macroparticles)
+{
+    /*
+    This function sorts in place the particles with respect to dt, the
+    particles being almost sorted from the previous turn.
+    */
+    music_sort(beam_dt, beam_dE, n_macroparticles);
+}
 
+
+extern "C" void music_sort_particlesf(float *__restrict__ beam_dt,
+                                      float *__restrict__ beam_dE,
+                                      const int n_macroparticles)
+{
+    music_sort(beam_dt, beam_dE, n_macroparticles);
+}
@@ -0,0 +1,258 @@
+/*
+Copyright 2014-2017 CERN. This software is distributed under the
+terms of the GNU General Public Licence version 3 (GPL Version 3),
+copied verbatim in the file LICENCE.md.
+In applying this licence, CERN does not waive the privileges and immunities
+granted to it by virtue of its status as an Intergovernmental Organization or
+submit itself to any jurisdiction.
+Project website: http://blond.web.cern.ch/
+*/
+
+// Multi-threaded C++ routines for the MuSiC algorithm.
+// Each step of the MuSiC recurrence is an affine map of the 2-component
+// state, x_{i+1} = M(dt_{i+1} - dt_i) x_i + (1, 0), and affine maps compose
+// associatively. The sorted particles are split in one chunk per thread: each
+// thread composes the maps of its chunk, the composed maps are scanned to get
+// the state at the start of every chunk, and each thread then applies the
+// recurrence to its chunk from the correct state.
+
+#include "sin.h"
+#include "cos.h"
+#include "exp.h"
+
+#include "openmp.h"
+#include "music_sort.h"
+
+#include <cmath>
+#include <vector>
+
+using namespace vdt;
+
+
+static inline double music_exp(const double x) { return fast_exp(x); }
+static inline float music_exp(const float x) { return fast_expf(x); }
+static inline void music_sincos(const double x, double &s, double &c)
+{
+    fast_sincos(x, s, c);
+}
+static inline void music_sincos(const float x, float &s, float &c)
+{
+    fast_sincosf(x, s, c);
+}
+
+
+// Affine map x -> A x + b of the MuSiC state
+template <typename T>
+struct music_map {
+    T a11, a12, a21, a22, b1, b2;
+};
+
+
+template <typename T>
+static void music_track_parallel_t(T *__restrict__ beam_dt,
+                                   T *__restrict__ beam_dE,
+                                   T *__restrict__ induced_voltage,
+                                   T *__restrict__ array_parameters,
+                                   const int n_macroparticles,
+                                   const T alpha,
+                                   const T omega_bar,
+                                   const T cnst,
+                                   const T coeff1,
+                                   const T coeff2,
+                                   const T coeff3,
+                                   const T coeff4,
+                                   const bool multi_turn)
+{
+    // Particle sorting with respect to dt, adaptive since the particles are
+    // kept sorted from one turn to the next
+    music_sort(beam_dt, beam_dE, n_macroparticles);
+
+    // State after the first particle
+    T first_component = 1;
+    T second_component = 0;
+    if (multi_turn) {
+        // Voltage coming from the previous turn
+        const T time_difference_0 = beam_dt[0] + array_parameters[2]
+                                    - array_parameters[3];
+        const T exp_term = music_exp(-alpha * time_difference_0);
+        T sin_term, cos_term;
+        music_sincos(omega_bar * time_difference_0, sin_term, cos_term);
+
+        const T product_first_component =
+            exp_term * ((cos_term + coeff1 * sin_term)
+                        * array_parameters[0] + coeff2 * sin_term
+                        * array_parameters[1]);
+        const T product_second_component =
+            exp_term * (coeff3 * sin_term * array_parameters[0]
+                        + (cos_term + coeff4 * sin_term)
+                        * array_parameters[1]);
+
+        induced_voltage[0] = cnst * (0.5 + product_first_component);
+        first_component = product_first_component + 1;
+        second_component = product_second_component;
+    }
+    beam_dE[0] += induced_voltage[0];
+
+    // exp*cos and exp*sin terms of the n_macroparticles - 1 steps
+    const int n_steps = n_macroparticles - 1;
+    std::vector<T> exp_cos(n_steps > 0 ? n_steps : 0);
+    std::vector<T> exp_sin(n_steps > 0 ? n_steps : 0);
+
+    // Composed map of each chunk, state at the start of each chunk
+    std::vector<music_map<T>> maps(omp_get_max_threads());
+    std::vector<T> start_first(omp_get_max_threads() + 1);
+    std::vector<T> start_second(omp_get_max_threads() + 1);
+
+    #pragma omp parallel
+    {
+        const int id = omp_get_thread_num();
+        const int threads = omp_get_num_threads();
+        const int start = (int)((long long) n_steps * id / threads);
+        const int end = (int)((long long) n_steps * (id + 1) / threads);
+
+        // Composition of the maps of the chunk
+        music_map<T> map = {1, 0, 0, 1, 0, 0};
+        for (int i = start; i < end; i++) {
+            const T time_difference = beam_dt[i + 1] - beam_dt[i];
+            const T exp_term = music_exp(-alpha * time_difference);
+            T sin_term, cos_term;
+            music_sincos(omega_bar * time_difference, sin_term, cos_term);
+            exp_cos[i] = exp_term * cos_term;
+            exp_sin[i] = exp_term * sin_term;
+
+            const T m11 = exp_cos[i] + coeff1 * exp_sin[i];
+            const T m12 = coeff2 * exp_sin[i];
+            const T m21 = coeff3 * exp_sin[i];
+            const T m22 = exp_cos[i] + coeff4 * exp_sin[i];
+
+            const music_map<T> composed = {
+                m11 * map.a11 + m12 * map.a21, m11 * map.a12 + m12 * map.a22,
+                m21 * map.a11 + m22 * map.a21, m21 * map.a12 + m22 * map.a22,
+                m11 * map.b1 + m12 * map.b2 + 1, m21 * map.b1 + m22 * map.b2
+            };
+            map = composed;
+        }
+        maps[id] = map;
+
+        #pragma omp barrier
+        #pragma omp single
+        {
+            // Scan of the composed maps
+            start_first[0] = first_component;
+            start_second[0] = second_component;
+            for (int t = 0; t < threads; t++) {
+                start_first[t + 1] = maps[t].a11 * start_first[t]
+                                     + maps[t].a12 * start_second[t]
+                                     + maps[t].b1;
+                start_second[t + 1] = maps[t].a21 * start_first[t]
+                                      + maps[t].a22 * start_second[t]
+                                      + maps[t].b2;
+            }
+        }
+
+        // MuSiC algorithm on the chunk
+        T input_first_component = start_first[id];
+        T input_second_component = start_second[id];
+        for (int i = start; i < end; i++) {
+            const T product_first_component =
+                (exp_cos[i] + coeff1 * exp_sin[i]) * input_first_component
+                + coeff2 * exp_sin[i] * input_second_component;
+            const T product_second_component =
+                coeff3 * exp_sin[i] * input_first_component
+                + (exp_cos[i] + coeff4 * exp_sin[i]) * input_second_component;
+
+            induced_voltage[i + 1] = cnst * (0.5 + product_first_component);
+            beam_dE[i + 1] += induced_voltage[i + 1];
+            input_first_component = product_first_component + 1;
+            input_second_component = product_second_component;
+        }
+
+        #pragma omp barrier
+        #pragma omp single
+        {
+            array_parameters[0] = start_first[threads];
+            array_parameters[1] = start_second[threads];
+            array_parameters[3] = beam_dt[n_macroparticles - 1];
+        }
+    }
+}
+
+
+extern "C" void music_track_parallel(double *__restrict__ beam_dt,
+                                     double *__restrict__ beam_dE,
+                                     double *__restrict__ induced_voltage,
+                                     double *__restrict__ array_parameters,
+                                     const int n_macroparticles,
+                                     const double alpha,
+                                     const double omega_bar,
+                                     const double cnst,
+                                     const double coeff1,
+                                     const double coeff2,
+                                     const double coeff3,
+                                     const double coeff4)
+{
+    music_track_parallel_t<double>(beam_dt, beam_dE, induced_voltage,
+                                   array_parameters, n_macroparticles,
+                                   alpha, omega_bar, cnst, coeff1, coeff2,
+                                   coeff3, coeff4, false);
+}
+
+
+extern "C" void music_track_multiturn_parallel(double *__restrict__ beam_dt,
+                                               double *__restrict__ beam_dE,
+                                               double *__restrict__ induced_voltage,
+                                               double *__restrict__ array_parameters,
+                                               const int n_macroparticles,
+                                               const double alpha,
+                                               const double omega_bar,
+                                               const double cnst,
+                                               const double coeff1,
+                                               const double coeff2,
+                                               const double coeff3,
+                                               const double coeff4)
+{
+    music_track_parallel_t<double>(beam_dt, beam_dE, induced_voltage,
+                                   array_parameters, n_macroparticles,
+                                   alpha, omega_bar, cnst, coeff1, coeff2,
+                                   coeff3, coeff4, true);
+}
+
+
+extern "C" void music_track_parallelf(float *__restrict__ beam_dt,
+                                      float *__restrict__ beam_dE,
+                                      float *__restrict__ induced_voltage,
+                                      float *__restrict__ array_parameters,
+                                      const int n_macroparticles,
+                                      const float alpha,
+                                      const float omega_bar,
+                                      const float cnst,
+                                      const float coeff1,
+                                      const float coeff2,
+                                      const float coeff3,
+                                      const float coeff4)
+{
+    music_track_parallel_t<float>(beam_dt, beam_dE, induced_voltage,
+                                  array_parameters, n_macroparticles,
+                                  alpha, omega_bar, cnst, coeff1, coeff2,
+                                  coeff3, coeff4, false);
+}
+
+
+extern "C" void music_track_multiturn_parallelf(float *__restrict__ beam_dt,
+                                                float *__restrict__ beam_dE,
+                                                float *__restrict__ induced_voltage,
+                                                float *__restrict__ array_parameters,
+                                                const int n_macroparticles,
+                                                const float alpha,
+                                                const float omega_bar,
+                                                const float cnst,
+                                                const float coeff1,
+                                                const float coeff2,
+                                                const float coeff3,
+                                                const float coeff4)
+{
+    music_track_parallel_t<float>(beam_dt, beam_dE, induced_voltage,
+                                  array_parameters, n_macroparticles,
+                                  alpha, omega_bar, cnst, coeff1, coeff2,
+                                  coeff3, coeff4, true);
+}
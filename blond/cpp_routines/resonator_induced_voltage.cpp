@@ -0,0 +1,120 @@
+/*
+Copyright 2016 CERN. This software is distributed under the
+terms of the GNU General Public Licence version 3 (GPL Version 3),
+copied verbatim in the file LICENCE.md.
+In applying this licence, CERN does not waive the privileges and immunities
+granted to it by virtue of its status as an Intergovernmental Organization or
+submit itself to any jurisdiction.
+Project website: http://blond.web.cern.ch/
+*/
+
+// Optimised C++ routine that calculates the induced voltage of resonators
+// for a linearly interpolated line density, with a recursive filter over the
+// sorted bins. For every resonator r and time t it computes
+//   sum_k w_k * K_r * ( H(t - t_k) * Re[c_r exp(p_r (t - t_k))] - sign(t - t_k) )
+// with p_r = -imOmegaP_r + i reOmegaP_r, c_r = 2 - i / Qtilde_r and H the
+// Heaviside function (H(0) = 1/2), in O(n_bins + n_time) per resonator.
+
+#include <complex>
+#include <cmath>
+
+
+template <typename T>
+static void resonator_induced_voltage_t(const T * __restrict__ weights,
+                                        const T * __restrict__ bin_centers,
+                                        const int n_bins,
+                                        const T * __restrict__ time_array,
+                                        const int n_time,
+                                        const T * __restrict__ K,
+                                        const T * __restrict__ reOmegaP,
+                                        const T * __restrict__ imOmegaP,
+                                        const T * __restrict__ Qtilde,
+                                        const int n_resonators,
+                                        T * __restrict__ induced_voltage)
+{
+    // bin_centers and time_array must be sorted in increasing order
+
+    for (int i = 0; i < n_time; i++)
+        induced_voltage[i] = 0.;
+
+    double total = 0.;
+    for (int k = 0; k < n_bins; k++)
+        total += weights[k];
+
+    for (int r = 0; r < n_resonators; r++) {
+        const std::complex<double> p(-imOmegaP[r], reOmegaP[r]);
+        const std::complex<double> c(2., -1. / Qtilde[r]);
+
+        // Sum over the bins on the left of t_state of w_k exp(p (t_state - t_k))
+        std::complex<double> state(0., 0.);
+        double t_state = n_bins > 0 ? bin_centers[0] : 0.;
+        // Sum of the weights on the left of the current time
+        double sum_left = 0.;
+        int k = 0;
+
+        for (int i = 0; i < n_time; i++) {
+            const double t = time_array[i];
+
+            // Bins strictly on the left of t
+            while (k < n_bins && bin_centers[k] < t) {
+                state = state * std::exp(p * (bin_centers[k] - t_state))
+                        + (double) weights[k];
+                t_state = bin_centers[k];
+                sum_left += weights[k];
+                k++;
+            }
+
+            // Bins exactly at t
+            double sum_equal = 0.;
+            int k_equal = k;
+            while (k_equal < n_bins && bin_centers[k_equal] == t) {
+                sum_equal += weights[k_equal];
+                k_equal++;
+            }
+
+            const double wake = std::real(c * state * std::exp(p * (t - t_state)))
+                                + 0.5 * std::real(c) * sum_equal;
+            const double sign = sum_left - (total - sum_left - sum_equal);
+
+            induced_voltage[i] += K[r] * (wake - sign);
+        }
+    }
+}
+
+
+extern "C" void resonator_induced_voltage(const double * __restrict__ weights,
+                                          const double * __restrict__ bin_centers,
+                                          const int n_bins,
+                                          const double * __restrict__ time_array,
+                                          const int n_time,
+                                          const double * __restrict__ K,
+                                          const double * __restrict__ reOmegaP,
+                                          const double * __restrict__ imOmegaP,
+                                          const double * __restrict__ Qtilde,
+                                          const int n_resonators,
+                                          double * __restrict__ induced_voltage)
+{
+    resonator_induced_voltage_t<double>(weights, bin_centers, n_bins,
+                                        time_array, n_time, K, reOmegaP,
+                                        imOmegaP, Qtilde, n_resonators,
+                                        induced_voltage);
+}
+
+
+extern "C" void resonator_induced_voltagef(const float * __restrict__ weights,
+                                           const float * __restrict__ bin_centers,
+                                           const int n_bins,
+                                           const float * __restrict__ time_array,
+                                           const int n_time,
+                                           const float * __restrict__ K,
+                                           const float * __restrict__ reOmegaP,
+                                           const float * __restrict__ imOmegaP,
+                                           const float * __restrict__ Qtilde,
+                                           const int n_resonators,
+                                           float * __restrict__ induced_voltage)
+{
+    resonator_induced_voltage_t<float>(weights, bin_centers, n_bins,
+                                       time_array, n_time, K, reOmegaP,
+                                       imOmegaP, Qtilde, n_resonators,
+                                       induced_voltage);
+}
@@ -88,16 +88,23 @@ class TotalInducedVoltage(object):
         """
         # For MPI, to avoid calulating beam spectrum multiple times
         beam_spectrum_dict = {}
-        temp_induced_voltage = 0
+
+        # The sum is a new array at every turn, so that the induced voltage
+        # kept from a previous turn is not overwritten
+        temp_induced_voltage = np.zeros(
+            int(self.profile.n_slices), dtype=bm.precision.real_t, order='C')
 
         for induced_voltage_object in self.induced_voltage_list:
             induced_voltage_object.induced_voltage_generation(
                 beam_spectrum_dict)
-            temp_induced_voltage += \
+            induced_voltage = \
                 induced_voltage_object.induced_voltage[:self.profile.n_slices]
+            if len(induced_voltage) < len(temp_induced_voltage):
+                temp_induced_voltage = \
+                    temp_induced_voltage[:len(induced_voltage)]
+            temp_induced_voltage += induced_voltage
 
-        self.induced_voltage = temp_induced_voltage.astype(
-            dtype=bm.precision.real_t, order='C', copy=False)
+        self.induced_voltage = temp_induced_voltage
 
     # Can be faster than the normal induced voltage sum
     def induced_voltage_sum_packed(self):
@@ -162,7 +169,8 @@ class _InducedVoltage(object):
     multi_turn_wake : boolean, optional
         Multi-turn wake enable flag
     mtw_mode : boolean, optional
-        Multi-turn wake mode can be 'freq' or 'time' (default)
+        Multi-turn wake mode can be 'freq', 'time' (default) or
+        'recursive' (Resonators sources only, see induced_voltage_mtw_recursive)
     RFParams : object, optional
         RFStation object for turn counter and revolution period
     use_regular_fft : boolean
@@ -187,7 +195,8 @@ class _InducedVoltage(object):
     multi_turn_wake : boolean
         Multi-turn wake enable flag
     mtw_mode : boolean
-        Multi-turn wake mode can be 'freq' or 'time' (default)
+        Multi-turn wake mode can be 'freq', 'time' (default) or
+        'recursive' (Resonators sources only, see induced_voltage_mtw_recursive)
     use_regular_fft : boolean
         User set value to use (default) or not regular numbers for FFTs
     """
@@ -271,64 +280,72 @@ class _InducedVoltage(object):
 
             self.front_wake_buffer = 0
 
-            if self.mtw_mode == 'freq':
-                # In frequency domain, an extra buffer for a revolution turn is
-                # needed due to the circular time shift in frequency domain
-                self.buffer_size = \
-                    np.ceil(np.max(self.RFParams.t_rev) /
-                            self.profile.bin_size)
-                # Extending the buffer to reduce the effect of the front wake
-                self.buffer_size += \
-                    np.ceil(np.max(self.buffer_extra) / self.profile.bin_size)
-                self.n_mtw_memory += int(self.buffer_size)
-                # Using next regular for FFTs speedup
-                if self.use_regular_fft:
-                    self.n_mtw_fft = next_regular(self.n_mtw_memory)
-                else:
-                    self.n_mtw_fft = self.n_mtw_memory
-                # Frequency and omega arrays
-                self.freq_mtw = \
-                    bm.rfftfreq(self.n_mtw_fft, d=self.profile.bin_size)
-                self.omegaj_mtw = 2.0j * np.pi * self.freq_mtw
-                # Selecting time-shift method
-                self.shift_trev = self.shift_trev_freq
+            if self.mtw_mode == 'recursive':
+                # The previous turns are accounted for through the state of
+                # the resonators, no memory array is needed
+                self.mtw_recursive_setup()
+
+                # Select induced voltage generation method to be used
+                self.induced_voltage_generation = \
+                    self.induced_voltage_mtw_recursive
             else:
-                # Selecting time-shift method
-                self.shift_trev = self.shift_trev_time
-                # Time array
-                self.time_mtw = np.linspace(0, self.wake_length,
-                                            self.n_mtw_memory, endpoint=False,
-                                            dtype=bm.precision.real_t)
-
-            # Array to add and shift in time the multi-turn wake over the turns
-            self.mtw_memory = np.zeros(self.n_mtw_memory,
-                                       dtype=bm.precision.real_t, order='C')
-
-            # Select induced voltage generation method to be used
-            self.induced_voltage_generation = self.induced_voltage_mtw
+                self.mtw_memory_setup()
+
+                # Select induced voltage generation method to be used
+                self.induced_voltage_generation = self.induced_voltage_mtw
         else:
             self.induced_voltage_generation = self.induced_voltage_1turn
 
-    def induced_voltage_1turn(self, beam_spectrum_dict={}):
+    def allocate_buffers(self):
+        """
+        Allocates the work arrays of induced_voltage_1turn, so that no array
+        is allocated at every turn. To be run when the impedance or the
+        profile changes (called by process()).
+        """
+
+        self.total_impedance = self.total_impedance.astype(
+            dtype=bm.precision.complex_t, order='C', copy=False)
+
+        # Product of the impedance and of the beam spectrum
+        self._spectrum_buffer = np.empty(self.n_fft//2 + 1,
+                                         dtype=bm.precision.complex_t,
+                                         order='C')
+        # Inverse FFT of the product, of the default irfft length
+        self._irfft_buffer = np.empty(2 * (self.n_fft//2),
+                                      dtype=bm.precision.real_t, order='C')
+        # Induced voltage of the current turn
+        self._induced_voltage_buffer = np.empty(
+            min(self.n_induced_voltage, len(self._irfft_buffer)),
+            dtype=bm.precision.real_t, order='C')
+
+    def induced_voltage_1turn(self, beam_spectrum_dict=None):
         """
         Method to calculate the induced voltage at the current turn. DFTs are
         used for calculations in time and frequency domain (see classes below)
+        The calculations are done in the arrays of allocate_buffers(); the
+        induced_voltage array is overwritten at the next turn.
         """
 
+        if beam_spectrum_dict is None:
+            beam_spectrum_dict = {}
+
         if self.n_fft not in beam_spectrum_dict:
             self.profile.beam_spectrum_generation(self.n_fft)
             beam_spectrum_dict[self.n_fft] = self.profile.beam_spectrum
 
-        # self.profile.beam_spectrum_generation(self.n_fft)
         beam_spectrum = beam_spectrum_dict[self.n_fft]
 
-        induced_voltage = - (self.beam.Particle.charge * e * self.beam.ratio
-                             * bm.irfft(self.total_impedance.astype(dtype=bm.precision.complex_t, order='C', copy=False) * beam_spectrum))
+        np.multiply(self.total_impedance, beam_spectrum,
+                    out=self._spectrum_buffer)
+        bm.irfft(self._spectrum_buffer, len(self._irfft_buffer),
+                 result=self._irfft_buffer)
+        np.multiply(self._irfft_buffer[:len(self._induced_voltage_buffer)],
+                    - (self.beam.Particle.charge * e * self.beam.ratio),
+                    out=self._induced_voltage_buffer)
 
-        self.induced_voltage = induced_voltage[:self.n_induced_voltage].astype(
-            dtype=bm.precision.real_t, order='C', copy=False)
+        self.induced_voltage = self._induced_voltage_buffer
 
-    def induced_voltage_mtw(self, beam_spectrum_dict={}):
+    def induced_voltage_mtw(self, beam_spectrum_dict=None):
         """
         Method to calculate the induced voltage taking into account the effect
         from previous passages (multi-turn wake)
@@ -351,6 +368,143 @@ class _InducedVoltage(object):
 
         self.induced_voltage = self.mtw_memory[:self.n_induced_voltage]
 
+    def mtw_memory_setup(self):
+        """
+        Method to prepare the memory array of the 'freq' and 'time'
+        multi-turn wake modes
+        """
+
+        if self.mtw_mode == 'freq':
+            # In frequency domain, an extra buffer for a revolution turn is
+            # needed due to the circular time shift in frequency domain
+            self.buffer_size = \
+                np.ceil(np.max(self.RFParams.t_rev) /
+                        self.profile.bin_size)
+            # Extending the buffer to reduce the effect of the front wake
+            self.buffer_size += \
+                np.ceil(np.max(self.buffer_extra) / self.profile.bin_size)
+            self.n_mtw_memory += int(self.buffer_size)
+            # Using next regular for FFTs speedup
+            if self.use_regular_fft:
+                self.n_mtw_fft = next_regular(self.n_mtw_memory)
+            else:
+                self.n_mtw_fft = self.n_mtw_memory
+            # Frequency and omega arrays
+            self.freq_mtw = \
+                bm.rfftfreq(self.n_mtw_fft, d=self.profile.bin_size)
+            self.omegaj_mtw = 2.0j * np.pi * self.freq_mtw
+            # Selecting time-shift method
+            self.shift_trev = self.shift_trev_freq
+        else:
+            # Selecting time-shift method
+            self.shift_trev = self.shift_trev_time
+            # Time array
+            self.time_mtw = np.linspace(0, self.wake_length,
+                                        self.n_mtw_memory, endpoint=False,
+                                        dtype=bm.precision.real_t)
+
+        # Array to add and shift in time the multi-turn wake over the turns
+        self.mtw_memory = np.zeros(self.n_mtw_memory,
+                                   dtype=bm.precision.real_t, order='C')
+
+    def mtw_recursive_setup(self):
+        r"""
+        Method to prepare the recursive multi-turn wake. The wake of a
+        resonator is, for :math:`t > 0`,
+        :math:`W(t) = \mathrm{Re}\left[C e^{s t}\right]` with
+        :math:`s = -\alpha + i\bar{\omega}` and
+        :math:`C = 2 \alpha R_S (1 + i \alpha/\bar{\omega})`, so that the
+        wake of all the previous turns is carried by one complex state per
+        resonator.
+        """
+
+        if hasattr(self, 'wake_source_list'):
+            sources = self.wake_source_list
+        else:
+            sources = self.impedance_source_list
+
+        R_S, omega_R, Q = [], [], []
+        for source in sources:
+            if not (hasattr(source, 'R_S') and hasattr(source, 'Q')
+                    and hasattr(source, 'omega_R')):
+                # MTWModeError
+                raise RuntimeError("ERROR in _InducedVoltage: the " +
+                                   "'recursive' multi-turn wake mode " +
+                                   "requires Resonators sources only")
+            R_S.append(source.R_S)
+            omega_R.append(source.omega_R)
+            Q.append(source.Q)
+        R_S = np.concatenate(R_S)
+        omega_R = np.concatenate(omega_R)
+        Q = np.concatenate(Q)
+
+        if np.any(Q <= 0.5):
+            # ResonatorError
+            raise RuntimeError("ERROR in _InducedVoltage: the 'recursive' " +
+                               "multi-turn wake mode requires all quality " +
+                               "factors Q to be larger than 0.5")
+
+        alpha = omega_R / (2 * Q)
+        omega_bar = np.sqrt(omega_R**2 - alpha**2)
+
+        # Complex frequencies and amplitudes of the resonator wakes
+        self.mtw_s = -alpha + 1j * omega_bar
+        self.mtw_amplitude = 2 * alpha * R_S * (1 + 1j * alpha / omega_bar)
+
+        # Time of the induced voltage points, relative to the first bin,
+        # and of the profile bins, relative to the last bin, so that none of
+        # the exponentials grows (e.g. for low Q or high frequencies)
+        time_voltage = self.profile.bin_size * np.arange(
+            self.n_induced_voltage)
+        time_profile = self.profile.bin_centers - self.profile.bin_centers[-1]
+        self.mtw_exp_voltage = np.exp(np.outer(self.mtw_s, time_voltage))
+        self.mtw_exp_profile = np.exp(np.outer(-self.mtw_s, time_profile))
+
+        # Time from the first voltage point to the last bin
+        self.mtw_span = self.profile.bin_centers[-1] \
+            - self.profile.bin_centers[0]
+
+        # Wake state of the previous turns, and profile contribution of the
+        # last turn, for each resonator
+        self.mtw_state = np.zeros(len(self.mtw_s), dtype=complex)
+        self.mtw_last_turn = np.zeros(len(self.mtw_s), dtype=complex)
+
+    def induced_voltage_mtw_recursive(self, beam_spectrum_dict=None):
+        r"""
+        Method to calculate the induced voltage taking into account the effect
+        from previous passages, for resonator wakes. The wake of the previous
+        turns is propagated by one revolution period with a recursive update
+        of the state of each resonator,
+        :math:`S \leftarrow e^{s T_{rev}} S + e^{s (T_{rev} - t_L)}
+        \sum_j \lambda_j e^{-s (t_j - t_L)}`, :math:`t_L` being the time of
+        the last bin, so that the cost scales with the number of slices and not with the
+        length of the wake memory. All the previous turns are included,
+        independently of the wake length.
+        """
+
+        t_rev = self.RFParams.t_rev[self.RFParams.counter[0]]
+        self.mtw_state = np.exp(self.mtw_s * t_rev) * self.mtw_state \
+            + np.exp(self.mtw_s * (t_rev - self.mtw_span)) \
+            * self.mtw_last_turn
+
+        # Induced voltage of the current turn calculation
+        self.induced_voltage_1turn(beam_spectrum_dict)
+
+        # Setting to zero to the last part to remove the contribution from the
+        # front wake
+        self.induced_voltage[self.n_induced_voltage -
+                             self.front_wake_buffer:] = 0
+
+        # Add the induced voltage of the previous turns
+        self.induced_voltage += np.real(
+            (self.mtw_amplitude * self.mtw_state).dot(
+                self.mtw_exp_voltage[:, :len(self.induced_voltage)]))
+
+        # Contribution of the current turn to the wake of the next turns
+        self.mtw_last_turn = - (self.beam.Particle.charge * e *
+                                self.beam.ratio) * self.mtw_exp_profile.dot(
+            self.profile.n_macroparticles)
+
     def shift_trev_freq(self):
         """
         Method to shift the induced voltage by a revolution period in the
@@ -410,11 +564,15 @@ class InducedVoltageTime(_InducedVoltage):
     RFParams : object, optional
         RFStation object for turn counter and revolution period
     mtw_mode : boolean, optional
-        Multi-turn wake mode can be 'freq' or 'time' (default)
+        Multi-turn wake mode can be 'freq', 'time' (default) or
+        'recursive' (Resonators sources only, see induced_voltage_mtw_recursive)
     use_regular_fft : boolean
         use the next_regular function to ensure regular number for FFT
         calculations (default is True for efficient calculations, for
         better control of the sampling frequency False is preferred)
+    cache : object, optional
+        ImpedanceCache object used to load the wakes of sources already
+        evaluated on the same time array instead of recomputing them
 
     Attributes
     ----------
@@ -424,15 +582,20 @@ class InducedVoltageTime(_InducedVoltage):
         Total wake array of all sources in :math:`\Omega / s`
     use_regular_fft : boolean
         User set value to use (default) or not regular numbers for FFTs
+    cache : object
+        ImpedanceCache object (None if not used)
     """
 
     def __init__(self, Beam, Profile, wake_source_list, wake_length=None,
                  multi_turn_wake=False, RFParams=None, mtw_mode=None,
-                 use_regular_fft=True):
+                 use_regular_fft=True, cache=None):
 
         # Wake sources list (e.g. list of Resonator objects)
         self.wake_source_list = wake_source_list
 
+        # Cache of the evaluated wakes (optional)
+        self.cache = cache
+
         # Total wake array of all sources in :math:`\Omega / s`
         self.total_wake = 0
 
@@ -472,14 +635,20 @@ class InducedVoltageTime(_InducedVoltage):
         # Processing the wakes
         self.sum_wakes(self.time)
 
+        self.allocate_buffers()
+
     def sum_wakes(self, time_array):
         """
         Summing all the wake contributions in one total wake.
         """
 
-        self.total_wake = np.zeros(time_array.shape)
+        self.total_wake = np.zeros(time_array.shape,
+                                   dtype=bm.precision.real_t)
         for wake_object in self.wake_source_list:
-            wake_object.wake_calc(time_array)
+            if self.cache is not None:
+                self.cache.wake_calc(wake_object, time_array)
+            else:
+                wake_object.wake_calc(time_array)
             self.total_wake += wake_object.wake
 
         # Pseudo-impedance used to calculate linear convolution in the
@@ -508,11 +677,15 @@ class InducedVoltageFreq(_InducedVoltage):
     RFParams : object, optional
         RFStation object for turn counter and revolution period
     mtw_mode : boolean, optional
-        Multi-turn wake mode can be 'freq' or 'time' (default)
+        Multi-turn wake mode can be 'freq', 'time' (default) or
+        'recursive' (Resonators sources only, see induced_voltage_mtw_recursive)
     use_regular_fft : boolean
         use the next_regular function to ensure regular number for FFT
         calculations (default is True for efficient calculations, for
         better control of the sampling frequency False is preferred)
+    cache : object, optional
+        ImpedanceCache object used to load the impedances of sources already
+        evaluated on the same frequency array instead of recomputing them
 
     Attributes
     ----------
@@ -524,16 +697,21 @@ class InducedVoltageFreq(_InducedVoltage):
         Lenght [s] of the front wake (if any) for multi-turn wake mode
     use_regular_fft : boolean
         User set value to use (default) or not regular numbers for FFTs
+    cache : object
+        ImpedanceCache object (None if not used)
     """
 
     def __init__(self, Beam, Profile, impedance_source_list,
                  frequency_resolution=None, multi_turn_wake=False,
                  front_wake_length=0, RFParams=None, mtw_mode=None,
-                 use_regular_fft=True):
+                 use_regular_fft=True, cache=None):
 
         # Impedance sources list (e.g. list of Resonator objects)
         self.impedance_source_list = impedance_source_list
 
+        # Cache of the evaluated impedances (optional)
+        self.cache = cache
+
         # Total impedance array of all sources in* :math:`\Omega`
         self.total_impedance = 0
 
@@ -578,6 +756,8 @@ class InducedVoltageFreq(_InducedVoltage):
         # Processing the impedances
         self.sum_impedances(self.freq)
 
+        self.allocate_buffers()
+
     def sum_impedances(self, freq):
         """
         Summing all the wake contributions in one total impedance.
@@ -587,7 +767,10 @@ class InducedVoltageFreq(_InducedVoltage):
             freq.shape, dtype=bm.precision.complex_t, order='C')
 
         for impedance_source in self.impedance_source_list:
-            impedance_source.imped_calc(freq)
+            if self.cache is not None:
+                self.cache.imped_calc(impedance_source, freq)
+            else:
+                impedance_source.imped_calc(freq)
             self.total_impedance += impedance_source.impedance
 
         # Factor relating Fourier transform and DFT
@@ -631,7 +814,7 @@ class InductiveImpedance(_InducedVoltage):
         # Call the __init__ method of the parent class
         _InducedVoltage.__init__(self, Beam, Profile, RFParams=RFParams)
 
-    def induced_voltage_1turn(self, beam_spectrum_dict={}):
+    def induced_voltage_1turn(self, beam_spectrum_dict=None):
         """
         Method to calculate the induced voltage through the derivative of the
         profile. The impedance must be a constant Z/n.
@@ -658,8 +841,14 @@ class InducedVoltageResonator(_InducedVoltage):
     density is sampled. If no timeArray is passed, the induced voltage is 
     evaluated at the points of the line density. This is nececassry of 
     compatability with other functions that calculate the induced voltage.
-    Currently, it requires the all quality factors :math:`Q>0.5`
-    Currently, only works for single turn.*
+    Currently, it requires the all quality factors :math:`Q>0.5`.
+    With method='matrix' the convolution is evaluated for every pair of time
+    value and bin; with method='recursive' the bins are swept once per
+    resonator with a recursive filter (bm.resonator_induced_voltage), at a
+    cost proportional to the number of bins plus the number of time values.
+    The multi-turn wake uses the 'recursive' mode of _InducedVoltage and
+    assumes that the time values of a turn are after the bins of the
+    previous turns.*
 
     Parameters
     ----------
@@ -673,6 +862,13 @@ class InducedVoltageResonator(_InducedVoltage):
         Array of time values where the induced voltage is calculated. 
         If left out, the induced voltage is calculated at the times of the line
         density.
+    method : str, optional
+        Evaluation of the convolution, 'matrix' (default) or 'recursive'
+    multi_turn_wake : boolean, optional
+        Multi-turn wake enable flag
+    RFParams : object, optional
+        RFStation object for turn counter and revolution period, needed for
+        the multi-turn wake
 
     Attributes
     ----------
@@ -693,17 +889,31 @@ class InducedVoltageResonator(_InducedVoltage):
         Resonators parameters
     n_resonators : int
         Number of resonators
+    method : str
+        Evaluation of the convolution, 'matrix' or 'recursive'
     induced_voltage : float array
         Computed induced voltage [V]
     """
 
-    def __init__(self, Beam, Profile, Resonators, timeArray=None):
+    def __init__(self, Beam, Profile, Resonators, timeArray=None,
+                 method='matrix', multi_turn_wake=False, RFParams=None):
 
         # Test if one or more quality factors is smaller than 0.5.
         if sum(Resonators.Q < 0.5) > 0:
             # ResonatorError
             raise RuntimeError('All quality factors Q must be larger than 0.5')
 
+        if method not in ['matrix', 'recursive']:
+            # MethodError
+            raise RuntimeError("ERROR in InducedVoltageResonator: method " +
+                               "should be 'matrix' or 'recursive'")
+        self.method = method
+
+        if multi_turn_wake and RFParams is None:
+            # MTWError
+            raise RuntimeError("ERROR in InducedVoltageResonator: the " +
+                               "multi-turn wake requires RFParams")
+
         # Copy of the Beam object in order to access the beam info.
         self.beam = Beam
         # Copy of the Profile object in order to access the line density.
@@ -735,40 +945,57 @@ class InducedVoltageResonator(_InducedVoltage):
         self._Qtilde = self.Q * np.sqrt(1. - 1./(4.*self.Q**2.))
         self._reOmegaP = self.omega_r * self._Qtilde / self.Q
         self._imOmegaP = self.omega_r / (2.*self.Q)
-
-        # Each the 'n_resonator' rows of the matrix holds the induced voltage
-        # at the 'n_time' time-values of one cavity. For internal use.
-        self._tmp_matrix = np.ones(
-            (self.n_resonators, self.n_time), dtype=bm.precision.real_t, order='C')
-
-        # Slopes of the line segments. For internal use.
-        self._kappa1 = np.zeros(
-            int(self.profile.n_slices-1), dtype=bm.precision.real_t, order='C')
-
-        # Matrix to hold n_times many tArray[t]-bin_centers arrays.
-        self._deltaT = np.zeros(
-            (self.n_time, self.profile.n_slices), dtype=bm.precision.real_t, order='C')
+        self._K = self.R / (2*self.omega_r*self.Q)
 
         # Call the __init__ method of the parent class [calls process()]
         _InducedVoltage.__init__(self, Beam, Profile, wake_length=None,
                                  frequency_resolution=None,
-                                 multi_turn_wake=False, RFParams=None, mtw_mode=None)
+                                 multi_turn_wake=multi_turn_wake,
+                                 RFParams=RFParams, mtw_mode='recursive')
 
     def process(self):
         r"""
         Reprocess the impedance contributions. To be run when slicing changes
         """
 
-        _InducedVoltage.process(self)
-
         # Since profile object changed, need to assign the proper dimensions to
-        # _kappa1 and _deltaT
+        # the internal arrays
+
+        # Slopes of the line segments. For internal use.
         self._kappa1 = np.zeros(
             int(self.profile.n_slices-1), dtype=bm.precision.real_t, order='C')
-        self._deltaT = np.zeros(
-            (self.n_time, self.profile.n_slices), dtype=bm.precision.real_t, order='C')
 
-    def induced_voltage_1turn(self, beam_spectrum_dict={}):
+        if self.method == 'matrix':
+            # Each the 'n_resonator' rows of the matrix holds the induced
+            # voltage at the 'n_time' time-values of one cavity.
+            self._tmp_matrix = np.ones(
+                (self.n_resonators, self.n_time), dtype=bm.precision.real_t,
+                order='C')
+            # Matrix to hold n_times many tArray[t]-bin_centers arrays.
+            self._deltaT = np.zeros(
+                (self.n_time, self.profile.n_slices),
+                dtype=bm.precision.real_t, order='C')
+        else:
+            # Differences of the slopes at the bins (line density weights of
+            # the recursive filter)
+            self._weights = np.zeros(
+                self.profile.n_slices, dtype=bm.precision.real_t, order='C')
+            # Time values sorted for the recursive filter
+            self._time_order = np.argsort(self.tArray, kind='stable')
+            self._tArray_sorted = np.ascontiguousarray(
+                self.tArray[self._time_order], dtype=bm.precision.real_t)
+            self._voltage_sorted = np.zeros(
+                self.n_time, dtype=bm.precision.real_t, order='C')
+            # Induced voltage in the order of tArray, reused over the turns
+            self._voltage_recursive = np.zeros(
+                self.n_time, dtype=bm.precision.real_t, order='C')
+
+        _InducedVoltage.process(self)
+
+        # The induced voltage is computed at the n_time values of tArray
+        self.n_induced_voltage = self.n_time
+
+    def induced_voltage_1turn(self, beam_spectrum_dict=None):
         r"""
         Method to calculate the induced voltage through linearily 
         interpolating the line density and applying the analytic equation
@@ -782,6 +1009,10 @@ class InducedVoltageResonator(_InducedVoltage):
             / (self.beam.n_macroparticles*self.profile.bin_size)
         # [:] makes kappa pass by reference
 
+        if self.method == 'recursive':
+            self.induced_voltage_recursive()
+            return
+
         for t in range(self.n_time):
             self._deltaT[t] = self.tArray[t]-self.profile.bin_centers
 
@@ -805,6 +1036,66 @@ class InducedVoltageResonator(_InducedVoltage):
         self.induced_voltage = self.induced_voltage.astype(
             dtype=bm.precision.real_t, order='C', copy=False)
 
+    def induced_voltage_recursive(self):
+        r"""
+        Method to calculate the induced voltage of the current slopes with
+        the recursive filter. Summing by parts, the sum over the line
+        segments becomes a sum over the bins of the slope differences
+        :math:`w_k = \kappa_{k-1} - \kappa_k`, which is swept once per
+        resonator.
+        """
+
+        self._weights[0] = -self._kappa1[0]
+        np.subtract(self._kappa1[:-1], self._kappa1[1:],
+                    out=self._weights[1:-1])
+        self._weights[-1] = self._kappa1[-1]
+
+        bm.resonator_induced_voltage(self._weights, self.profile.bin_centers,
+                                     self._tArray_sorted, self._K,
+                                     self._reOmegaP, self._imOmegaP,
+                                     self._Qtilde, result=self._voltage_sorted)
+
+        self.induced_voltage = self._voltage_recursive
+        self.induced_voltage[self._time_order] = self._voltage_sorted
+        self.induced_voltage *= -self.beam.Particle.charge*e \
+            * self.beam.n_macroparticles*self.beam.ratio
+
+    def mtw_recursive_setup(self):
+        r"""
+        Method to prepare the multi-turn wake of the resonators, see
+        _InducedVoltage.mtw_recursive_setup. For the previous turns the sign
+        terms of the convolution cancel out, so that their contribution is
+        :math:`K \mathrm{Re}\left[(2 - i/\tilde{Q}) S e^{s t}\right]`; the
+        slope differences are linear in the profile and are folded in
+        mtw_exp_profile.
+        """
+
+        self.mtw_s = -self._imOmegaP + 1j * self._reOmegaP
+        self.mtw_amplitude = self._K * (2 - 1j / self._Qtilde)
+
+        # Time of the induced voltage points, relative to the first one, and
+        # of the profile bins, relative to the last bin, so that none of the
+        # exponentials grows (e.g. for low Q or high frequencies)
+        time_voltage = self.tArray - np.min(self.tArray)
+        time_profile = self.profile.bin_centers - self.profile.bin_centers[-1]
+        self.mtw_exp_voltage = np.exp(np.outer(self.mtw_s, time_voltage))
+
+        # Time from the first voltage point to the last bin
+        self.mtw_span = self.profile.bin_centers[-1] - np.min(self.tArray)
+
+        # sum_k w_k exp(-s t_k) = sum_k n_k (F_{k-1} - F_k), F being the
+        # differences of exp(-s t_k) divided by the bin spacings
+        exp_profile = np.exp(np.outer(-self.mtw_s, time_profile))
+        F = np.diff(exp_profile, axis=1) \
+            / (np.diff(self.profile.bin_centers) * self.profile.bin_size)
+        F = np.pad(F, ((0, 0), (1, 1)), mode='constant')
+        self.mtw_exp_profile = - np.diff(F, axis=1)
+
+        # Wake state of the previous turns, and profile contribution of the
+        # last turn, for each resonator
+        self.mtw_state = np.zeros(self.n_resonators, dtype=complex)
+        self.mtw_last_turn = np.zeros(self.n_resonators, dtype=complex)
+
     # Implementation of Heaviside function
     def Heaviside(self, x):
         r"""
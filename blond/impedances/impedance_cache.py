@@ -0,0 +1,177 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+'''
+**Module to cache the impedances and wakes computed by the impedance sources
+of impedance_sources.py, in memory and optionally on disk.**
+'''
+
+from __future__ import division, print_function
+from builtins import object
+import os
+import hashlib
+import numpy as np
+from ..utils import bmath as bm
+
+
+class ImpedanceCache(object):
+    r"""
+    Content-addressed cache of evaluated impedance and wake arrays. The key
+    of an entry is a hash of the class and of the input parameters of the
+    impedance source, of the frequency or time array on which it is
+    evaluated and of the precision in use. Identical sources evaluated on
+    identical arrays are therefore loaded instead of being recomputed, even
+    if the source objects are rebuilt.
+
+    The cache is used by InducedVoltageFreq and InducedVoltageTime through
+    their cache argument, e.g. in parameter scans.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        Directory where the entries are also stored as .npz files, to be
+        reused across runs. If None, the cache is kept in memory only.
+
+    Attributes
+    ----------
+    cache_dir : str
+        Directory of the on-disk cache (None if not used)
+    hits : int
+        Number of evaluations loaded from the cache
+    misses : int
+        Number of evaluations computed by the impedance sources
+    """
+
+    def __init__(self, cache_dir=None):
+
+        self.cache_dir = cache_dir
+        if self.cache_dir is not None and not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        self._memory = {}
+        self.hits = 0
+        self.misses = 0
+
+    def imped_calc(self, source, frequency_array):
+        """
+        Equivalent to source.imped_calc(frequency_array), using the cached
+        impedance if available.
+        """
+
+        self._calc(source, 'imped_calc', frequency_array)
+
+    def wake_calc(self, source, time_array):
+        """
+        Equivalent to source.wake_calc(time_array), using the cached wake if
+        available.
+        """
+
+        self._calc(source, 'wake_calc', time_array)
+
+    def clear(self):
+        """
+        Empties the in-memory cache. The on-disk cache is left untouched.
+        """
+
+        self._memory.clear()
+
+    def key(self, source, method, array):
+        """
+        Hash identifying the evaluation of method (imped_calc or wake_calc)
+        of source on array.
+        """
+
+        sha = hashlib.sha1()
+        sha.update(type(source).__module__.encode())
+        sha.update(type(source).__name__.encode())
+        sha.update(method.encode())
+        sha.update(bm.precision.str.encode())
+
+        outputs = getattr(source, '_output_attributes', ())
+        for name in sorted(vars(source)):
+            if name not in outputs:
+                sha.update(name.encode())
+                self._hash_value(sha, vars(source)[name])
+
+        self._hash_value(sha, np.asarray(array))
+
+        return sha.hexdigest()
+
+    def _hash_value(self, sha, value):
+
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            sha.update(str(value.dtype).encode())
+            sha.update(str(value.shape).encode())
+            sha.update(value.tobytes())
+        elif isinstance(value, (list, tuple)):
+            sha.update(str(len(value)).encode())
+            for item in value:
+                self._hash_value(sha, item)
+        elif isinstance(value, dict):
+            for k in sorted(value):
+                sha.update(repr(k).encode())
+                self._hash_value(sha, value[k])
+        elif hasattr(value, '__func__'):
+            # Bound methods, e.g. the imped_calc variant chosen at init
+            sha.update(value.__func__.__qualname__.encode())
+        elif isinstance(value, (int, float, complex, str, bool, np.generic,
+                                type(None))):
+            sha.update(repr(value).encode())
+        else:
+            # Helper objects (e.g. vectorised functions) do not depend on
+            # the parameters of the source
+            sha.update(type(value).__name__.encode())
+
+    def _calc(self, source, method, array):
+
+        key = self.key(source, method, array)
+
+        outputs = self._memory.get(key)
+        if outputs is None and self.cache_dir is not None:
+            outputs = self._load(key)
+            if outputs is not None:
+                self._memory[key] = outputs
+
+        if outputs is None:
+            self.misses += 1
+            # The outputs are reset to detect the ones set by this evaluation,
+            # the others are restored afterwards
+            names = getattr(source, '_output_attributes', ())
+            previous = {name: vars(source).get(name) for name in names}
+            for name in names:
+                setattr(source, name, None)
+            try:
+                getattr(source, method)(array)
+            finally:
+                outputs = {}
+                for name in names:
+                    value = getattr(source, name)
+                    if isinstance(value, np.ndarray):
+                        outputs[name] = value.copy()
+                    elif previous[name] is None:
+                        delattr(source, name)
+                    else:
+                        setattr(source, name, previous[name])
+            self._memory[key] = outputs
+            if self.cache_dir is not None:
+                np.savez(os.path.join(self.cache_dir, key + '.npz'),
+                         **outputs)
+        else:
+            self.hits += 1
+            for name, value in outputs.items():
+                setattr(source, name, value.copy())
+
+    def _load(self, key):
+
+        file_name = os.path.join(self.cache_dir, key + '.npz')
+        if not os.path.isfile(file_name):
+            return None
+        with np.load(file_name, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
@@ -36,6 +36,15 @@ class _ImpedanceObject(object):
     they are overwritten by float arrays when the child classes are used.
     """
 
+    # Attributes computed by wake_calc() and imped_calc(), as opposed to the
+    # input parameters of the object (used by the ImpedanceCache)
+    _output_attributes = ('time_array', 'wake', 'frequency_array',
+                          'impedance')
+
+    # Attributes changed by the tracking, saved by utils.checkpoint; the
+    # impedance sources are rebuilt by the main file
+    _tracking_state = ()
+
     def __init__(self):
         # Time array of the wake in s
         self.time_array = 0
@@ -127,6 +136,9 @@ class InputTable(_ImpedanceObject):
 
     """
 
+    _output_attributes = ('new_time_array', 'wake', 'frequency_array',
+                          'Re_Z_array', 'Im_Z_array', 'impedance')
+
     def __init__(self, input_1, input_2, input_3=None):
 
         _ImpedanceObject.__init__(self)
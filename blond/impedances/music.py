@@ -43,6 +43,10 @@ class Music(object):
         Beam intensity [1].
     t_rev : float
         Revolution period [s]
+    parallel : boolean, optional
+        If True, track_cpp and track_cpp_multi_turn use the multi-threaded
+        variant of the C++ code, where the MuSiC recurrence is evaluated with
+        a parallel prefix scan over the sorted particles (default False)
 
     Attributes
     ----------
@@ -85,11 +89,16 @@ class Music(object):
     array_parameters : float array
         Array gathering four attributes already defined to be used in the C++
         algorithm.
+    parallel : boolean
+        Flag to use the multi-threaded C++ code
 
     Notes
     -----
     The energies dE of the particles in the beam object are updated after the 
     induced voltage calculation.
+    The particles in the beam object are sorted in place with respect to dt
+    and kept in this order; since they move little from one turn to the next,
+    the sort of the following turns is adaptive, close to O(n).
 
     See Also
     --------
@@ -100,7 +109,8 @@ class Music(object):
 
     """
 
-    def __init__(self, Beam, resonator, n_macroparticles, n_particles, t_rev):
+    def __init__(self, Beam, resonator, n_macroparticles, n_particles, t_rev,
+                 parallel=False):
 
         self.beam = Beam
         self.R_S = resonator[0]
@@ -124,6 +134,7 @@ class Music(object):
         self.last_dt = self.beam.dt[-1]
         self.array_parameters = np.array([self.input_first_component,
                                           self.input_second_component, self.t_rev, self.last_dt])
+        self.parallel = parallel
 
     def track_cpp(self):
         r"""
@@ -141,10 +152,14 @@ class Music(object):
         >>> music_cpp.track_cpp()
 
         """
-        bm.music_track(self.beam.dt, self.beam.dE, self.induced_voltage,
-                       self.array_parameters, self.alpha, self.omega_bar,
-                       self.const, self.coeff1, self.coeff2, self.coeff3,
-                       self.coeff4)
+        if self.parallel:
+            music_track = bm.music_track_parallel
+        else:
+            music_track = bm.music_track
+        music_track(self.beam.dt, self.beam.dE, self.induced_voltage,
+                    self.array_parameters, self.alpha, self.omega_bar,
+                    self.const, self.coeff1, self.coeff2, self.coeff3,
+                    self.coeff4)
 
     def track_cpp_multi_turn(self):
         r"""
@@ -164,10 +179,14 @@ class Music(object):
         >>>     music_cpp.track_cpp_multi_turn()
 
         """
-        bm.music_track_multiturn(self.beam.dt, self.beam.dE, self.induced_voltage,
-                                 self.array_parameters, self.alpha, self.omega_bar,
-                                 self.const, self.coeff1, self.coeff2, self.coeff3,
-                                 self.coeff4)
+        if self.parallel:
+            music_track_multiturn = bm.music_track_multiturn_parallel
+        else:
+            music_track_multiturn = bm.music_track_multiturn
+        music_track_multiturn(self.beam.dt, self.beam.dE, self.induced_voltage,
+                              self.array_parameters, self.alpha, self.omega_bar,
+                              self.const, self.coeff1, self.coeff2, self.coeff3,
+                              self.coeff4)
 
     def track_py(self):
         r"""
@@ -185,9 +204,8 @@ class Music(object):
 
         """
 
-        indices_sorted = np.argsort(self.beam.dt)
-        self.beam.dt = self.beam.dt[indices_sorted]
-        self.beam.dE = self.beam.dE[indices_sorted]
+        # In place, the particles being almost sorted from the previous turn
+        bm.music_sort_particles(self.beam.dt, self.beam.dE)
         self.beam.dE[0] += self.induced_voltage[0]
         self.input_first_component = 1
         self.input_second_component = 0
@@ -234,9 +252,8 @@ class Music(object):
 
         """
 
-        indices_sorted = np.argsort(self.beam.dt)
-        self.beam.dt = self.beam.dt[indices_sorted]
-        self.beam.dE = self.beam.dE[indices_sorted]
+        # In place, the particles being almost sorted from the previous turn
+        bm.music_sort_particles(self.beam.dt, self.beam.dE)
         time_difference_0 = self.beam.dt[0] + self.t_rev - self.last_dt
         exp_term = np.exp(-self.alpha * time_difference_0)
         cos_term = np.cos(self.omega_bar * time_difference_0)
@@ -283,9 +300,8 @@ class Music(object):
 
         """
 
-        indices_sorted = np.argsort(self.beam.dt)
-        self.beam.dt = self.beam.dt[indices_sorted]
-        self.beam.dE = self.beam.dE[indices_sorted]
+        # In place, the particles being almost sorted from the previous turn
+        bm.music_sort_particles(self.beam.dt, self.beam.dE)
         self.beam.dE[0] += self.induced_voltage[0]
         self.induced_voltage[1:] = 0
 
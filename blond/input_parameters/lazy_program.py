@@ -0,0 +1,637 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+'''
+**Turn-by-turn programs computed on demand, for very long cycles.**
+
+The programs are not stored for every turn, but computed from the original
+(time, value) data points in blocks of turns. The block containing the
+current turn is kept as a sliding window, so that accessing the program turn
+by turn costs O(1) per turn on average, and values written in the window
+(e.g. by the feedbacks) are kept as long as the window does not move past
+them.
+'''
+
+from __future__ import division
+from builtins import range
+import bisect
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+from scipy.constants import c
+from scipy.interpolate import splrep, splev
+
+
+class LazyProgram(NDArrayOperatorsMixin):
+    r""" Base class of the programs computed on demand. A program behaves as
+    a read-write numpy array of shape [n_rows, n_turns+1] (or [n_turns+1] for
+    one-dimensional programs) for single turn access, e.g. program[:, turn],
+    program[row, turn] or program[turn]. Slices of turns return numpy arrays,
+    program[row] returns the program of one row, and numpy universal
+    functions and arithmetic operators return new programs. Converting the
+    program with numpy.array() computes all turns.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows (sections or RF systems) of the program
+    length : int
+        Number of turns of the program
+    ndim : int
+        Number of dimensions of the program, 1 or 2; default is 2
+    window : int
+        Number of turns computed at once and kept in the window; default is
+        1000
+
+    """
+
+    def __init__(self, n_rows, length, ndim=2, window=1000):
+
+        if window < 2:
+            #InputDataError
+            raise RuntimeError("ERROR in LazyProgram: the window should " +
+                               "contain at least 2 turns!")
+
+        self.n_rows = int(n_rows)
+        self.length = int(length)
+        self.ndim = int(ndim)
+        self.window = int(window)
+        self.dtype = np.dtype(float)
+        if self.ndim == 1:
+            self.shape = (self.length,)
+        else:
+            self.shape = (self.n_rows, self.length)
+
+        # Consecutive windows overlap by one turn, so that turn and turn + 1
+        # are always found in the same window
+        self._step = self.window - 1
+        self._start = 0
+        self._stop = 0
+        self._buffer = None
+        self._memo = None
+
+    def _compute(self, start, stop):
+        """ Values of the turns [start, stop), as an array [n_rows,
+        stop-start]. """
+
+        raise NotImplementedError
+
+    def values(self, start, stop):
+        """ Design values of the turns [start, stop), as an array [n_rows,
+        stop-start]; the last computed block is kept, since it is usually
+        requested by several programs derived from this one. """
+
+        if self._memo is not None and self._memo[0] <= start \
+                and stop <= self._memo[1]:
+            return self._memo[2][:, start-self._memo[0]:stop-self._memo[0]]
+
+        values = np.asarray(self._compute(start, stop), dtype=float)
+        values = values.reshape(self.n_rows, stop - start)
+        self._memo = (start, stop, values)
+
+        return values
+
+    def _load(self, turn):
+
+        if self._buffer is not None and self._start <= turn < self._stop:
+            return
+        if turn < 0 or turn >= self.length:
+            raise IndexError("turn %d out of range for a program of %d turns"
+                             % (turn, self.length))
+
+        start = (turn // self._step) * self._step
+        stop = min(start + self.window, self.length)
+        buffer = np.array(self.values(start, stop))
+
+        # Keeps the values written in the overlap with the previous window
+        if self._buffer is not None:
+            overlap_start = max(start, self._start)
+            overlap_stop = min(stop, self._stop)
+            if overlap_start < overlap_stop:
+                buffer[:, overlap_start-start:overlap_stop-start] = \
+                    self._buffer[:, overlap_start-self._start:
+                                 overlap_stop-self._start]
+
+        self._buffer = buffer
+        self._start = start
+        self._stop = stop
+
+    def _split(self, key):
+
+        if self.ndim == 1:
+            return 0, key
+        if not isinstance(key, tuple):
+            return key, slice(None)
+        if len(key) == 1:
+            return key[0], slice(None)
+        if len(key) == 2:
+            return key
+        raise IndexError("too many indices for a two-dimensional program")
+
+    def __getitem__(self, key):
+
+        rows, turns = self._split(key)
+
+        if isinstance(turns, (int, np.integer)):
+            turn = int(turns)
+            if turn < 0:
+                turn += self.length
+            self._load(turn)
+            return self._buffer[rows, turn - self._start]
+
+        if isinstance(turns, slice):
+            if self.ndim == 2 and isinstance(rows, (int, np.integer)) \
+                    and turns == slice(None):
+                return _RowProgram(self, int(rows))
+            start, stop, step = turns.indices(self.length)
+            if step > 0:
+                if stop <= start:
+                    return np.zeros((self.n_rows, 0))[rows]
+                return np.array(self.values(start, stop)[rows, ::step])
+
+        return np.asarray(self)[key]
+
+    def __setitem__(self, key, value):
+
+        rows, turns = self._split(key)
+
+        if not isinstance(turns, (int, np.integer)):
+            #InputDataError
+            raise RuntimeError("ERROR in LazyProgram: only single turns " +
+                               "can be assigned!")
+
+        turn = int(turns)
+        if turn < 0:
+            turn += self.length
+        self._load(turn)
+        self._buffer[rows, turn - self._start] = value
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+
+        output = np.empty((self.n_rows, self.length))
+        for start in range(0, self.length, self.window):
+            stop = min(start + self.window, self.length)
+            output[:, start:stop] = self.values(start, stop)
+        if self._buffer is not None:
+            output[:, self._start:self._stop] = self._buffer
+        if self.ndim == 1:
+            output = output[0]
+
+        return output if dtype is None else output.astype(dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+
+        if method != '__call__' or 'out' in kwargs:
+            return NotImplemented
+
+        return DerivedProgram(lambda *args: ufunc(*args, **kwargs), inputs)
+
+    def __pow__(self, other):
+
+        # The same special cases as numpy.ndarray, for identical results
+        if np.isscalar(other):
+            if other == 2:
+                return np.square(self)
+            if other == 0.5:
+                return np.sqrt(self)
+            if other == -1:
+                return np.reciprocal(self)
+
+        return np.power(self, other)
+
+    def __repr__(self):
+        return "%s(shape=%s, window=%d)" % (type(self).__name__,
+                                            self.shape, self.window)
+
+    def sum(self, axis=None, dtype=None, out=None, **kwargs):
+
+        if axis is not None or out is not None:
+            return np.asarray(self).sum(axis=axis, dtype=dtype, out=out,
+                                        **kwargs)
+
+        total = 0.
+        for start in range(0, self.length, self.window):
+            stop = min(start + self.window, self.length)
+            total += self.values(start, stop).sum()
+
+        return total
+
+    def is_zero(self):
+        """ True if the design values are zero at every turn. """
+
+        for start in range(0, self.length, self.window):
+            stop = min(start + self.window, self.length)
+            if np.any(self.values(start, stop)):
+                return False
+
+        return True
+
+    def copy(self):
+        """ Program with the same design values and its own window. """
+
+        return _CopyProgram(self)
+
+
+def turn_values(data, start, stop, length):
+    """ Values of the turns [start, stop) of a program or of an array with
+    the turns along the last axis; other data are returned as they are. """
+
+    if isinstance(data, LazyProgram):
+        values = data.values(start, stop)
+        return values[0] if data.ndim == 1 else values
+    if isinstance(data, np.ndarray) and data.ndim > 0 \
+            and data.shape[-1] == length:
+        return data[..., start:stop]
+
+    return data
+
+
+class _RowProgram(LazyProgram):
+
+    def __init__(self, program, row):
+
+        if row < 0:
+            row += program.n_rows
+        if row < 0 or row >= program.n_rows:
+            raise IndexError("row out of range")
+
+        LazyProgram.__init__(self, 1, program.length, ndim=1,
+                             window=program.window)
+        self.program = program
+        self.row = row
+
+    def _compute(self, start, stop):
+        return self.program.values(start, stop)[self.row]
+
+
+class _CopyProgram(LazyProgram):
+
+    def __init__(self, program):
+
+        LazyProgram.__init__(self, program.n_rows, program.length,
+                             ndim=program.ndim, window=program.window)
+        self.program = program
+
+    def _compute(self, start, stop):
+        return self.program.values(start, stop)
+
+    def is_zero(self):
+        return self.program.is_zero()
+
+
+class ConstantProgram(LazyProgram):
+    r""" Program constant in time.
+
+    Parameters
+    ----------
+    values : float or float array [n_rows]
+        Values of the rows
+    length : int
+        Number of turns of the program
+
+    """
+
+    def __init__(self, values, length, ndim=2, window=1000):
+
+        self.constant = np.array(values, ndmin=1, dtype=float)
+        LazyProgram.__init__(self, len(self.constant), length, ndim=ndim,
+                             window=window)
+
+    def _compute(self, start, stop):
+        return self.constant[:, np.newaxis] * np.ones(stop - start)
+
+    def is_zero(self):
+        return not np.any(self.constant)
+
+
+class InterpolatedProgram(LazyProgram):
+    r""" Program interpolated from (time, value) data points for each row.
+
+    Parameters
+    ----------
+    input_time : list of float arrays
+        Time [s] of the data points of each row
+    input_values : list of float arrays
+        Values of the data points of each row
+    interp_time : LazyProgram or float array [n_turns+1]
+        Time [s] of each turn
+    interpolation : str
+        'linear' (default) or 'cubic'
+    smoothing : float
+        Smoothing value for 'cubic' interpolation
+
+    """
+
+    def __init__(self, input_time, input_values, interp_time,
+                 interpolation='linear', smoothing=0, window=1000):
+
+        LazyProgram.__init__(self, len(input_values), len(interp_time),
+                             window=window)
+
+        self.input_time = [np.asarray(time, dtype=float)
+                           for time in input_time]
+        self.input_values = [np.asarray(values, dtype=float)
+                             for values in input_values]
+        self.interp_time = interp_time
+        self.interpolation = interpolation
+        if interpolation == 'cubic':
+            self.splines = [splrep(time, values, s=smoothing) for time, values
+                            in zip(self.input_time, self.input_values)]
+
+    def _compute(self, start, stop):
+
+        time = turn_values(self.interp_time, start, stop, self.length)
+        if self.interpolation == 'cubic':
+            return np.array([splev(time, spline) for spline in self.splines])
+
+        return np.array([np.interp(time, input_time, input_values)
+                         for input_time, input_values
+                         in zip(self.input_time, self.input_values)])
+
+    def is_zero(self):
+
+        if self.interpolation == 'linear':
+            return not any(np.any(values) for values in self.input_values)
+
+        return LazyProgram.is_zero(self)
+
+
+class DerivedProgram(LazyProgram):
+    r""" Program obtained by applying a function turn by turn to other
+    programs, arrays of turns, or constants.
+
+    Parameters
+    ----------
+    function : callable
+        Function of the values of the inputs over a range of turns
+    inputs : list
+        Programs, arrays with the turns along the last axis, or constants
+    length : int
+        Optional: number of turns of the program; default is the length of
+        the first program in inputs
+    lookahead : int
+        Optional: number of turns after the range needed by the function,
+        e.g. 1 for a difference between consecutive turns; default is 0
+
+    """
+
+    def __init__(self, function, inputs, length=None, lookahead=0,
+                 window=None):
+
+        self.function = function
+        self.inputs = list(inputs)
+        self.lookahead = int(lookahead)
+
+        programs = [data for data in self.inputs
+                    if isinstance(data, LazyProgram)]
+        self.input_length = programs[0].length
+        if length is None:
+            length = self.input_length
+        if window is None:
+            window = programs[0].window
+
+        # Number of rows from the first turn
+        first = np.asarray(self._apply(0, 1))
+        if first.ndim == 1:
+            LazyProgram.__init__(self, 1, length, ndim=1, window=window)
+        else:
+            LazyProgram.__init__(self, first.shape[0], length, window=window)
+
+    def _apply(self, start, stop):
+
+        stop = min(stop + self.lookahead, self.input_length)
+        return self.function(*[turn_values(data, start, stop,
+                                           self.input_length)
+                               for data in self.inputs])
+
+    def _compute(self, start, stop):
+        return self._apply(start, stop)
+
+
+class WindowProgram(LazyProgram):
+    r""" Program computed by a function of the range of turns, for
+    calculations needing more than the values of the same turns.
+
+    Parameters
+    ----------
+    function : callable
+        function(start, stop) returning the values of the turns [start, stop)
+    n_rows : int
+        Number of rows of the program
+    length : int
+        Number of turns of the program
+
+    """
+
+    def __init__(self, function, n_rows, length, ndim=2, window=1000):
+
+        LazyProgram.__init__(self, n_rows, length, ndim=ndim, window=window)
+        self.function = function
+
+    def _compute(self, start, stop):
+        return self.function(start, stop)
+
+
+class CumulativeProgram(LazyProgram):
+    r""" Cumulative sum over the turns of a program. The sum up to the start
+    of each block of turns is kept when it is first computed, so that
+    accessing the program in order costs O(1) per turn.
+
+    Parameters
+    ----------
+    program : LazyProgram
+        Program to be summed
+
+    """
+
+    def __init__(self, program):
+
+        LazyProgram.__init__(self, program.n_rows, program.length,
+                             ndim=program.ndim, window=program.window)
+        self.program = program
+        self._prefix = [np.zeros(self.n_rows)]
+
+    def _cumsum(self, prefix, start, stop):
+
+        # Sequential sum starting from the prefix, as np.cumsum of all turns
+        values = self.program.values(start, stop)
+        return np.cumsum(np.concatenate((prefix[:, np.newaxis], values),
+                                        axis=1), axis=1)[:, 1:]
+
+    def _compute(self, start, stop):
+
+        block = start // self._step
+        while len(self._prefix) <= block:
+            previous = len(self._prefix) - 1
+            self._prefix.append(self._cumsum(
+                self._prefix[previous], previous*self._step,
+                (previous + 1)*self._step)[:, -1])
+
+        block_start = block*self._step
+        return self._cumsum(self._prefix[block], block_start,
+                            stop)[:, start-block_start:]
+
+
+class RampProgram(LazyProgram):
+    r""" Momentum program of RingOptions.preprocess(), computed on demand.
+    The revolution period depends on the momentum of the previous turns, so
+    a first pass over the ramp gives the number of turns and keeps the state
+    of the recurrence at the start of each block of turns, from which the
+    blocks are computed afterwards.
+
+    Parameters
+    ----------
+    RingOptions : RingOptions
+        Options of the interpolation of the ramp
+    mass : float
+        Particle mass [eV]
+    circumference : float
+        Ring circumference [m]
+    time : float array
+        Time points [s] corresponding to momentum data
+    momentum : float array
+        Particle momentum [eV/c]
+
+    """
+
+    def __init__(self, RingOptions, mass, circumference, time, momentum):
+
+        self.mass = mass
+        self.circumference = circumference
+        self.time_end = time[-1]
+        self.ramp_turns = RingOptions.ramp_turns
+        self.momentum_at = RingOptions.ramp_momentum(time, momentum)
+        self.flat_bottom = RingOptions.flat_bottom
+        self.flat_top = RingOptions.flat_top
+        self.derivative = RingOptions.interpolation == 'derivative'
+        self.momentum_initial = momentum[0]
+        self.momentum_final = momentum[-1]
+        step = RingOptions.window - 1
+        t_start = RingOptions.t_start
+        t_end = RingOptions.t_end
+
+        # Flat bottom
+        beta_0 = np.sqrt(1/(1 + (mass/momentum[0])**2))
+        T0 = circumference/(beta_0*c)
+        shift = time[0] - self.flat_bottom*T0
+        time_flat_bottom = shift + T0*np.arange(0, self.flat_bottom+1)
+        initial_index = None
+        final_index = 0
+        if t_start is not None:
+            index = np.where(time_flat_bottom >= t_start)[0]
+            if len(index) > 0:
+                initial_index = index[0]
+        if t_end is not None:
+            final_index = np.searchsorted(time_flat_bottom, t_end,
+                                          side='right')
+
+        # First pass over the ramp, keeping the state (time of the turn,
+        # time of the next turn, momentum of the turn) at the block starts
+        turn = self.flat_bottom
+        time_turn = time_flat_bottom[-1]
+        time_next = time_turn + circumference/(beta_0*c)
+        momentum_turn = momentum[0]
+        beta_turn = beta_0
+        self._turns = [turn]
+        self._states = [(time_turn, time_next, momentum_turn)]
+        while True:
+            time_turns, beta_turns, momentum_turns = self.ramp_turns(
+                self.momentum_at, mass, circumference, self.time_end,
+                time_turn, time_next, momentum_turn, step)
+            n_turns = len(momentum_turns)
+            if initial_index is None and t_start is not None:
+                index = np.where(time_turns[:-1] >= t_start)[0]
+                if len(index) > 0:
+                    initial_index = turn + 1 + index[0]
+            if t_end is not None:
+                index = np.where(time_turns[:-1] <= t_end)[0]
+                if len(index) > 0:
+                    final_index = turn + 2 + index[-1]
+            if n_turns > 0:
+                time_turn, time_next = time_turns[-2:]
+                momentum_turn = momentum_turns[-1]
+                beta_turn = beta_turns[-1]
+                turn += n_turns
+            if n_turns < step:
+                break
+            self._turns.append(turn)
+            self._states.append((time_turn, time_next, momentum_turn))
+        self.last_turn = turn
+        self.momentum_last_raw = momentum_turn
+        self.momentum_last = momentum_turn
+        if self.derivative:
+            self.momentum_last = self._normalise(
+                np.array([momentum_turn]))[0]
+
+        # Flat top
+        if self.flat_top > 0 and (t_start is not None or t_end is not None):
+            time_flat_top = time_turn + \
+                circumference*np.arange(1, self.flat_top+1)/(beta_turn*c)
+            if initial_index is None and t_start is not None:
+                index = np.where(time_flat_top >= t_start)[0]
+                if len(index) > 0:
+                    initial_index = turn + 1 + index[0]
+            if t_end is not None:
+                index = np.where(time_flat_top <= t_end)[0]
+                if len(index) > 0:
+                    final_index = turn + 2 + index[-1]
+
+        n_raw = self.last_turn + 1 + self.flat_top
+        self.offset = 0 if t_start is None else int(initial_index)
+        if t_end is None:
+            final_index = n_raw
+
+        LazyProgram.__init__(self, 1, int(final_index) - self.offset,
+                             window=RingOptions.window)
+
+    def _normalise(self, momentum):
+
+        # As in RingOptions.preprocess(), the integration in 'derivative'
+        # interpolation is adjusted to the flat top momentum
+        momentum = momentum - self.momentum_initial
+        momentum /= self.momentum_last_raw - self.momentum_initial
+        momentum *= self.momentum_final - self.momentum_initial
+        momentum += self.momentum_initial
+
+        return momentum
+
+    def _compute(self, start, stop):
+
+        start += self.offset
+        stop += self.offset
+        output = np.empty(stop - start)
+
+        # Flat bottom
+        ramp_start = max(start, self.flat_bottom + 1)
+        output[:max(min(stop, ramp_start) - start, 0)] = \
+            self.momentum_initial
+
+        # Ramp, from the last state before the first turn
+        ramp_stop = min(stop, self.last_turn + 1)
+        if ramp_start < ramp_stop:
+            index = bisect.bisect_right(self._turns, ramp_start - 1) - 1
+            turn = self._turns[index]
+            momentum_turns = self.ramp_turns(
+                self.momentum_at, self.mass, self.circumference,
+                self.time_end, *self._states[index],
+                n_turns=ramp_stop - 1 - turn)[2]
+            output[ramp_start-start:ramp_stop-start] = \
+                momentum_turns[ramp_start-turn-1:]
+            if self.derivative:
+                output[ramp_start-start:ramp_stop-start] = self._normalise(
+                    output[ramp_start-start:ramp_stop-start])
+
+        # Flat top
+        flat_top_start = max(start, self.last_turn + 1)
+        if flat_top_start < stop:
+            output[flat_top_start-start:] = self.momentum_last
+
+        return output
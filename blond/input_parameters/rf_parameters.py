@@ -20,6 +20,8 @@ from scipy.constants import c
 from scipy.integrate import cumtrapz
 from ..beam.beam import Proton
 from ..input_parameters.rf_parameters_options import RFStationOptions
+from ..input_parameters.lazy_program import LazyProgram, WindowProgram
+from ..input_parameters import serialisation
 
 
 class RFStation(object):
@@ -83,7 +85,9 @@ class RFStation(object):
     RFStationOptions : class
         Optionnal, A RFStationOptions-based class defining smoothing,
         interpolation, etc. options for harmonic, voltage, and/or
-        phi_rf_d programme to be interpolated to a turn-by-turn programme
+        phi_rf_d programme to be interpolated to a turn-by-turn programme.
+        With RFStationOptions(lazy=True) or a lazy Ring, the programs below
+        are LazyProgram objects computed on demand instead of arrays
 
     Attributes
     ----------
@@ -216,10 +220,25 @@ class RFStation(object):
 
     """
 
+    # Attributes changed by the tracking (turn counter, and RF phase and
+    # frequency corrected by the feedbacks), saved by utils.checkpoint; the
+    # other programs are rebuilt by the main file
+    _tracking_state = ('counter', 'phi_rf', 'omega_rf', 'dphi_rf',
+                       'dphi_rf_steering')
+
     def __init__(self, Ring, harmonic, voltage, phi_rf_d, n_rf=1,
                  section_index=1, omega_rf=None, phi_noise=None,
                  phi_modulation=None, RFStationOptions=RFStationOptions()):
 
+        # Loading from the cache if built before from the same inputs
+        if RFStationOptions.cache_dir is not None:
+            cache_entry = serialisation.cache_entry(
+                RFStationOptions.cache_dir, type(self), Ring, harmonic,
+                voltage, phi_rf_d, n_rf, section_index, omega_rf, phi_noise,
+                phi_modulation, RFStationOptions)
+            if serialisation.load_cached(self, cache_entry):
+                return
+
         # Different indices
         self.counter = [int(0)]
         self.section_index = int(section_index - 1)
@@ -270,7 +289,9 @@ class RFStation(object):
                                                      Ring.RingOptions.t_start)
 
         # Checking if the RFStation is empty
-        if np.sum(self.voltage) == 0:
+        if isinstance(self.voltage, LazyProgram):
+            self.empty = self.voltage.is_zero()
+        elif np.sum(self.voltage) == 0:
             self.empty = True
         else:
             self.empty = False
@@ -305,6 +326,12 @@ class RFStation(object):
         else:
             self.phi_noise = None
             
+        if phi_modulation is not None and \
+                isinstance(self.omega_rf_d, LazyProgram):
+            #InputDataError
+            raise RuntimeError("ERROR in RFStation: phi_modulation is not " +
+                               "available with lazy programs!")
+
         if phi_modulation is not None:
             
             try:
@@ -348,17 +375,84 @@ class RFStation(object):
 
         # Copy of the desing rf programs in the one used for tracking
         # and that can be changed by feedbacks
-        self.phi_rf = np.array(self.phi_rf_d)
+        if isinstance(self.phi_rf_d, LazyProgram):
+            self.phi_rf = self.phi_rf_d.copy()
+        else:
+            self.phi_rf = np.array(self.phi_rf_d)
         self.dphi_rf = np.zeros(self.n_rf)
-        self.omega_rf = np.array(self.omega_rf_d)
+        if isinstance(self.omega_rf_d, LazyProgram):
+            self.omega_rf = self.omega_rf_d.copy()
+        else:
+            self.omega_rf = np.array(self.omega_rf_d)
         self.t_rf = 2*np.pi / self.omega_rf
 
         # From helper functions
         if not self.empty:
-            self.phi_s = calculate_phi_s(self, self.Particle)
+            lazy = [program for program
+                    in [self.voltage, self.eta_0, self.delta_E]
+                    if isinstance(program, LazyProgram)]
+            if lazy:
+                self.phi_s = WindowProgram(self._phi_s_turns, 1,
+                                           self.n_turns+1, ndim=1,
+                                           window=lazy[0].window)
+            else:
+                self.phi_s = calculate_phi_s(self, self.Particle)
             self.Q_s = calculate_Q_s(self, self.Particle)
             self.omega_s0 = self.Q_s*Ring.omega_rev
 
+        if RFStationOptions.cache_dir is not None:
+            serialisation.store_cached(self, cache_entry)
+
+    def save(self, filename):
+        """ Function to save the RFStation to a .npz file, an HDF5 file (.h5,
+        .hdf5) or a directory of .npy files, see serialisation.save().
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file or directory
+
+        Returns
+        -------
+        str
+            Content hash of the saved data
+
+        """
+
+        return serialisation.save(self, filename)
+
+    @classmethod
+    def load(cls, filename, mmap_mode=None):
+        """ Function to load an RFStation saved by RFStation.save().
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file or directory
+        mmap_mode : str
+            Memory mapping mode for the arrays of a directory, see
+            numpy.load(); default is None
+
+        Returns
+        -------
+        RFStation
+            Loaded RFStation
+
+        """
+
+        return serialisation.load(filename, cls, mmap_mode=mmap_mode)
+
+    def _phi_s_turns(self, start, stop):
+        """ Synchronous phase of the turns [start, stop), for lazy programs.
+        One more turn is passed, since eta_0 is averaged with the next turn.
+        """
+
+        station = _StationTurns(eta_0=self.eta_0[start:stop+1],
+                                delta_E=self.delta_E[start:stop],
+                                voltage=self.voltage[:, start:stop+1])
+
+        return calculate_phi_s(station, self.Particle)[:stop-start]
+
     def eta_tracking(self, beam, counter, dE):
         r"""Function to calculate the slippage factor as a function of the
         energy offset :math:`\Delta E` of the particle. The slippage factor
@@ -379,6 +473,13 @@ class RFStation(object):
             return eta
 
 
+class _StationTurns(object):
+    """ RF parameters of a range of turns, for the helper functions. """
+
+    def __init__(self, **programs):
+        self.__dict__.update(programs)
+
+
 def calculate_Q_s(RFStation, Particle=Proton()):
     r""" Function calculating the turn-by-turn synchrotron tune for
     single-harmonic RF, without intensity effects.
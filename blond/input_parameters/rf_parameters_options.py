@@ -20,6 +20,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy.interpolate import splrep, splev
 from ..plots.plot import fig_folder
+from ..input_parameters.lazy_program import ConstantProgram, \
+    InterpolatedProgram
 
 
 class RFStationOptions(object):
@@ -42,11 +44,24 @@ class RFStationOptions(object):
         will have figures with different indices
     sampling : int
         Decimation value for plotting; default is 1
+    lazy : bool
+        Option to compute the programs on demand from the input data points
+        instead of storing them for every turn (see LazyProgram), for very
+        long cycles; the optional plot is then not available; default is
+        False
+    window : int
+        Number of turns computed at once in the lazy mode; default is 1000
+    cache_dir : str
+        Directory where the RFStation is saved, named after the content hash
+        of its inputs, and loaded from with memory mapped arrays when built
+        again from the same inputs; not available in the lazy mode; default
+        is None (no cache)
 
     """
 
     def __init__(self, interpolation='linear', smoothing=0, plot=False,
-                 figdir='fig', figname=['data'], sampling=1):
+                 figdir='fig', figname=['data'], sampling=1, lazy=False,
+                 window=1000, cache_dir=None):
 
         if interpolation in ['linear', 'cubic']:
             self.interpolation = str(interpolation)
@@ -75,6 +90,21 @@ class RFStationOptions(object):
             raise RuntimeError("ERROR: sampling value in PreprocessRamp" +
                                " not recognised. Aborting...")
 
+        self.lazy = bool(lazy)
+        if window >= 2:
+            self.window = int(window)
+        else:
+            #TypeError
+            raise RuntimeError("ERROR: window value in RFStationOptions" +
+                               " not recognised. Aborting...")
+
+        if cache_dir is not None and self.lazy:
+            #InputDataError
+            raise RuntimeError("ERROR: cache_dir in RFStationOptions is" +
+                               " not available in the lazy mode." +
+                               " Aborting...")
+        self.cache_dir = cache_dir
+
     def reshape_data(self, input_data, n_turns, n_rf, interp_time,
                      t_start=0):
         r"""Checks whether the user input is consistent with the expectation
@@ -106,7 +136,9 @@ class RFStationOptions(object):
         Returns
         -------
         output_data
-            Returns the data with the adequate shape for the RStation object
+            Returns the data with the adequate shape for the RStation object;
+            a LazyProgram in the lazy mode, except for programs passed turn
+            by turn
 
         """
 
@@ -118,6 +150,9 @@ class RFStationOptions(object):
         # If single float, expands the value to match the input number of turns
         # and rf harmonics
         if isinstance(input_data, float) or isinstance(input_data, int):
+            if self.lazy:
+                return ConstantProgram(input_data*np.ones(n_rf), n_turns+1,
+                                       window=self.window)
             output_data = input_data * np.ones((n_rf, n_turns+1))
 
         # If tuple, separate time and synchronous data and check data
@@ -143,6 +178,19 @@ class RFStationOptions(object):
                 raise RuntimeError("ERROR in RFStation: the input data " +
                                    "does not match the number of rf harmonics")
 
+            if self.lazy:
+                for index_rf in range(n_rf):
+                    if len(input_data[index_rf][1]) \
+                            != len(input_data[index_rf][0]):
+                        #InputDataError
+                        raise RuntimeError("ERROR in RFStation: synchronous " +
+                                           "data does not match the time data")
+                return InterpolatedProgram(
+                    [data[0] for data in input_data],
+                    [data[1] for data in input_data], interp_time,
+                    interpolation=self.interpolation,
+                    smoothing=self.smoothing, window=self.window)
+
             # Loops over all the rf harmonics to interpolate the programs,
             # appends the results on the output_data list which is afterwards
             # converted to a numpy.array
@@ -203,7 +251,6 @@ class RFStationOptions(object):
                 isinstance(input_data, list):
 
             input_data = np.array(input_data, ndmin=2, dtype=float)
-            output_data = np.zeros((n_rf, n_turns+1), dtype=float)
 
             # If the number of points is exactly the same as n_rf, this means
             # that the rf program for each harmonic is constant, reshaping
@@ -217,6 +264,12 @@ class RFStationOptions(object):
                 raise RuntimeError("ERROR in RFStation: the input data " +
                                    "does not match the number of rf harmonics")
 
+            if self.lazy and input_data.shape[1] == 1:
+                return ConstantProgram(input_data[:, 0], n_turns+1,
+                                       window=self.window)
+
+            output_data = np.zeros((n_rf, n_turns+1), dtype=float)
+
             for index_rf in range(len(input_data)):
                 if len(input_data[index_rf]) == 1:
                     output_data[index_rf] = input_data[index_rf] * \
@@ -18,6 +18,9 @@ import numpy as np
 import warnings
 from scipy.constants import c
 from ..input_parameters.ring_options import RingOptions
+from ..input_parameters.lazy_program import LazyProgram, \
+    ConstantProgram, DerivedProgram, CumulativeProgram
+from ..input_parameters import serialisation
 
 
 class Ring(object):
@@ -82,7 +85,8 @@ class Ring(object):
         input and initialize the momentum program for the simulation.
         This object defines the interpolation scheme, plotting options, etc.
         The options for this object can be adjusted and passed to the Ring
-        object.
+        object. With RingOptions(lazy=True), the programs below are
+        LazyProgram objects computed on demand instead of arrays.
 
     Attributes
     ----------
@@ -182,11 +186,25 @@ class Ring(object):
 
     """
 
+    # Attributes changed by the tracking, saved by utils.checkpoint; the
+    # programs are rebuilt by the main file
+    _tracking_state = ()
+
     def __init__(self, ring_length, alpha_0, synchronous_data, Particle,
                  n_turns=1, synchronous_data_type='momentum',
                  bending_radius=None, n_sections=1, alpha_1=None, alpha_2=None,
                  RingOptions=RingOptions()):
 
+        # Loading from the cache if built before from the same inputs
+        if RingOptions.cache_dir is not None:
+            cache_entry = serialisation.cache_entry(
+                RingOptions.cache_dir, type(self), ring_length, alpha_0,
+                synchronous_data, Particle, n_turns, synchronous_data_type,
+                bending_radius, n_sections, alpha_1, alpha_2, RingOptions)
+            if serialisation.load_cached(self, cache_entry):
+                self.RingOptions = RingOptions
+                return
+
         # Conversion of initial inputs to expected types
         self.n_turns = int(n_turns)
         self.n_sections = int(n_sections)
@@ -239,9 +257,18 @@ class Ring(object):
         self.energy = np.sqrt(self.momentum**2 + self.Particle.mass**2)
         self.kin_energy = np.sqrt(self.momentum**2 + self.Particle.mass**2) - \
             self.Particle.mass
-        self.delta_E = np.diff(self.energy, axis=1)
-        self.t_rev = np.dot(self.ring_length, 1/(self.beta*c))
-        self.cycle_time = np.cumsum(self.t_rev)  # Always starts with zero
+        if isinstance(self.energy, LazyProgram):
+            self.delta_E = DerivedProgram(
+                lambda energy: np.diff(energy, axis=1), [self.energy],
+                length=self.n_turns, lookahead=1)
+            self.t_rev = DerivedProgram(
+                lambda beta: np.dot(self.ring_length, 1/(beta*c)),
+                [self.beta])
+            self.cycle_time = CumulativeProgram(self.t_rev)
+        else:
+            self.delta_E = np.diff(self.energy, axis=1)
+            self.t_rev = np.dot(self.ring_length, 1/(self.beta*c))
+            self.cycle_time = np.cumsum(self.t_rev)  # Always starts with zero
         self.f_rev = 1/self.t_rev
         self.omega_rev = 2*np.pi*self.f_rev
 
@@ -266,7 +293,7 @@ class Ring(object):
             # This can be removed when the BLonD assembler is in place
             # to avoid high order momentum compaction programs filled
             # with zeros (should be propagated in RFStation.__init__())
-            self.alpha_1 = np.zeros(self.alpha_0.shape)
+            self.alpha_1 = self._zeros()
 
         if alpha_2 is not None:
             self.alpha_2 = RingOptions.reshape_data(
@@ -278,11 +305,54 @@ class Ring(object):
             # This can be removed when the BLonD assembler is in place
             # to avoid high order momentum compaction programs filled
             # with zeros (should be propagated in RFStation.__init__())
-            self.alpha_2 = np.zeros(self.alpha_0.shape)
+            self.alpha_2 = self._zeros()
 
         # Slippage factor derived from alpha, beta, gamma
         self.eta_generation()
 
+        if RingOptions.cache_dir is not None:
+            serialisation.store_cached(self, cache_entry)
+
+    def save(self, filename):
+        """ Function to save the Ring, with its RingOptions, to a .npz file,
+        an HDF5 file (.h5, .hdf5) or a directory of .npy files, see
+        serialisation.save().
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file or directory
+
+        Returns
+        -------
+        str
+            Content hash of the saved data
+
+        """
+
+        return serialisation.save(self, filename)
+
+    @classmethod
+    def load(cls, filename, mmap_mode=None):
+        """ Function to load a Ring saved by Ring.save().
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file or directory
+        mmap_mode : str
+            Memory mapping mode for the arrays of a directory, see
+            numpy.load(); default is None
+
+        Returns
+        -------
+        Ring
+            Loaded Ring
+
+        """
+
+        return serialisation.load(filename, cls, mmap_mode=mmap_mode)
+
     def eta_generation(self):
         """ Function to generate the slippage factors (zeroth, first, and
         second orders, see [1]_) from the momentum compaction and the
@@ -302,12 +372,24 @@ class Ring(object):
         # to avoid high order momentum compaction programs filled
         # with zeros (should be propagated in RFStation.__init__())
         for i in range(self.alpha_order+1, 3):
-            setattr(self, "eta_%s" % i, np.zeros([self.n_sections,
-                                                  self.n_turns+1]))
+            setattr(self, "eta_%s" % i, self._zeros())
+
+    def _zeros(self):
+        """ Program filled with zeros, for the unused orders """
+
+        if self.RingOptions.lazy:
+            return ConstantProgram(np.zeros(self.n_sections), self.n_turns+1,
+                                   window=self.RingOptions.window)
+        else:
+            return np.zeros([self.n_sections, self.n_turns+1])
 
     def _eta0(self):
         """ Function to calculate the zeroth order slippage factor eta_0 """
 
+        if self.RingOptions.lazy:
+            self.eta_0 = self.alpha_0 - self.gamma**(-2.)
+            return
+
         self.eta_0 = np.empty([self.n_sections, self.n_turns+1])
         for i in range(0, self.n_sections):
             self.eta_0[i] = self.alpha_0[i] - self.gamma[i]**(-2.)
@@ -315,6 +397,11 @@ class Ring(object):
     def _eta1(self):
         """ Function to calculate the first order slippage factor eta_1 """
 
+        if self.RingOptions.lazy:
+            self.eta_1 = 3*self.beta**2/(2*self.gamma**2) + \
+                self.alpha_1 - self.alpha_0*self.eta_0
+            return
+
         self.eta_1 = np.empty([self.n_sections, self.n_turns+1])
         for i in range(0, self.n_sections):
             self.eta_1[i] = 3*self.beta[i]**2/(2*self.gamma[i]**2) + \
@@ -323,6 +410,14 @@ class Ring(object):
     def _eta2(self):
         """ Function to calculate the second order slippage factor eta_2 """
 
+        if self.RingOptions.lazy:
+            self.eta_2 = - self.beta**2*(5*self.beta**2 - 1) / \
+                (2*self.gamma**2) + self.alpha_2 - 2*self.alpha_0 *\
+                self.alpha_1 + self.alpha_1 / self.gamma**2 + \
+                self.alpha_0**2*self.eta_0 - 3*self.beta**2 * \
+                self.alpha_0/(2*self.gamma**2)
+            return
+
         self.eta_2 = np.empty([self.n_sections, self.n_turns+1])
         for i in range(0, self.n_sections):
             self.eta_2[i] = - self.beta[i]**2*(5*self.beta[i]**2 - 1) / \
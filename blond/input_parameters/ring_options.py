@@ -19,8 +19,10 @@ from builtins import str, range
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.constants import c
-from scipy.interpolate import splrep, splev
+from scipy.interpolate import splrep, splev, Akima1DInterpolator
 from ..plots.plot import fig_folder
+from ..input_parameters.lazy_program import LazyProgram, ConstantProgram, \
+    InterpolatedProgram, DerivedProgram, RampProgram
 
 
 class RingOptions(object):
@@ -31,7 +33,7 @@ class RingOptions(object):
     ----------
     interpolation : str
         Interpolation options for the data points. Available options are
-        'linear' (default), 'cubic', and 'derivative'
+        'linear' (default), 'cubic', 'akima' and 'derivative'
     smoothing : float
         Smoothing value for 'cubic' interpolation
     flat_bottom : int
@@ -54,13 +56,31 @@ class RingOptions(object):
         Figure name to save optional plot; default is 'preprocess_ramp'
     sampling : int
         Decimation value for plotting; default is 1
+    lazy : bool
+        Option to compute the programs on demand from the input data points
+        instead of storing them for every turn (see LazyProgram), for very
+        long cycles; the optional plot is then not available; default is
+        False
+    window : int
+        Number of turns computed at once in the lazy mode; default is 1000
+    ramp_solver : str
+        Solver of the revolution period recurrence in the ramp: 'chunked'
+        (default) solves it for blocks of turns with numpy, 'turn_by_turn'
+        turn after turn; both give identical results
+    cache_dir : str
+        Directory where the Ring is saved, named after the content hash of
+        its inputs, and loaded from with memory mapped arrays when built
+        again from the same inputs; not available in the lazy mode; default
+        is None (no cache)
 
     """
     def __init__(self, interpolation='linear', smoothing=0, flat_bottom=0,
                  flat_top=0, t_start=None, t_end=None, plot=False,
-                 figdir='fig', figname='preprocess_ramp', sampling=1):
+                 figdir='fig', figname='preprocess_ramp', sampling=1,
+                 lazy=False, window=1000, ramp_solver='chunked',
+                 cache_dir=None):
 
-        if interpolation in ['linear', 'cubic', 'derivative']:
+        if interpolation in ['linear', 'cubic', 'akima', 'derivative']:
             self.interpolation = str(interpolation)
         else:
             #InputDataError
@@ -102,6 +122,27 @@ class RingOptions(object):
             raise RuntimeError("ERROR: sampling value in PreprocessRamp" +
                                " not recognised. Aborting...")
 
+        self.lazy = bool(lazy)
+        if window >= 2:
+            self.window = int(window)
+        else:
+            #TypeError
+            raise RuntimeError("ERROR: window value in PreprocessRamp" +
+                               " not recognised. Aborting...")
+
+        if ramp_solver in ['chunked', 'turn_by_turn']:
+            self.ramp_solver = str(ramp_solver)
+        else:
+            #InputDataError
+            raise RuntimeError("ERROR: ramp_solver in PreprocessRamp" +
+                               " not recognised. Aborting...")
+
+        if cache_dir is not None and self.lazy:
+            #InputDataError
+            raise RuntimeError("ERROR: cache_dir in PreprocessRamp is not" +
+                               " available in the lazy mode. Aborting...")
+        self.cache_dir = cache_dir
+
     def reshape_data(self, input_data, n_turns, n_sections,
                      interp_time='t_rev', input_to_momentum=False,
                      synchronous_data_type='momentum', mass=None, charge=None,
@@ -150,7 +191,9 @@ class RingOptions(object):
         Returns
         -------
         output_data
-            Returns the data with the adequate shape for the Ring object
+            Returns the data with the adequate shape for the Ring object; a
+            LazyProgram in the lazy mode, except for programs passed turn by
+            turn
 
         """
 
@@ -167,6 +210,9 @@ class RingOptions(object):
                 input_data = convert_data(input_data, mass, charge,
                                           synchronous_data_type,
                                           bending_radius)
+            if self.lazy:
+                return ConstantProgram(input_data*np.ones(n_sections),
+                                       n_turns+1, window=self.window)
             output_data = input_data * np.ones((n_sections, n_turns+1))
 
         # If tuple, separate time and synchronous data and check data
@@ -205,7 +251,21 @@ class RingOptions(object):
                     raise RuntimeError("ERROR in Ring: synchronous data " +
                                        "does not match the time data")
 
-                if input_to_momentum and (interp_time == 't_rev'):
+                if self.lazy and input_to_momentum \
+                        and isinstance(interp_time, str) \
+                        and interp_time == 't_rev':
+                    output_data.append(RampProgram(
+                        self, mass, circumference, input_data_time,
+                        input_data_values))
+
+                elif self.lazy and (isinstance(interp_time, np.ndarray) or
+                                    isinstance(interp_time, LazyProgram)):
+                    output_data.append(InterpolatedProgram(
+                        [input_data_time], [input_data_values], interp_time,
+                        window=self.window))
+
+                elif input_to_momentum and isinstance(interp_time, str) \
+                        and (interp_time == 't_rev'):
                     output_data.append(self.preprocess(
                         mass,
                         circumference,
@@ -225,12 +285,23 @@ class RingOptions(object):
                         input_data_time,
                         input_data_values))
 
-                elif isinstance(interp_time, np.ndarray):
+                elif isinstance(interp_time, np.ndarray) or \
+                        isinstance(interp_time, LazyProgram):
                     output_data.append(np.interp(
                         interp_time,
                         input_data_time,
                         input_data_values))
 
+            if all(isinstance(data, LazyProgram) for data in output_data):
+                if len(output_data) == 1:
+                    return output_data[0]
+                if len(set(data.shape[-1] for data in output_data)) > 1:
+                    #InputDataError
+                    raise RuntimeError("ERROR in Ring: the programs of the " +
+                                       "sections have different lengths")
+                return DerivedProgram(lambda *rows: np.vstack(rows),
+                                      output_data)
+
             output_data = np.array(output_data, ndmin=2, dtype=float)
 
         # If array/list, compares with the input number of turns and
@@ -246,8 +317,6 @@ class RingOptions(object):
                                           synchronous_data_type,
                                           bending_radius)
 
-            output_data = np.zeros((n_sections, n_turns+1), dtype=float)
-
             # If the number of points is exactly the same as n_rf, this means
             # that the rf program for each harmonic is constant, reshaping
             # the array so that the size is [n_sections,1] for successful
@@ -260,6 +329,12 @@ class RingOptions(object):
                 raise RuntimeError("ERROR in Ring: the input data " +
                                    "does not match the number of sections")
 
+            if self.lazy and input_data.shape[1] == 1:
+                return ConstantProgram(input_data[:, 0], n_turns+1,
+                                       window=self.window)
+
+            output_data = np.zeros((n_sections, n_turns+1), dtype=float)
+
             for index_section in range(len(input_data)):
                 if len(input_data[index_section]) == 1:
                     output_data[index_section] = input_data[index_section] * \
@@ -324,8 +399,41 @@ class RingOptions(object):
         time_start_ramp = np.max(time[momentum == momentum[0]])
         time_end_ramp = np.min(time[momentum == momentum[-1]])
 
+        # Interpolate data for blocks of turns
+        if self.ramp_solver == 'chunked':
+
+            time_interp.append(time_interp[-1]
+                               + circumference/(beta_interp[0]*c))
+
+            momentum_at = self.ramp_momentum(time, momentum)
+            time_chunks = [time_interp[:-1]]
+            beta_chunks = [beta_interp]
+            momentum_chunks = [momentum_interp]
+            time_previous, time_turn = time_interp[-2:]
+            momentum_previous = momentum_interp[-1]
+            n_turns = 1000
+
+            while True:
+                time_turns, beta_turns, momentum_turns = self.ramp_turns(
+                    momentum_at, mass, circumference, time[-1],
+                    time_previous, time_turn, momentum_previous, n_turns)
+                time_chunks.append(time_turns[:-1])
+                beta_chunks.append(beta_turns)
+                momentum_chunks.append(momentum_turns)
+                if len(momentum_turns) < n_turns:
+                    time_chunks.append(time_turns[-1:])
+                    break
+                time_previous, time_turn = time_turns[-2:]
+                momentum_previous = momentum_turns[-1]
+                # Longer blocks as long as the ramp goes on
+                n_turns = min(2*n_turns, 100000)
+
+            time_interp = np.concatenate(time_chunks)
+            beta_interp = np.concatenate(beta_chunks)
+            momentum_interp = np.concatenate(momentum_chunks)
+
         # Interpolate data recursively
-        if self.interpolation == 'linear':
+        elif self.interpolation == 'linear':
 
             time_interp.append(time_interp[-1]
                                + circumference/(beta_interp[0]*c))
@@ -348,12 +456,9 @@ class RingOptions(object):
 
                     i += 1
 
-        elif self.interpolation == 'cubic':
+        elif self.interpolation in ['cubic', 'akima']:
 
-            interp_funtion_momentum = splrep(
-                time[(time >= time_start_ramp) * (time <= time_end_ramp)],
-                momentum[(time >= time_start_ramp) * (time <= time_end_ramp)],
-                s=self.smoothing)
+            interp_funtion_momentum = self._ramp_spline(time, momentum)
 
             i = self.flat_bottom
 
@@ -385,7 +490,7 @@ class RingOptions(object):
                 else:
 
                     momentum_interp.append(
-                        splev(time_interp[i+1], interp_funtion_momentum))
+                        interp_funtion_momentum(time_interp[i+1]))
 
                     beta_interp.append(
                         np.sqrt(1/(1 + (mass/momentum_interp[i+1])**2)))
@@ -427,6 +532,8 @@ class RingOptions(object):
 
                 i += 1
 
+        if self.interpolation == 'derivative':
+
             # Adjust result to get flat top energy correct as derivation and
             # integration leads to ~10^-8 error in flat top momentum
             momentum_interp = np.asarray(momentum_interp)
@@ -436,8 +543,7 @@ class RingOptions(object):
 
             momentum_interp += momentum[0]
 
-        time_interp.pop()
-        time_interp = np.asarray(time_interp)
+        time_interp = np.asarray(time_interp[:-1])
         beta_interp = np.asarray(beta_interp)
         momentum_interp = np.asarray(momentum_interp)
 
@@ -493,6 +599,150 @@ class RingOptions(object):
 
         return time_interp, momentum_interp
 
+    def _ramp_spline(self, time, momentum):
+        r"""Function returning the 'cubic' or 'akima' interpolation of the
+        momentum between the start and the end of the ramp."""
+
+        time_start_ramp = np.max(time[momentum == momentum[0]])
+        time_end_ramp = np.min(time[momentum == momentum[-1]])
+        ramp = (time >= time_start_ramp) * (time <= time_end_ramp)
+
+        if self.interpolation == 'cubic':
+            interp_funtion_momentum = splrep(time[ramp], momentum[ramp],
+                                             s=self.smoothing)
+            return lambda time_turns: splev(time_turns,
+                                            interp_funtion_momentum)
+        else:
+            return Akima1DInterpolator(time[ramp], momentum[ramp])
+
+    def ramp_momentum(self, time, momentum):
+        r"""Function returning the momentum of turns of the ramp, from the
+        times of the turns and the time and momentum of the turn before the
+        first one, according to the interpolation option, with the same
+        operations as the turn by turn solver of preprocess().
+
+        Parameters
+        ----------
+        time : float array
+            Time points [s] corresponding to momentum data
+        momentum : float array
+            Particle momentum [eV/c]
+
+        Returns
+        -------
+        function
+            momentum_at(time_previous, time_turns, momentum_previous)
+
+        """
+
+        time = np.asarray(time, dtype=float)
+        momentum = np.asarray(momentum, dtype=float)
+
+        if self.interpolation == 'linear':
+
+            def momentum_at(time_previous, time_turns, momentum_previous):
+                k = np.clip(np.searchsorted(time, time_turns), 1,
+                            len(time)-1)
+                return momentum[k-1] + (momentum[k] - momentum[k-1]) * \
+                    (time_turns - time[k-1]) / (time[k] - time[k-1])
+
+        elif self.interpolation in ['cubic', 'akima']:
+
+            time_start_ramp = np.max(time[momentum == momentum[0]])
+            time_end_ramp = np.min(time[momentum == momentum[-1]])
+            interp_funtion_momentum = self._ramp_spline(time, momentum)
+
+            def momentum_at(time_previous, time_turns, momentum_previous):
+                ramp = (time_turns >= time_start_ramp) * \
+                    (time_turns <= time_end_ramp)
+                momentum_turns = np.where(time_turns < time_start_ramp,
+                                          momentum[0], momentum[-1])
+                momentum_turns[ramp] = interp_funtion_momentum(
+                    time_turns[ramp])
+                return momentum_turns
+
+        # Interpolate momentum in 1st derivative to maintain smooth B-dot
+        elif self.interpolation == 'derivative':
+
+            momentum_derivative = np.gradient(momentum)/np.gradient(time)
+
+            def momentum_at(time_previous, time_turns, momentum_previous):
+                derivative_points = np.interp(time_turns, time,
+                                              momentum_derivative)
+                time_steps = np.diff(time_turns, prepend=time_previous)
+                # Sequential sum, as the integral of the turn by turn solver
+                return np.cumsum(np.concatenate((
+                    [momentum_previous],
+                    time_steps*derivative_points)))[1:]
+
+        return momentum_at
+
+    def ramp_turns(self, momentum_at, mass, circumference, time_end,
+                   time_previous, time_turn, momentum_previous, n_turns):
+        r"""Function solving the recurrence of the revolution period over
+        n_turns turns of the ramp, the time of each turn depending on the
+        momentum of the previous one. The times of the turns are iterated
+        for the whole block until they do not change anymore; each iteration
+        makes at least one more turn exact, and usually a few iterations are
+        enough. The turns after the end of the ramp are removed.
+
+        Parameters
+        ----------
+        momentum_at : function
+            Momentum of the turns, see ramp_momentum()
+        mass : float
+            Particle mass [eV]
+        circumference : float
+            Ring circumference [m]
+        time_end : float
+            Time of the end of the ramp [s]
+        time_previous : float
+            Time of the turn before the first one [s]
+        time_turn : float
+            Time of the first turn [s]
+        momentum_previous : float
+            Momentum of the turn before the first one [eV/c]
+        n_turns : int
+            Number of turns
+
+        Returns
+        -------
+        float array
+            Time of the turns, and of the turn after the last one [s]
+        float array
+            Relativistic beta of the turns
+        float array
+            Momentum of the turns [eV/c]
+
+        """
+
+        # First guess with the revolution period of the previous turn
+        time_turns = time_turn + (time_turn - time_previous) * \
+            np.arange(n_turns+1)
+
+        for iteration in range(n_turns+2):
+            momentum_turns = momentum_at(time_previous, time_turns[:-1],
+                                         momentum_previous)
+            # np.power, as the ** of the numpy scalars
+            beta_turns = np.sqrt(1/(1 + np.power(mass/momentum_turns, 2)))
+            time_next = np.cumsum(np.concatenate((
+                [time_turn], circumference/(beta_turns*c))))
+            if np.array_equal(time_next, time_turns):
+                break
+            time_turns = time_next
+
+        # Turns of the ramp, the last 'linear' one inside the time data and
+        # the last one of the other options just after
+        if self.interpolation == 'linear':
+            n_ramp = np.searchsorted(time_turns[:-1], time_end, side='right')
+        else:
+            n_ramp = np.searchsorted(np.concatenate(([time_previous],
+                                                     time_turns[:-2])),
+                                     time_end, side='right')
+
+        return time_turns[:n_ramp+1], beta_turns[:n_ramp], \
+            momentum_turns[:n_ramp]
+
 
 def convert_data(synchronous_data, mass, charge,
                  synchronous_data_type='momentum', bending_radius=None):
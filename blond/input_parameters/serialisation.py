@@ -0,0 +1,463 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+'''
+**Module to save, load and cache the input parameter objects (Ring,
+RFStation) with their options.**
+
+The attributes of an object are split in numpy arrays and a description of
+the other attributes (numbers, strings, nested objects such as the Particle
+or the RingOptions). They are saved to a .npz file, an HDF5 file (.h5,
+.hdf5), or, for the cache, to a directory of .npy files that can be memory
+mapped; a content hash of the arrays and the description is kept and
+checked at loading.
+'''
+
+from __future__ import division
+from builtins import str
+import hashlib
+import importlib
+import json
+import os
+from collections import ChainMap
+import warnings
+import numpy as np
+import h5py as hp
+from ..input_parameters.lazy_program import LazyProgram
+
+
+# Attributes not entering the content hash of the inputs, as they do not
+# change the computed programs
+_not_hashed = ('cache_dir',)
+
+
+def content_hash(*objects):
+    r"""Function returning the SHA-256 hash of the content of the objects:
+    arrays (type, shape and values), numbers, strings, None, lists, tuples,
+    dictionaries and the attributes of other objects.
+
+    Parameters
+    ----------
+    objects
+        Objects to hash, e.g. the inputs of Ring
+
+    Returns
+    -------
+    str
+        Hexadecimal hash
+
+    """
+
+    sha = hashlib.sha256()
+    for obj in objects:
+        _update_hash(sha, obj)
+
+    return sha.hexdigest()
+
+
+def _update_hash(sha, obj):
+
+    if isinstance(obj, LazyProgram):
+        #InputDataError
+        raise RuntimeError("ERROR in content_hash: lazy programs can not " +
+                           "be hashed!")
+    elif obj is None or isinstance(obj, (bool, int, float, str,
+                                         np.generic)):
+        sha.update(repr((type(obj).__name__, obj)).encode())
+    elif isinstance(obj, np.ndarray) or \
+            (isinstance(obj, (list, tuple)) and _is_numeric(obj)):
+        obj = np.ascontiguousarray(obj)
+        sha.update(repr(('ndarray', obj.dtype.str, obj.shape)).encode())
+        sha.update(obj.tobytes())
+    elif isinstance(obj, (list, tuple)):
+        sha.update(repr((type(obj).__name__, len(obj))).encode())
+        for item in obj:
+            _update_hash(sha, item)
+    elif isinstance(obj, dict):
+        sha.update(repr(('dict', sorted(obj))).encode())
+        for key in sorted(obj):
+            _update_hash(sha, obj[key])
+    elif hasattr(obj, '__dict__'):
+        sha.update(_class_path(obj).encode())
+        _update_hash(sha, dict((key, value) for key, value
+                               in vars(obj).items()
+                               if key not in _not_hashed))
+    else:
+        #InputDataError
+        raise RuntimeError("ERROR in content_hash: objects of type " +
+                           type(obj).__name__ + " can not be hashed!")
+
+
+def _is_numeric(sequence):
+
+    # Ragged sequences are hashed item by item
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', np.VisibleDeprecationWarning)
+        try:
+            return np.asarray(sequence).dtype.kind in 'biuf'
+        except (ValueError, np.VisibleDeprecationWarning):
+            return False
+
+
+def _class_path(obj):
+
+    return type(obj).__module__ + '.' + type(obj).__name__
+
+
+def _split(obj, prefix, arrays, memo=None):
+    r"""Description of the attributes of obj, the arrays being moved to the
+    arrays dictionary; see _describe for the memo."""
+
+    attributes = list(vars(obj).items())
+    if memo is not None:
+        if _is_input(obj):
+            # Only the tracking state of the inputs, their programs being
+            # rebuilt by the main file
+            for key, value in attributes:
+                if key not in obj._tracking_state and _is_memoized(value):
+                    memo.setdefault(id(value), None)
+            attributes = [(key, value) for key, value in attributes
+                          if key in obj._tracking_state]
+        # The inputs first, so that the programs shared with other
+        # attributes (e.g. the voltage of the tracker) are skipped as well
+        attributes.sort(key=lambda attribute: not _is_input(attribute[1]))
+        complete_state = getattr(obj, '_complete_state', None)
+        if complete_state is not None:
+            complete_state()
+
+    description = {}
+    for key, value in attributes:
+        value = _describe(value, prefix + key, arrays, memo)
+        if value is not None:
+            description[key] = value
+
+    return {'kind': 'object', 'class': _class_path(obj),
+            'attributes': description}
+
+
+def _is_input(value):
+
+    # Input objects (Ring, RFStation), defining the attributes changed by
+    # the tracking
+    return hasattr(type(value), '_tracking_state')
+
+
+def _is_memoized(value):
+
+    # Mutable values, which can be shared by several objects
+    return isinstance(value, (np.ndarray, list, dict)) or \
+        (hasattr(value, '__dict__') and not isinstance(value, type))
+
+
+def _describe(value, name, arrays, memo=None):
+    r"""Description of value, the arrays being moved to the arrays
+    dictionary (without copy).
+
+    Without memo (save), all the values should be supported. With a memo
+    (checkpoint, see utils.checkpoint), a dictionary from the id of the
+    values described to their name: the values described before are
+    references, the values not supported (functions, files, objects of
+    other packages) are skipped and their description is None, and only
+    the tracking state of the input objects is described.
+    """
+
+    if memo is not None and id(value) in memo:
+        if memo[id(value)] is None:
+            return None
+        return {'kind': 'reference', 'name': memo[id(value)]}
+
+    if isinstance(value, LazyProgram) and memo is None:
+        #InputDataError
+        raise RuntimeError("ERROR in save: lazy programs can not be " +
+                           "saved!")
+    elif isinstance(value, (np.ndarray, np.generic)) and \
+            not np.asarray(value).dtype.hasobject:
+        if isinstance(value, np.ndarray) and memo is not None:
+            memo[id(value)] = name
+        arrays[name] = np.asarray(value)
+        return {'kind': 'array' if isinstance(value, np.ndarray)
+                else 'scalar'}
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        return {'kind': 'value', 'value': value}
+    elif isinstance(value, (list, tuple, dict)):
+        return _describe_items(value, name, arrays, memo)
+    elif hasattr(value, '__dict__') and not isinstance(value, type) and \
+            (memo is None or _is_blond_object(value)):
+        if memo is not None:
+            memo[id(value)] = name
+        return _split(value, name + '.', arrays, memo)
+    elif memo is not None:
+        return None
+    else:
+        #InputDataError
+        raise RuntimeError("ERROR in save: attributes of type " +
+                           type(value).__name__ + " can not be saved!")
+
+
+def _describe_items(value, name, arrays, memo):
+
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            if memo is not None:
+                return None
+            #InputDataError
+            raise RuntimeError("ERROR in save: dictionaries with keys " +
+                               "other than strings can not be saved!")
+        keys = list(value)
+    else:
+        keys = range(len(value))
+
+    # With a memo, the items are described in a scratch memo and arrays,
+    # kept only if all the items are supported
+    if memo is not None:
+        outer_memo, outer_arrays = memo, arrays
+        memo, arrays = ChainMap({}, memo), {}
+        if not isinstance(value, tuple):
+            memo[id(value)] = name
+
+    items = [_describe(value[key], name + '.' + str(key), arrays, memo)
+             for key in keys]
+
+    if memo is not None:
+        if any(item is None for item in items):
+            if not isinstance(value, tuple):
+                outer_memo[id(value)] = None
+            return None
+        outer_memo.update(memo.maps[0])
+        outer_arrays.update(arrays)
+
+    if isinstance(value, dict):
+        return {'kind': 'dict', 'items': dict(zip(keys, items))}
+    else:
+        return {'kind': type(value).__name__, 'items': items}
+
+
+def _is_blond_object(value):
+
+    # Objects of BLonD or of the main file, the others being rebuilt
+    module = type(value).__module__
+    return module.startswith('blond.') or module == '__main__'
+
+
+def _join(description, name, arrays, live=None, restored=None):
+    r"""Value of the description. With restored (checkpoint), a dictionary
+    from the names of the values restored to the values, the live value of
+    the main file is filled in place when possible, so that it stays
+    shared with the objects not saved."""
+
+    kind = description['kind']
+    if kind == 'reference':
+        return restored[description['name']]
+    elif kind == 'array':
+        array = arrays[name]
+        if restored is not None and isinstance(live, np.ndarray) and \
+                live.flags.writeable and live.shape == array.shape and \
+                live.dtype == array.dtype:
+            live[...] = array
+            array = live
+        if restored is not None:
+            restored[name] = array
+        return array
+    elif kind == 'scalar':
+        return arrays[name][()]
+    elif kind == 'value':
+        return description['value']
+    elif kind in ['list', 'tuple', 'dict']:
+        return _join_items(description, name, arrays, live, restored)
+    else:
+        if restored is None or _class_path(live) != description['class']:
+            module, class_name = description['class'].rsplit('.', 1)
+            cls = getattr(importlib.import_module(module), class_name)
+            live = cls.__new__(cls)
+        if restored is not None:
+            restored[name] = live
+        _restore(live, description, name + '.' if name else '', arrays,
+                 restored)
+        return live
+
+
+def _join_items(description, name, arrays, live, restored):
+
+    kind = description['kind']
+    items = description['items']
+    keys = list(items) if kind == 'dict' else range(len(items))
+    if kind == 'dict':
+        items = [items[key] for key in keys]
+
+    if restored is None or type(live).__name__ != kind or \
+            (kind != 'dict' and len(live) != len(items)):
+        live = {} if kind == 'dict' else [None] * len(items)
+    elif kind == 'dict':
+        for key in set(live) - set(keys):
+            del live[key]
+    if kind == 'tuple':
+        live = list(live)
+    elif restored is not None:
+        restored[name] = live
+
+    for key, item in zip(keys, items):
+        live[key] = _join(item, name + '.' + str(key), arrays,
+                          live.get(key) if kind == 'dict' else live[key],
+                          restored)
+
+    return tuple(live) if kind == 'tuple' else live
+
+
+def _restore(obj, description, prefix, arrays, restored=None):
+
+    for key, value in description['attributes'].items():
+        setattr(obj, key, _join(value, prefix + key, arrays,
+                                getattr(obj, key, None), restored))
+
+
+def _array_hash(arrays, description):
+
+    return content_hash(description, *[np.asarray(arrays[name]) for name
+                                       in sorted(arrays)])
+
+
+def save(obj, filename):
+    r"""Function saving the attributes of obj (e.g. a Ring or an RFStation,
+    with its options) to a .npz file, an HDF5 file if the file name ends
+    with .h5 or .hdf5, or a directory of .npy files otherwise.
+
+    Parameters
+    ----------
+    obj : object
+        Object to save; lazy programs can not be saved
+    filename : str
+        Name of the file or directory
+
+    Returns
+    -------
+    str
+        Content hash of the saved data
+
+    """
+
+    arrays = {}
+    description = _split(obj, '', arrays)
+    checksum = _array_hash(arrays, description)
+    header = json.dumps({'description': description, 'hash': checksum})
+
+    if filename.endswith('.npz'):
+        np.savez_compressed(filename, __header__=np.array(header), **arrays)
+    elif filename.endswith(('.h5', '.hdf5')):
+        with hp.File(filename, 'w') as h5file:
+            h5file.attrs['header'] = header
+            for name, array in arrays.items():
+                h5file.create_dataset(name, data=array)
+    else:
+        # Written to a temporary directory first, so that an interrupted
+        # job does not leave an incomplete cache entry
+        temporary = filename + '.tmp' + str(os.getpid())
+        os.makedirs(temporary)
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary, name + '.npy'), array)
+        with open(os.path.join(temporary, 'header.json'), 'w') as header_file:
+            header_file.write(header)
+        try:
+            os.rename(temporary, filename)
+        except OSError:
+            # Saved meanwhile by another job
+            for name in os.listdir(temporary):
+                os.remove(os.path.join(temporary, name))
+            os.rmdir(temporary)
+
+    return checksum
+
+
+def load(filename, cls=None, obj=None, mmap_mode=None):
+    r"""Function loading an object saved by save(), checking its content
+    hash.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file or directory
+    cls : class
+        Expected class of the object; default is any
+    obj : object
+        Existing object to fill with the loaded attributes, instead of
+        creating a new one
+    mmap_mode : str
+        Memory mapping mode of numpy.load for the arrays of a directory
+        (e.g. 'r', or 'c' for copy on write); default is None
+
+    Returns
+    -------
+    object
+        Loaded object
+
+    """
+
+    if filename.endswith('.npz'):
+        with np.load(filename) as npzfile:
+            header = json.loads(str(npzfile['__header__']))
+            arrays = dict((name, npzfile[name]) for name in npzfile.files
+                          if name != '__header__')
+    elif filename.endswith(('.h5', '.hdf5')):
+        with hp.File(filename, 'r') as h5file:
+            header = json.loads(h5file.attrs['header'])
+            arrays = dict((name, np.asarray(h5file[name][()]))
+                          for name in h5file)
+    else:
+        with open(os.path.join(filename, 'header.json')) as header_file:
+            header = json.loads(header_file.read())
+        arrays = dict((name[:-4], np.load(os.path.join(filename, name),
+                                          mmap_mode=mmap_mode))
+                      for name in os.listdir(filename)
+                      if name.endswith('.npy'))
+
+    description = header['description']
+    if _array_hash(arrays, description) != header['hash']:
+        #InputDataError
+        raise RuntimeError("ERROR in load: the content hash of " +
+                           filename + " does not match!")
+
+    if cls is not None and description['class'] != \
+            cls.__module__ + '.' + cls.__name__:
+        #InputDataError
+        raise RuntimeError("ERROR in load: " + filename + " contains a " +
+                           description['class'] + " object!")
+
+    if obj is None:
+        return _join(description, '', arrays)
+    else:
+        _restore(obj, description, '', arrays)
+        return obj
+
+
+def cache_entry(cache_dir, cls, *inputs):
+    r"""Function returning the path of the cache entry of an object of
+    class cls built from the inputs, named after their content hash."""
+
+    return os.path.join(cache_dir, cls.__name__ + '_' +
+                        content_hash(*inputs))
+
+
+def load_cached(obj, entry):
+    r"""Function filling obj from the cache entry, if it exists, with copy
+    on write memory mapped arrays. Returns whether the entry was found."""
+
+    if not os.path.isdir(entry):
+        return False
+    load(entry, type(obj), obj, mmap_mode='c')
+
+    return True
+
+
+def store_cached(obj, entry):
+    r"""Function saving obj to the cache entry."""
+
+    if not os.path.isdir(entry):
+        directory = os.path.dirname(entry)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        save(obj, entry)
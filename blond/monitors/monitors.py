@@ -14,8 +14,95 @@
 '''
 
 from builtins import object
+import os
+import json
+import atexit
+import threading
 import h5py as hp
 import numpy as np
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+def _dataset_options(compression, compression_opts, chunks, dims):
+    ''' Keyword arguments of create_dataset for the compression and the
+        chunks (number of turns per chunk) of the monitors.
+    '''
+
+    options = {'compression': compression}
+    if compression is not None:
+        options['compression_opts'] = compression_opts
+    if chunks is not None:
+        options['chunks'] = (min(chunks, dims[0]),) + tuple(dims[1:])
+    return options
+
+
+class AsyncWriter(object):
+
+    ''' Background thread writing the buffers of the monitors to file, so
+        that the compression and the writing overlap with the tracking.
+        The writes are passed as functions through a queue of at most
+        'queue_size' entries; submit() only blocks when the queue is full.
+        An exception raised by a write is raised again by the following
+        submit(), flush() or close(). close() stops the thread; it is also
+        called at the exit of the interpreter for the writers still open.
+    '''
+
+    def __init__(self, queue_size=1):
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+        # Pending writes are completed when the interpreter exits, if the
+        # writer was not closed before
+        atexit.register(self.close)
+
+    def _run(self):
+
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                function, args = job
+                function(*args)
+            except Exception as error:
+                if self.error is None:
+                    self.error = error
+            finally:
+                self.queue.task_done()
+
+    def _raise(self):
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, function, *args):
+
+        self._raise()
+        if self.thread.is_alive():
+            self.queue.put((function, args))
+        else:
+            # After close(), the writes are done synchronously
+            function(*args)
+
+    def flush(self):
+
+        self.queue.join()
+        self._raise()
+
+    def close(self):
+
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+            atexit.unregister(self.close)
+        self._raise()
 
 
 class BunchMonitor(object):
@@ -25,13 +112,30 @@ class BunchMonitor(object):
         If in the constructor a Profile object is passed, that means that one
         wants to save the gaussian-fit bunch length as well (obviously the 
         Profile object has to have the fit_option set to 'gaussian').
+        The datasets are compressed with 'compression' and 'compression_opts'
+        (default gzip level 9), in chunks of 'chunks' turns (default chosen
+        by h5py). With asynchronous=True, the full buffers are handed over to
+        an AsyncWriter and new buffers are filled while they are written;
+        the file is complete only after flush() or close(), to be called
+        before reading it. close() also stops the writer thread, which is
+        otherwise stopped after the last turn.
+        Objects registered with subscribe() receive the buffers turn by turn,
+        e.g. to plot the data without reading the file.
     '''
 
     def __init__(self, Ring, RFParameters, Beam, filename,
                  buffer_time=None,
-                 Profile=None, PhaseLoop=None, LHCNoiseFB=None):
+                 Profile=None, PhaseLoop=None, LHCNoiseFB=None,
+                 compression='gzip', compression_opts=9, chunks=None,
+                 asynchronous=False, queue_size=1):
 
         self.filename = filename
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.chunks = chunks
+        self.writer = None
+        if asynchronous:
+            self.writer = AsyncWriter(queue_size)
         self.n_turns = Ring.n_turns
         self.i_turn = 0
         self.buffer_time = buffer_time
@@ -49,6 +153,7 @@ class BunchMonitor(object):
             self.fit_option = False
         self.PL = PhaseLoop
         self.LHCNoiseFB = LHCNoiseFB
+        self.subscribers = []
 
         # Initialise data and save initial state
         self.init_data(self.filename, (self.n_turns + 1,))
@@ -62,16 +167,50 @@ class BunchMonitor(object):
 
         # Write buffer with i_turn = RFcounter - 1
         self.write_buffer()
+        if self.subscribers:
+            buffers = self.buffers()
+            index = self.i_turn % self.buffer_time
+            for subscriber in self.subscribers:
+                subscriber(self.i_turn, buffers, index)
 
         # Synchronise to i_turn = RFcounter
         self.i_turn += 1
 
         if self.i_turn > 0 and (self.i_turn % self.buffer_time) == 0:
-            self.open()
-            self.write_data(self.h5file['Beam'], (self.n_turns + 1,))
-            self.close()
+            if self.writer is None:
+                self.open()
+                self.write_data(self.h5file['Beam'], (self.n_turns + 1,))
+                self.close()
+            else:
+                # The buffers are handed over, new ones are filled meanwhile
+                self.writer.submit(self._write_buffers, self.buffers(),
+                                   self.i_turn - self.buffer_time,
+                                   self.i_turn)
             self.init_buffer()
 
+        # No more writes after the last turn
+        if self.writer is not None and self.i_turn > self.n_turns:
+            self.writer.close()
+
+    def flush(self):
+        ''' Waits for the asynchronous writes to be completed. '''
+
+        if self.writer is not None:
+            self.writer.flush()
+
+    def subscribe(self, subscriber):
+        ''' Registers subscriber(turn, buffers, index), called after each
+            turn is written to the buffers, with buffers[name][index] the
+            data of that turn. The turns still in the current buffers are
+            passed at once.
+        '''
+
+        buffers = self.buffers()
+        n_buffered = self.i_turn % self.buffer_time
+        for index in range(n_buffered):
+            subscriber(self.i_turn - n_buffered + index, buffers, index)
+        self.subscribers.append(subscriber)
+
     def init_data(self, filename, dims):
 
         # Prepare data
@@ -83,100 +222,88 @@ class BunchMonitor(object):
 
         # Create datasets and write first data points
         h5group = self.h5file['Beam']
+        options = _dataset_options(self.compression, self.compression_opts,
+                                   self.chunks, dims)
 
         h5group.create_dataset("n_macroparticles_alive", shape=dims,
-                               dtype='f',
-                               compression="gzip", compression_opts=9)
+                               dtype='f', **options)
         h5group["n_macroparticles_alive"][0] = self.beam.n_macroparticles_alive
 
-        h5group.create_dataset("mean_dt", shape=dims, dtype='f',
-                               compression="gzip", compression_opts=9)
+        h5group.create_dataset("mean_dt", shape=dims, dtype='f', **options)
         h5group["mean_dt"][0] = self.beam.mean_dt
 
-        h5group.create_dataset("mean_dE", shape=dims, dtype='f',
-                               compression="gzip", compression_opts=9)
+        h5group.create_dataset("mean_dE", shape=dims, dtype='f', **options)
         h5group["mean_dE"][0] = self.beam.mean_dE
 
-        h5group.create_dataset("sigma_dt", shape=dims, dtype='f',
-                               compression="gzip", compression_opts=9)
+        h5group.create_dataset("sigma_dt", shape=dims, dtype='f', **options)
         h5group["sigma_dt"][0] = self.beam.sigma_dt
 
-        h5group.create_dataset("sigma_dE", shape=dims, dtype='f',
-                               compression="gzip", compression_opts=9)
+        h5group.create_dataset("sigma_dE", shape=dims, dtype='f', **options)
         h5group["sigma_dE"][0] = self.beam.sigma_dE
 
-        h5group.create_dataset("epsn_rms_l", shape=dims, dtype='f',
-                               compression="gzip", compression_opts=9)
+        h5group.create_dataset("epsn_rms_l", shape=dims, dtype='f', **options)
         h5group["epsn_rms_l"][0] = self.beam.epsn_rms_l
 
         if self.fit_option == True:
 
             h5group.create_dataset("bunch_length", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["bunch_length"][0] = self.profile.bunchLength
 
         if self.PL:
 
             h5group.create_dataset("PL_omegaRF", shape=dims,
-                                   dtype=np.float64,
-                                   compression="gzip", compression_opts=9)
+                                   dtype=np.float64, **options)
             h5group["PL_omegaRF"][0] = self.rf_params.omega_rf[0, 0]
 
             h5group.create_dataset("PL_phiRF", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["PL_phiRF"][0] = self.rf_params.phi_rf[0, 0]
 
             h5group.create_dataset("PL_bunch_phase", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["PL_bunch_phase"][0] = self.PL.phi_beam
 
             h5group.create_dataset("PL_phase_corr", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["PL_phase_corr"][0] = self.PL.dphi
 
             h5group.create_dataset("PL_omegaRF_corr", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["PL_omegaRF_corr"][0] = self.PL.domega_rf
 
             h5group.create_dataset("SL_dphiRF", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["SL_dphiRF"][0] = self.rf_params.dphi_rf[0]
 
             h5group.create_dataset("RL_drho", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["RL_drho"][0] = self.PL.drho
 
         if self.LHCNoiseFB:
 
             h5group.create_dataset("LHC_noise_FB_factor", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["LHC_noise_FB_factor"][0] = self.LHCNoiseFB.x
 
             h5group.create_dataset("LHC_noise_FB_bl", shape=dims,
-                                   dtype='f',
-                                   compression="gzip", compression_opts=9)
+                                   dtype='f', **options)
             h5group["LHC_noise_FB_bl"][0] = self.LHCNoiseFB.bl_meas
 
             if self.LHCNoiseFB.bl_meas_bbb != None:
 
+                dims_bbb = (self.n_turns + 1, len(self.LHCNoiseFB.bl_meas_bbb))
                 h5group.create_dataset("LHC_noise_FB_bl_bbb",
-                                       shape=(self.n_turns + 1,
-                                              len(self.LHCNoiseFB.bl_meas_bbb)),
-                                       dtype='f', compression="gzip",
-                                       compression_opts=9)
+                                       shape=dims_bbb, dtype='f',
+                                       **_dataset_options(
+                                           self.compression,
+                                           self.compression_opts,
+                                           self.chunks, dims_bbb))
                 h5group["LHC_noise_FB_bl_bbb"][0,
                                                :] = self.LHCNoiseFB.bl_meas_bbb[:]
 
         # Close file
-        self.close()
+        self.h5file.close()
 
         # Initialise buffer for next turn
         self.init_buffer()
@@ -244,88 +371,66 @@ class BunchMonitor(object):
             if self.LHCNoiseFB.bl_meas_bbb != None:
                 self.b_LHCnoiseFB_bl_bbb[i, :] = self.LHCNoiseFB.bl_meas_bbb[:]
 
-    def write_data(self, h5group, dims):
-
-        i1 = self.i_turn - self.buffer_time
-        i2 = self.i_turn
-
-        h5group.require_dataset("n_macroparticles_alive", shape=dims,
-                                dtype='f')
-        h5group["n_macroparticles_alive"][i1:i2] = self.b_np_alive[:]
-
-        h5group.require_dataset("mean_dt", shape=dims, dtype='f')
-        h5group["mean_dt"][i1:i2] = self.b_mean_dt[:]
+    def buffers(self):
+        ''' Buffers of the current turns, by dataset name. '''
 
-        h5group.require_dataset("mean_dE", shape=dims, dtype='f')
-        h5group["mean_dE"][i1:i2] = self.b_mean_dE[:]
-
-        h5group.require_dataset("sigma_dt", shape=dims, dtype='f')
-        h5group["sigma_dt"][i1:i2] = self.b_sigma_dt[:]
-
-        h5group.require_dataset("sigma_dE", shape=dims, dtype='f')
-        h5group["sigma_dE"][i1:i2] = self.b_sigma_dE[:]
-
-        h5group.require_dataset("epsn_rms_l", shape=dims, dtype='f')
-        h5group["epsn_rms_l"][i1:i2] = self.b_epsn_rms[:]
+        buffers = {"n_macroparticles_alive": self.b_np_alive,
+                   "mean_dt": self.b_mean_dt,
+                   "mean_dE": self.b_mean_dE,
+                   "sigma_dt": self.b_sigma_dt,
+                   "sigma_dE": self.b_sigma_dE,
+                   "epsn_rms_l": self.b_epsn_rms}
 
         if self.fit_option == True:
 
-            h5group.require_dataset("bunch_length", shape=dims,
-                                    dtype='f')
-            h5group["bunch_length"][i1:i2] = self.b_bl[:]
+            buffers["bunch_length"] = self.b_bl
 
         if self.PL:
 
-            h5group.require_dataset("PL_omegaRF", shape=dims,
-                                    dtype=np.float64)
-            h5group["PL_omegaRF"][i1:i2] = self.b_PL_omegaRF[:]
-
-            h5group.require_dataset("PL_phiRF", shape=dims,
-                                    dtype='f')
-            h5group["PL_phiRF"][i1:i2] = self.b_PL_phiRF[:]
-
-            h5group.require_dataset("PL_bunch_phase", shape=dims,
-                                    dtype='f')
-            h5group["PL_bunch_phase"][i1:i2] = self.b_PL_bunch_phase[:]
+            buffers["PL_omegaRF"] = self.b_PL_omegaRF
+            buffers["PL_phiRF"] = self.b_PL_phiRF
+            buffers["PL_bunch_phase"] = self.b_PL_bunch_phase
+            buffers["PL_phase_corr"] = self.b_PL_phase_corr
+            buffers["PL_omegaRF_corr"] = self.b_PL_omegaRF_corr
+            buffers["SL_dphiRF"] = self.b_SL_dphiRF
+            buffers["RL_drho"] = self.b_RL_drho
 
-            h5group.require_dataset("PL_phase_corr", shape=dims,
-                                    dtype='f')
-            h5group["PL_phase_corr"][i1:i2] = self.b_PL_phase_corr[:]
+        if self.LHCNoiseFB:
 
-            h5group.require_dataset("PL_omegaRF_corr", shape=dims,
-                                    dtype='f')
-            h5group["PL_omegaRF_corr"][i1:i2] = self.b_PL_omegaRF_corr[:]
+            buffers["LHC_noise_FB_factor"] = self.b_LHCnoiseFB_factor
+            buffers["LHC_noise_FB_bl"] = self.b_LHCnoiseFB_bl
+            if self.LHCNoiseFB.bl_meas_bbb != None:
+                buffers["LHC_noise_FB_bl_bbb"] = self.b_LHCnoiseFB_bl_bbb
 
-            h5group.require_dataset("SL_dphiRF", shape=dims,
-                                    dtype='f')
-            h5group["SL_dphiRF"][i1:i2] = self.b_SL_dphiRF[:]
+        return buffers
 
-            h5group.require_dataset("RL_drho", shape=dims,
-                                    dtype='f')
-            h5group["RL_drho"][i1:i2] = self.b_RL_drho[:]
+    def write_data(self, h5group, dims):
 
-        if self.LHCNoiseFB:
+        i1 = self.i_turn - self.buffer_time
+        i2 = self.i_turn
 
-            h5group.require_dataset("LHC_noise_FB_factor", shape=dims,
-                                    dtype='f')
-            h5group["LHC_noise_FB_factor"][i1:i2] = self.b_LHCnoiseFB_factor[:]
+        for name, buffer in self.buffers().items():
+            h5group[name][i1:i2] = buffer
 
-            h5group.require_dataset("LHC_noise_FB_bl", shape=dims,
-                                    dtype='f')
-            h5group["LHC_noise_FB_bl"][i1:i2] = self.b_LHCnoiseFB_bl[:]
+    def _write_buffers(self, buffers, i1, i2):
 
-            if self.LHCNoiseFB.bl_meas_bbb != None:
-                h5group.require_dataset("LHC_noise_FB_bl_bbb", shape=(self.n_turns + 1,
-                                                                      len(self.LHCNoiseFB.bl_meas_bbb)),
-                                        dtype='f')
-                h5group["LHC_noise_FB_bl_bbb"][i1:i2,
-                                               :] = self.b_LHCnoiseFB_bl_bbb[:, :]
+        # Called by the writer thread, which opens its own file handle
+        with hp.File(self.filename + '.h5', 'r+') as h5file:
+            h5group = h5file.require_group('Beam')
+            for name, buffer in buffers.items():
+                h5group[name][i1:i2] = buffer
 
     def open(self):
         self.h5file = hp.File(self.filename + '.h5', 'r+')
         self.h5file.require_group('Beam')
 
     def close(self):
+        ''' Closes the file; with asynchronous=True, waits for the pending
+            writes and stops the writer thread.
+        '''
+
+        if self.writer is not None:
+            self.writer.close()
         self.h5file.close()
 
 
@@ -371,9 +476,24 @@ class MultiBunchMonitor(object):
 
     ''' Class able to save multi-bunch profile, i.e. the histogram derived from
         the slicing.
+        The datasets are compressed with 'compression' and 'compression_opts'
+        (default gzip level 4), in chunks of 'chunks' turns (default chosen
+        by h5py). With asynchronous=True, the buffers are double-buffered:
+        the full ones are written by an AsyncWriter while the others are
+        filled, and tracking only waits if the writer is still busy with the
+        previous ones.
     '''
 
-    def __init__(self, filename, n_turns, profile, rf, Nbunches, buffer_size=100):
+    def __init__(self, filename, n_turns, profile, rf, Nbunches, buffer_size=100,
+                 compression='gzip', compression_opts=4, chunks=None,
+                 asynchronous=False, queue_size=1):
+
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.chunks = chunks
+        self.writer = None
+        if asynchronous:
+            self.writer = AsyncWriter(queue_size)
 
         self.h5file = hp.File(filename + '.h5', 'w')
         self.n_turns = n_turns
@@ -455,6 +575,12 @@ class MultiBunchMonitor(object):
             self.b_std_dt = np.zeros(
                 (self.buffer_size, self.Nbunches), dtype=float)
 
+        if self.writer is not None:
+            # Second set of buffers, filled while the first one is written
+            self._free_buffers = queue.Queue()
+            self._free_buffers.put({name: np.zeros_like(buffer) for name, buffer
+                                    in self.buffers().items()})
+
     def __del__(self):
         if self.i_turn > self.last_save:
             self.write_data()
@@ -497,28 +623,46 @@ class MultiBunchMonitor(object):
                     self.rf.voltage[0, turn-1] / \
                     (self.rf.beta[turn]**2 * self.rf.energy[turn])
 
+    def buffers(self):
+        ''' Buffers of the current turns, by dataset name. '''
+
+        names = ['turns', 'profile', 'losses', 'fwhm_bunch_position',
+                 'fwhm_bunch_length']
+        if self.Nbunches == 1:
+            names += ['mean_dE', 'dE_norm', 'dt_norm', 'mean_dt', 'std_dE',
+                      'std_dt']
+        return {name: getattr(self, 'b_' + name) for name in names}
+
     def write_data(self):
         i1_h5 = self.last_save
         i2_h5 = self.i_turn
-        i1_b = 0
-        i2_b = self.i_turn - self.last_save
         # print("i1_h5, i2_h5:{}-{}".format(i1_h5, i2_h5))
 
         self.last_save = self.i_turn
 
-        self.h5group['turns'][i1_h5:i2_h5] = self.b_turns[i1_b:i2_b]
-        self.h5group['profile'][i1_h5:i2_h5] = self.b_profile[i1_b:i2_b]
-        self.h5group['losses'][i1_h5:i2_h5] = self.b_losses[i1_b:i2_b]
-        self.h5group['fwhm_bunch_position'][i1_h5:i2_h5] = self.b_fwhm_bunch_position[i1_b:i2_b]
-        self.h5group['fwhm_bunch_length'][i1_h5:i2_h5] = self.b_fwhm_bunch_length[i1_b:i2_b]
+        if self.writer is None:
+            self._write_buffers(self.buffers(), i1_h5, i2_h5)
+        else:
+            self.writer.submit(self._write_buffers, self.buffers(),
+                               i1_h5, i2_h5)
+            # Swap to the other set of buffers, waiting for it to be written
+            for name, buffer in self._free_buffers.get().items():
+                setattr(self, 'b_' + name, buffer)
 
-        if self.Nbunches == 1:
-            self.h5group['mean_dE'][i1_h5:i2_h5] = self.b_mean_dE[i1_b:i2_b]
-            self.h5group['dE_norm'][i1_h5:i2_h5] = self.b_dE_norm[i1_b:i2_b]
-            self.h5group['dt_norm'][i1_h5:i2_h5] = self.b_dt_norm[i1_b:i2_b]
-            self.h5group['mean_dt'][i1_h5:i2_h5] = self.b_mean_dt[i1_b:i2_b]
-            self.h5group['std_dE'][i1_h5:i2_h5] = self.b_std_dE[i1_b:i2_b]
-            self.h5group['std_dt'][i1_h5:i2_h5] = self.b_std_dt[i1_b:i2_b]
+    def _write_buffers(self, buffers, i1_h5, i2_h5):
+
+        try:
+            for name, buffer in buffers.items():
+                self.h5group[name][i1_h5:i2_h5] = buffer[:i2_h5 - i1_h5]
+        finally:
+            if self.writer is not None:
+                self._free_buffers.put(buffers)
+
+    def flush(self):
+        ''' Waits for the asynchronous writes to be completed. '''
+
+        if self.writer is not None:
+            self.writer.flush()
 
     def track(self, turn):
 
@@ -530,10 +674,176 @@ class MultiBunchMonitor(object):
 
     def create_data(self, name, h5group, dims, dtype):
 
-        h5group.create_dataset(name, dims, compression='gzip',
-                               compression_opts=4, dtype=dtype, shuffle=True)
+        h5group.create_dataset(name, dims, dtype=dtype, shuffle=True,
+                               **_dataset_options(self.compression,
+                                                  self.compression_opts,
+                                                  self.chunks, dims))
 
     def close(self):
         if self.i_turn > self.last_save:
             self.write_data()
+        if self.writer is not None:
+            self.writer.close()
         self.h5file.close()
+
+
+def phase_space_record(dtype, n_particles):
+    ''' Record of a snapshot of PhaseSpaceMonitor. '''
+
+    return np.dtype([('turn', '<i8'),
+                     ('id', '<i8', (n_particles,)),
+                     ('dt', dtype, (n_particles,)),
+                     ('dE', dtype, (n_particles,))])
+
+
+class PhaseSpaceMonitor(object):
+
+    ''' Class able to save snapshots of the phase space coordinates (dt, dE)
+        of the particles every 'save_every' turns, for one particle out of
+        'stride', in single (default) or double precision. The snapshots are
+        appended to a binary file as fixed-size records (turn, id, dt, dE)
+        after a short header, so that they can be memory-mapped by
+        PhaseSpaceReader without loading the file in memory.
+        The monitored particles are chosen at the construction, and keep
+        their place in the records when the beam arrays shrink (compaction
+        of the lost particles, load balancing); the lost particles are
+        saved with id 0 and NaN coordinates.
+    '''
+
+    magic = b'BLONDPS1'
+
+    def __init__(self, filename, Beam, save_every=1, stride=1,
+                 dtype=np.float32):
+
+        self.filename = filename + '.bin'
+        self.beam = Beam
+        self.save_every = save_every
+        self.stride = stride
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in [np.dtype(np.float32), np.dtype(np.float64)]:
+            # DtypeError
+            raise RuntimeError("ERROR in PhaseSpaceMonitor: dtype should " +
+                               "be float32 or float64")
+        self.i_turn = 0
+
+        self.ids = np.array(self.beam.id[::self.stride], dtype=np.int64)
+        self.n_particles = len(self.ids)
+        # Length of the beam arrays for which the monitored particles are
+        # still found by the stride
+        self._n_macroparticles = len(self.beam.id)
+        self.record = phase_space_record(self.dtype, self.n_particles)
+        self._buffer = np.zeros(1, dtype=self.record)
+
+        header = json.dumps({'dtype': self.dtype.str,
+                             'n_particles': self.n_particles,
+                             'stride': self.stride,
+                             'save_every': self.save_every}).encode()
+        # Records aligned to 64 bytes from the start of the file
+        header_size = 64 * int(np.ceil((len(self.magic) + 4 + len(header))
+                                       / 64.))
+        header = header.ljust(header_size - len(self.magic) - 4)
+
+        self.file = open(self.filename, 'wb')
+        self.file.write(self.magic)
+        self.file.write(np.uint32(header_size).tobytes())
+        self.file.write(header)
+
+    def track(self):
+
+        if self.i_turn % self.save_every == 0:
+            self._buffer['turn'] = self.i_turn
+            if len(self.beam.id) == self._n_macroparticles:
+                self._buffer['id'][0] = self.beam.id[::self.stride]
+                self._buffer['dt'][0] = self.beam.dt[::self.stride]
+                self._buffer['dE'][0] = self.beam.dE[::self.stride]
+            else:
+                self._fill_by_id()
+            lost = self._buffer['id'][0] == 0
+            self._buffer['dt'][0][lost] = np.nan
+            self._buffer['dE'][0][lost] = np.nan
+            self.file.write(self._buffer.tobytes())
+
+        self.i_turn += 1
+
+    def _fill_by_id(self):
+        # The arrays have changed size, the monitored particles are looked up
+        # by their id
+        ids = np.asarray(self.beam.id)
+        max_id = max(int(self.ids.max()), 0)
+        found = (ids > 0) & (ids <= max_id)
+        position = np.full(max_id + 1, -1, dtype=np.int64)
+        position[ids[found]] = np.nonzero(found)[0]
+        position = position[self.ids]
+        present = position >= 0
+        self._buffer['id'][0] = np.where(present, self.ids, 0)
+        self._buffer['dt'][0][present] = self.beam.dt[position[present]]
+        self._buffer['dE'][0][present] = self.beam.dE[position[present]]
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class PhaseSpaceReader(object):
+
+    ''' Class able to read the snapshots saved by PhaseSpaceMonitor. The file
+        is memory-mapped: the coordinates are only read from disk when they
+        are accessed, snapshot by snapshot. snapshots[i] returns the record
+        (turn, id, dt, dE) of the i-th snapshot, id(i) the ids of its
+        particles (0 if lost) and dt(i) and dE(i) their coordinates;
+        refresh() maps the snapshots appended since the file was opened.
+    '''
+
+    def __init__(self, filename):
+
+        self.filename = filename
+        if not os.path.isfile(self.filename):
+            self.filename = filename + '.bin'
+
+        with open(self.filename, 'rb') as f:
+            magic = f.read(len(PhaseSpaceMonitor.magic))
+            if magic != PhaseSpaceMonitor.magic:
+                # FileFormatError
+                raise RuntimeError("ERROR in PhaseSpaceReader: " +
+                                   self.filename + " is not a " +
+                                   "PhaseSpaceMonitor file")
+            self.header_size = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+            header = json.loads(f.read(self.header_size - len(magic)
+                                       - 4).decode())
+
+        self.dtype = np.dtype(header['dtype'])
+        self.n_particles = header['n_particles']
+        self.stride = header['stride']
+        self.save_every = header['save_every']
+        self.record = phase_space_record(self.dtype, self.n_particles)
+
+        self.refresh()
+
+    def refresh(self):
+
+        self.n_snapshots = ((os.path.getsize(self.filename) - self.header_size)
+                            // self.record.itemsize)
+        if self.n_snapshots > 0:
+            self.snapshots = np.memmap(self.filename, dtype=self.record,
+                                       mode='r', offset=self.header_size,
+                                       shape=(self.n_snapshots,))
+        else:
+            self.snapshots = np.zeros(0, dtype=self.record)
+
+    def __len__(self):
+        return self.n_snapshots
+
+    @property
+    def turns(self):
+        return np.asarray(self.snapshots['turn'])
+
+    def id(self, index):
+        return self.snapshots['id'][index]
+
+    def dt(self, index):
+        return self.snapshots['dt'][index]
+
+    def dE(self, index):
+        return self.snapshots['dE'][index]
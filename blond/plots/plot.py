@@ -20,6 +20,7 @@ import h5py as hp
 from ..plots.plot_beams import *
 from ..plots.plot_slices import *
 from ..plots.plot_llrf import *
+from ..plots.plot_stream import StreamSeries, StreamRenderer, stream_figures
 
 
 def fig_folder(dirname):
@@ -45,7 +46,9 @@ class Plot(object):
                  dt_bckp, xmin, xmax, ymin, ymax, xunit = 's', sampling = 1, 
                  separatrix_plot = False, histograms_plot = True, 
                  Profile = None, h5file = None, output_frequency = 1, 
-                 PhaseLoop = None, LHCNoiseFB = None, format_options = None):
+                 PhaseLoop = None, LHCNoiseFB = None, format_options = None,
+                 BunchMonitor = None, max_points = 1000,
+                 subprocess_renderer = False):
         '''
         Define what plots should be plotted during the simulation. Passing only
         basic objects, only phase space plot will be produced. Passing optional
@@ -114,6 +117,20 @@ class Plot(object):
         # Set plotting format
         self.set_format(format_options)
         
+        #: | *Optional import of BunchMonitor, downsampled monitored data*
+        self.monitor = BunchMonitor
+        self.stream = {}
+        self.renderer = None
+        if self.monitor is not None:
+            for name in self.monitor.buffers():
+                if name in stream_figures:
+                    self.stream[name] = StreamSeries(max_points)
+            if not (self.profile and self.profile.fit_option == 'gaussian'):
+                self.stream.pop('bunch_length', None)
+            self.renderer = StreamRenderer(self.dirname, self.lstyle,
+                                           subprocess_renderer)
+            self.monitor.subscribe(self.receive)
+        
         # Track at initialisation
         self.track()          
 
@@ -222,8 +239,12 @@ class Plot(object):
                 plot_beam_spectrum(self.profile, self.tstep[0], 
                                    style = self.lstyle, dirname = self.dirname)
         
-        # Plots as a function of time        
-        if (self.tstep[0] % self.dt_bckp) == 0 and self.h5file:
+        # Plots as a function of time
+        if (self.tstep[0] % self.dt_bckp) == 0 and self.renderer:
+            
+            self.renderer.update(self.stream)
+        
+        elif (self.tstep[0] % self.dt_bckp) == 0 and self.h5file:
             
             h5data = hp.File(self.h5file + '.h5', 'r')
             plot_bunch_length_evol(self.rf_params, h5data, 
@@ -286,6 +307,25 @@ class Plot(object):
             h5data.close()
 
 
+    def receive(self, turn, buffers, index):
+        '''
+        Keeps the data of a turn from the BunchMonitor buffers
+        '''
+        
+        for name, series in self.stream.items():
+            series.append(turn, buffers[name][index])
+
+
+    def close(self):
+        '''
+        Waits for the last figures to be drawn
+        '''
+        
+        if self.renderer:
+            self.renderer.close()
+            self.renderer = None
+
+
     def reset_frame(self, xmin, xmax, ymin, ymax):
         
         self.xmin = xmin
@@ -0,0 +1,283 @@
+
+# Copyright 2016 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+'''
+**Streaming plots of the monitored quantities as a function of time**
+
+The quantities are received turn by turn from the BunchMonitor buffers and
+kept in downsampled arrays of bounded size, and the figures are created once
+and updated in place, optionally in a separate process.
+'''
+
+from __future__ import division
+from builtins import object
+import multiprocessing
+import numpy as np
+
+
+#: | *Figures as a function of time: dataset, file name, y-label, scaling*
+stream_figures = {
+    'sigma_dt': ('bunch_length',
+                 r"Bunch length, $\Delta t_{4\sigma}$ r.m.s. [s]", 4),
+    'bunch_length': ('bunch_length_Gaussian',
+                     r"Bunch length, $\Delta t_{4\sigma}$ Gaussian fit [s]",
+                     1),
+    'mean_dt': ('bunch_mean_position',
+                r"Bunch mean position, $<\Delta t>$ [s]", 1),
+    'mean_dE': ('bunch_mean_energy',
+                r"Bunch mean energy, $<\Delta E>$ [eV]", 1),
+    'n_macroparticles_alive': ('bunch_transmitted_particles',
+                               r"Transmitted macro-particles [1]", 1),
+    'PL_omegaRF': ('RF_freq',
+                   r"RF revolution frequency $\omega_{\mathsf{RF}}$ [1/s]", 1),
+    'PL_phiRF': ('RF_phase', r"RF phase $\phi_{\mathsf{RF}}$ [rad]", 1),
+    'PL_bunch_phase': ('PL_bunch_phase',
+                       r"PL $\phi_{\mathsf{bunch}}$ [rad]", 1),
+    'PL_phase_corr': ('PL_phase_corr', r"PL $\phi$ correction [rad]", 1),
+    'PL_omegaRF_corr': ('PL_freq_corr',
+                        r"PL $\omega_{\mathsf{RF}}$ correction [1/s]", 1),
+    'SL_dphiRF': ('RF_phase_error',
+                  r"RF phase error $\Delta \phi_{\mathsf{RF}}$ [rad]", 1),
+    'RL_drho': ('RL_radial_error', r"Relative radial error [1]", 1),
+    'LHC_noise_FB_factor': ('LHC_noise_FB',
+                            r"LHC noise FB scaling factor [1]", 1),
+    'LHC_noise_FB_bl': ('LHC_noise_FB_bl',
+                        r"4-sigma FWHM bunch length [s]", 1),
+    'LHC_noise_FB_bl_bbb': ('LHC_noise_FB_bl_bbb',
+                            r"4-sigma FWHM bunch length [s]", 1)}
+
+
+class StreamSeries(object):
+    '''
+    Downsampled time series of a monitored quantity, of at most 'max_points'
+    points. Every 'stride'-th turn is kept; when the arrays are full, every
+    second point is dropped and the stride is doubled, so that the whole
+    history is kept with a resolution decreasing as the simulation goes on.
+    '''
+
+    def __init__(self, max_points=1000):
+
+        if max_points < 2:
+            # InputError
+            raise RuntimeError("ERROR in StreamSeries: max_points should" +
+                               " be at least 2!")
+
+        #: | *Maximum number of points kept*
+        self.max_points = int(max_points)
+
+        #: | *Number of turns between two points kept*
+        self.stride = 1
+
+        #: | *Number of points kept*
+        self.n_points = 0
+
+        self._turns = np.zeros(self.max_points, dtype=np.int64)
+        self._values = None
+
+    def append(self, turn, value):
+        '''
+        Keeps the value of turn 'turn' if it falls on the current stride.
+        '''
+
+        if turn % self.stride != 0:
+            return
+
+        if self._values is None:
+            value = np.asarray(value, dtype=np.float64)
+            self._values = np.zeros((self.max_points,) + value.shape)
+
+        if self.n_points == self.max_points:
+            self._decimate()
+            if turn % self.stride != 0:
+                return
+
+        self._turns[self.n_points] = turn
+        self._values[self.n_points] = value
+        self.n_points += 1
+
+    def _decimate(self):
+
+        self.stride *= 2
+        kept = self._turns[:self.n_points] % self.stride == 0
+        n_kept = np.count_nonzero(kept)
+        self._turns[:n_kept] = self._turns[:self.n_points][kept]
+        self._values[:n_kept] = self._values[:self.n_points][kept]
+        self.n_points = n_kept
+
+    @property
+    def turns(self):
+        return self._turns[:self.n_points]
+
+    @property
+    def values(self):
+        if self._values is None:
+            return np.zeros(0)
+        return self._values[:self.n_points]
+
+
+class StreamFigures(object):
+    '''
+    Figures as a function of time, created at the first update and updated in
+    place afterwards, instead of being redrawn from scratch.
+    '''
+
+    def __init__(self, dirname='fig', style='.', backend=None):
+
+        import matplotlib
+        if backend is not None:
+            matplotlib.use(backend)
+        import matplotlib.pyplot as plt
+
+        self.plt = plt
+        self.dirname = dirname
+        self.style = style
+        self.figures = {}
+
+    def update(self, name, turns, values):
+        '''
+        Updates and saves the figure of the dataset 'name'.
+        '''
+
+        fign, ylabel, scale = stream_figures[name]
+        values = scale * np.asarray(values).reshape(len(turns), -1)
+
+        if name not in self.figures:
+            fig = self.plt.figure(figsize=(8, 6))
+            ax = fig.add_axes([0.15, 0.1, 0.8, 0.8])
+            ax.set_xlabel(r"No. turns [T$_0$]")
+            ax.set_ylabel(ylabel)
+            self.figures[name] = (fig, ax, [])
+        fig, ax, lines = self.figures[name]
+
+        for i in range(values.shape[1]):
+            if i < len(lines):
+                lines[i].set_data(turns, values[:, i])
+            else:
+                lines.append(ax.plot(turns, values[:, i], self.style)[0])
+        ax.relim()
+        ax.autoscale_view()
+        if len(turns) > 0 and turns[-1] > 100000:
+            ax.ticklabel_format(style='sci', axis='x', scilimits=(0, 0))
+
+        fig.savefig(self.dirname + '/' + fign + '.png')
+
+    def update_COM_motion(self, mean_dt, mean_dE):
+        '''
+        Updates and saves the evolution of the bunch C.O.M. in longitudinal
+        phase space.
+        '''
+
+        if 'COM_motion' not in self.figures:
+            fig = self.plt.figure(figsize=(8, 8))
+            ax = fig.add_axes([0.15, 0.1, 0.8, 0.8])
+            ax.set_xlabel(r"$\Delta t$ [s]")
+            ax.set_ylabel(r"$\Delta$E [eV]")
+            ax.ticklabel_format(style='sci', axis='x', scilimits=(0, 0))
+            ax.ticklabel_format(style='sci', axis='y', scilimits=(0, 0))
+            fig.text(0.95, 0.95, 'C.O.M. evolution', fontsize=16, ha='right',
+                     va='center')
+            self.figures['COM_motion'] = (fig, ax, ax.plot([], [], '.')[:1])
+        fig, ax, lines = self.figures['COM_motion']
+
+        lines[0].set_data(mean_dt, mean_dE)
+        ax.relim()
+        ax.autoscale_view()
+
+        fig.savefig(self.dirname + '/COM_evolution.png')
+
+    def close(self):
+
+        for fig, ax, lines in self.figures.values():
+            self.plt.close(fig)
+        self.figures = {}
+
+
+def _render(queue, dirname, style, rc_params):
+
+    # Separate process, matplotlib is used with the Agg backend only here
+    figures = StreamFigures(dirname, style, backend='Agg')
+    figures.plt.rcParams.update(rc_params)
+    while True:
+        job = queue.get()
+        if job is None:
+            break
+        _draw(figures, job)
+    figures.close()
+
+
+def _draw(figures, job):
+
+    for name, turns, values in job:
+        if name == 'COM_motion':
+            figures.update_COM_motion(turns, values)
+        else:
+            figures.update(name, turns, values)
+
+
+class StreamRenderer(object):
+    '''
+    Draws the StreamFigures either in the tracking process or, with
+    subprocess=True, in a separate process with the Agg backend. In the
+    latter case only the downsampled arrays are sent to the renderer, and the
+    tracking continues while the figures are drawn; with 'queue_size' jobs
+    waiting, the tracking waits for the renderer.
+    '''
+
+    def __init__(self, dirname='fig', style='.', subprocess=False,
+                 queue_size=2):
+
+        self.subprocess = subprocess
+        self.process = None
+
+        if subprocess:
+            import matplotlib
+            # Only the rcParams that can be sent to another process
+            rc_params = {key: value for key, value
+                         in matplotlib.rcParams.items()
+                         if key.startswith(('xtick', 'ytick', 'axes.label',
+                                            'lines', 'figure.dpi',
+                                            'savefig.dpi', 'font.family'))}
+            context = multiprocessing.get_context('spawn')
+            self.queue = context.Queue(queue_size)
+            self.process = context.Process(target=_render,
+                                           args=(self.queue, dirname, style,
+                                                 rc_params))
+            self.process.daemon = True
+            self.process.start()
+        else:
+            self.figures = StreamFigures(dirname, style)
+
+    def update(self, series):
+        '''
+        Draws the figures of a dictionary of StreamSeries by dataset name.
+        '''
+
+        job = [(name, s.turns.copy(), s.values.copy())
+               for name, s in series.items()
+               if name in stream_figures and s.n_points > 0]
+        if 'mean_dt' in series and 'mean_dE' in series:
+            job.append(('COM_motion', series['mean_dt'].values.copy(),
+                        series['mean_dE'].values.copy()))
+        if self.subprocess:
+            self.queue.put(job)
+        else:
+            _draw(self.figures, job)
+
+    def close(self):
+        '''
+        Waits for the figures to be drawn and stops the renderer.
+        '''
+
+        if self.subprocess:
+            if self.process is not None:
+                self.queue.put(None)
+                self.process.join()
+                self.process = None
+        else:
+            self.figures.close()
@@ -19,6 +19,7 @@ from builtins import range, object
 import numpy as np
 from scipy.integrate import cumtrapz
 import ctypes
+import time
 # import logging
 import warnings
 from ..utils import bmath as bm
@@ -233,12 +234,20 @@ class RingAndRFTracker(object):
     interpolation : bool (optional)
         Option to use sliced and interpolated voltage for the kicker; default
         is False
+    fused : bool (optional)
+        Option to apply the RF kick, the induced voltage kick (if a
+        TotalInducedVoltage object is given), the drift and the slicing of the
+        Profile of the next turn in a single pass over the beam coordinates;
+        requires a Profile object. The induced voltage is computed by the
+        tracker and the Profile is sliced by the tracker, so that both objects
+        should not be tracked separately; default is False
 
     """
 
     def __init__(self, RFStation, Beam, solver='simple', BeamFeedback=None,
                  NoiseFeedback=None, CavityFeedback=None, periodicity=False,
-                 interpolation=False, Profile=None, TotalInducedVoltage=None):
+                 interpolation=False, Profile=None, TotalInducedVoltage=None,
+                 fused=False):
 
         # Set up logging
         # self.logger = logging.getLogger(__class__.__name__)
@@ -297,6 +306,12 @@ class RingAndRFTracker(object):
             # InterpolationError
             raise RuntimeError("ERROR in RingAndRFTracker: Choice of" +
                                " interpolation not recognised!")
+        try:
+            self.fused = bool(fused)
+        except:
+            # FusedError
+            raise RuntimeError("ERROR in RingAndRFTracker: Choice of" +
+                               " fused mode not recognised!")
         self.profile = Profile
         self.totalInducedVoltage = TotalInducedVoltage
         if (self.interpolation is True) and (self.profile is None):
@@ -311,6 +326,22 @@ class RingAndRFTracker(object):
             # PeriodicityError
             raise RuntimeError("ERROR in RingAndRFTracker: Empty RFStation" +
                                " with periodicity not yet implemented!")
+        if (self.fused is True) and (self.profile is None):
+            # ProfileError
+            raise RuntimeError("ERROR in RingAndRFTracker: Please specify a" +
+                               " Profile object to use the fused option")
+        if (self.fused is True) and (self.periodicity is True):
+            # PeriodicityError
+            raise RuntimeError("ERROR in RingAndRFTracker: Fused mode" +
+                               " with periodicity not yet implemented!")
+        if (self.fused is True) and \
+                (self.profile.operations[0] != self.profile._slice):
+            # ProfileError
+            raise RuntimeError("ERROR in RingAndRFTracker: Fused mode" +
+                               " with smooth slicing not yet implemented!")
+        # Coefficients of the interpolated kick of the fused mode, reused
+        # over the turns. For internal use.
+        self._kick_coefficients = None
         if (self.cavityFB is not None) and (self.interpolation is False):
             self.interpolation = True
             warnings.warn('Setting interpolation to TRUE')
@@ -370,6 +401,76 @@ class RingAndRFTracker(object):
                  self.alpha_1[index], self.alpha_2[index],
                  self.rf_params.beta[index], self.rf_params.energy[index])
 
+    def kick_drift_slice(self, index):
+        """Function applying in a single pass over the beam coordinates the
+        RF kick of turn index, the induced voltage kick, the drift to turn
+        index + 1 and the slicing of the updated beam profile. The RF kick is
+        computed exactly or, if the interpolation option is used, through the
+        total voltage interpolated on the profile bin centers. Equivalent to
+        tracking a TotalInducedVoltage, a RingAndRFTracker and a Profile
+        object in this order.
+
+        """
+
+        if self.totalInducedVoltage is not None:
+            self.totalInducedVoltage.induced_voltage_sum()
+
+        total_voltage = None
+        n_rf = self.n_rf
+        acceleration_kick = self.acceleration_kick[index]
+        interp_acceleration_kick = 0.
+        if self.rf_params.empty is True:
+            n_rf = 0
+            acceleration_kick = 0.
+        elif self.interpolation:
+            self.rf_voltage_calculation()
+            n_rf = 0
+            # As in linear_interp_kick, only particles inside the frame
+            interp_acceleration_kick = acceleration_kick
+            acceleration_kick = 0.
+            total_voltage = self.rf_voltage
+        if self.totalInducedVoltage is not None:
+            if total_voltage is None:
+                total_voltage = self.totalInducedVoltage.induced_voltage
+            else:
+                total_voltage = total_voltage \
+                    + self.totalInducedVoltage.induced_voltage
+        if self.interpolation:
+            self.total_voltage = total_voltage
+
+        # Work arrays allocated once, the sub-histograms being shared with
+        # the slicing of the profile
+        n_coefficients = 2*(self.profile.n_slices - 1)
+        if total_voltage is not None and \
+                (self._kick_coefficients is None
+                 or len(self._kick_coefficients) != n_coefficients
+                 or self._kick_coefficients.dtype != bm.precision.real_t):
+            self._kick_coefficients = np.empty(n_coefficients,
+                                               dtype=bm.precision.real_t)
+        sub_histograms = self.profile.histogram_workspace.sub_histograms(
+            self.profile.n_slices)
+
+        bm.kick_drift_slice(self.beam.dt, self.beam.dE,
+                            self.voltage[:, index], self.omega_rf[:, index],
+                            self.phi_rf[:, index], self.charge, n_rf,
+                            acceleration_kick, self.solver,
+                            self.t_rev[index + 1], self.length_ratio,
+                            self.alpha_order, self.eta_0[index + 1],
+                            self.eta_1[index + 1], self.eta_2[index + 1],
+                            self.alpha_0[index + 1], self.alpha_1[index + 1],
+                            self.alpha_2[index + 1],
+                            self.rf_params.beta[index + 1],
+                            self.rf_params.energy[index + 1],
+                            self.profile.n_macroparticles,
+                            self.profile.cut_left, self.profile.cut_right,
+                            total_voltage=total_voltage,
+                            bin_centers=self.profile.bin_centers,
+                            interp_acceleration_kick=interp_acceleration_kick,
+                            kick_coefficients=self._kick_coefficients,
+                            sub_histograms=sub_histograms)
+
+        self.profile.track_presliced()
+
     def rf_voltage_calculation(self):
         """Function calculating the total, discretised RF voltage seen by the
         beam at a given turn. Requires a Profile object.
@@ -428,55 +529,35 @@ class RingAndRFTracker(object):
         # Total phase offset
         self.rf_params.phi_rf[:,turn+1] += self.rf_params.dphi_rf
 
-        if self.periodicity:
+        # In MPI mode, the kick and drift time of the worker is measured for
+        # the load balancing (see Beam.balance)
+        if self.beam.is_splitted:
+            start_time = time.perf_counter()
 
-            # Distinguish the particles inside the frame from the particles on
-            # the right-hand side of the frame.
-            self.indices_right_outside = \
-                np.where(self.beam.dt > self.t_rev[turn + 1])[0]
-            self.indices_inside_frame = \
-                np.where(self.beam.dt < self.t_rev[turn + 1])[0]
-
-            if len(self.indices_right_outside) > 0:
-                # Change reference of all the particles on the right of the
-                # current frame; these particles skip one kick and drift
-                self.beam.dt[self.indices_right_outside] -= \
-                    self.t_rev[turn + 1]
-                # Synchronize the bunch with the particles that are on the
-                # RHS of the current frame applying kick and drift to the
-                # bunch
-                # After that all the particles are in the new updated frame
-                self.insiders_dt = np.ascontiguousarray(
-                    self.beam.dt[self.indices_inside_frame])
-                self.insiders_dE = np.ascontiguousarray(
-                    self.beam.dE[self.indices_inside_frame])
-                self.kick(self.insiders_dt, self.insiders_dE, turn)
-                self.drift(self.insiders_dt, self.insiders_dE, turn+1)
-                self.beam.dt[self.indices_inside_frame] = self.insiders_dt
-                self.beam.dE[self.indices_inside_frame] = self.insiders_dE
-                # Check all the particles on the left of the just updated
-                # frame and apply a second kick and drift to them with the
-                # previous wave after having changed reference.
-                self.indices_left_outside = np.where(self.beam.dt < 0)[0]
+        if self.periodicity:
 
-            else:
-                self.kick(self.beam.dt, self.beam.dE, turn)
-                self.drift(self.beam.dt, self.beam.dE, turn + 1)
-                # Check all the particles on the left of the just updated
-                # frame and apply a second kick and drift to them with the
-                # previous wave after having changed reference.
-                self.indices_left_outside = np.where(self.beam.dt < 0)[0]
-
-            if len(self.indices_left_outside) > 0:
-                left_outsiders_dt = np.ascontiguousarray(
-                    self.beam.dt[self.indices_left_outside])
-                left_outsiders_dE = np.ascontiguousarray(
-                    self.beam.dE[self.indices_left_outside])
-                left_outsiders_dt += self.t_rev[turn+1]
-                self.kick(left_outsiders_dt, left_outsiders_dE, turn)
-                self.drift(left_outsiders_dt, left_outsiders_dE, turn+1)
-                self.beam.dt[self.indices_left_outside] = left_outsiders_dt
-                self.beam.dE[self.indices_left_outside] = left_outsiders_dE
+            # Particles on the right-hand side of the frame change reference
+            # and skip one kick and drift; particles on the left-hand side of
+            # the updated frame change reference and get a second kick and
+            # drift. The wrap-around is done in place, particle by particle.
+            bm.kick_drift_periodic(self.beam.dt, self.beam.dE,
+                                   self.voltage[:, turn],
+                                   self.omega_rf[:, turn],
+                                   self.phi_rf[:, turn], self.charge,
+                                   self.n_rf, self.acceleration_kick[turn],
+                                   self.solver, self.t_rev[turn + 1],
+                                   self.length_ratio, self.alpha_order,
+                                   self.eta_0[turn + 1], self.eta_1[turn + 1],
+                                   self.eta_2[turn + 1],
+                                   self.alpha_0[turn + 1],
+                                   self.alpha_1[turn + 1],
+                                   self.alpha_2[turn + 1],
+                                   self.rf_params.beta[turn + 1],
+                                   self.rf_params.energy[turn + 1])
+
+        elif self.fused:
+
+            self.kick_drift_slice(turn)
 
         else:
 
@@ -494,29 +575,15 @@ class RingAndRFTracker(object):
                                           bin_centers=self.profile.bin_centers,
                                           charge=self.beam.Particle.charge,
                                           acceleration_kick=self.acceleration_kick[turn])
-
-                    # self.drift(self.beam.dt, self.beam.dE, turn + 1)
-
-                    # bm.LIKick_n_drift(self.beam.dt,
-                    #                   self.beam.dE,
-                    #                   self.total_voltage,
-                    #                   self.profile.bin_centers,
-                    #                   self.beam.Particle.charge,
-                    #                   self.acceleration_kick[turn],
-                    #                   self.solver,
-                    #                   self.t_rev[turn],
-                    #                   self.length_ratio,
-                    #                   self.alpha_order,
-                    #                   self.eta_0[turn],
-                    #                   self.eta_1[turn],
-                    #                   self.eta_2[turn],
-                    #                   self.rf_params.beta[turn],
-                    #                   self.rf_params.energy[turn])
                 else:
                     self.kick(self.beam.dt, self.beam.dE, turn)
 
             self.drift(self.beam.dt, self.beam.dE, turn + 1)
 
+        if self.beam.is_splitted:
+            self.beam.tracking_time += time.perf_counter() - start_time
+            self.beam.tracked_particles += len(self.beam.dt)
+
         # Updating the beam synchronous momentum etc.
         self.beam.beta = self.rf_params.beta[turn+1]
         self.beam.gamma = self.rf_params.gamma[turn+1]
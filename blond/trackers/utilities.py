@@ -90,39 +90,10 @@ def synchrotron_frequency_distribution(Beam, FullRingAndRF, main_harmonic_option
     potential_well_sep = potential_well_sep - np.min(potential_well_sep)
     synchronous_phase_index = np.where(potential_well_sep == np.min(potential_well_sep))[0]
     
-    # Computing the action J by integrating the dE trajectories
-    J_array_dE0 = np.zeros(len(potential_well_sep))
-     
-    warnings.filterwarnings("ignore")
-
-    for i in range(0, len(potential_well_sep)):
-        # Find left and right time coordinates for a given hamiltonian 
-        # value
-        time_indexes = np.where(potential_well_sep <= 
-                                potential_well_sep[i])[0]
-        left_time = time_coord_sep[np.max((0,time_indexes[0]))]
-        right_time = time_coord_sep[np.min((time_indexes[-1],
-                                                   len(time_coord_sep)-1))]
-        # Potential well calculation with high resolution in that frame
-        time_potential_high_res = np.linspace(float(left_time), float(right_time),
-                                              n_points_potential)
-        FullRingAndRF.potential_well_generation(
-                                 n_points=n_points_potential,
-                                 time_array=time_potential_high_res,
-                                 main_harmonic_option=main_harmonic_option)
-        pot_well_high_res = FullRingAndRF.potential_well   
-        if TotalInducedVoltage is not None:
-            pot_well_high_res += np.interp(time_potential_high_res,
-                                       time_induced_voltage, induced_potential)
-            pot_well_high_res -= pot_well_high_res.min()
-        # Integration to calculate action
-        dE_trajectory = np.sqrt((potential_well_sep[i] -
-                                 pot_well_high_res) / eom_factor_dE)
-        dE_trajectory[np.isnan(dE_trajectory)] = 0
-        J_array_dE0[i] = 1 / np.pi * np.trapz(dE_trajectory,
-                dx=time_potential_high_res[1] - time_potential_high_res[0])
-    
-    warnings.filterwarnings("default")
+    # Computing the action J by integrating the dE trajectories of all the
+    # hamiltonian levels at once
+    J_array_dE0 = action_integrals(time_coord_sep, potential_well_sep,
+                                   potential_well_sep, eom_factor_dE)
     
     # Computing the sync_freq_distribution (if to handle cases where maximum is in 2 consecutive points)
     if len(synchronous_phase_index) > 1:
@@ -601,6 +572,64 @@ def minmax_location(x,f):
     return [min_x_position, max_x_position], [min_values, max_values]
 
 
+def action_integrals(time_potential, potential_well, hamiltonian_levels,
+                     eom_factor_dE, batch_size=int(2.5e5)):
+    '''
+    *Function computing the action J(H) = 1/pi * int sqrt((H - U(t)) /
+    eom_factor_dE) dt of the trajectories of all the hamiltonian levels H in
+    the potential well U, taken linear between its points (the integral on
+    each interval is exact). The levels are processed in increasing order,
+    by batches of batch_size level-point pairs, each batch going only
+    through the points around the ones below its highest level.*
+    '''
+
+    time_potential = np.asarray(time_potential, dtype=float)
+    potential_well = np.asarray(potential_well, dtype=float)
+    hamiltonian_levels = np.asarray(hamiltonian_levels, dtype=float)
+
+    interval_width = np.diff(time_potential)
+    potential_step = np.abs(np.diff(potential_well))
+
+    level_order = np.argsort(hamiltonian_levels, kind='stable')
+    action = np.zeros(len(hamiltonian_levels))
+    n_levels = max(1, batch_size // len(potential_well))
+
+    for start in range(0, len(level_order), n_levels):
+        indexes = level_order[start:start+n_levels]
+        levels = hamiltonian_levels[indexes, np.newaxis]
+        below = np.where(potential_well < levels[-1, 0])[0]
+        if len(below) == 0:
+            continue
+        first = max(below[0] - 1, 0)
+        last = min(below[-1] + 2, len(potential_well))
+
+        # Values a and b of H - U (zero outside of the trajectory) at the
+        # edges of each interval; the integral of sqrt(H - U) on an interval
+        # inside of the trajectory is 2/3 * width * (a + sqrt(ab) + b) /
+        # (sqrt(a) + sqrt(b))
+        delta_H = np.maximum(levels - potential_well[first:last], 0)
+        sqrt_delta_H = np.sqrt(delta_H)
+        integrand = sqrt_delta_H[:, :-1] * sqrt_delta_H[:, 1:]
+        integrand += delta_H[:, :-1]
+        integrand += delta_H[:, 1:]
+        denominator = sqrt_delta_H[:, :-1] + sqrt_delta_H[:, 1:]
+        np.divide(integrand, denominator, out=integrand,
+                  where=denominator > 0)
+
+        # On the intervals crossed by the trajectory, (a^3/2 + b^3/2) /
+        # |U(t_1) - U(t_0)| instead
+        outside = delta_H == 0
+        level, point = np.where(outside[:, :-1] != outside[:, 1:])
+        integrand[level, point] = \
+            (delta_H[level, point] * sqrt_delta_H[level, point] +
+             delta_H[level, point+1] * sqrt_delta_H[level, point+1]) / \
+            potential_step[first:last-1][point]
+
+        action[indexes] = np.dot(integrand, interval_width[first:last-1])
+
+    return 2 / (3*np.pi) * action / np.sqrt(eom_factor_dE)
+
+
 def potential_well_cut(time_potential, potential_array):
     '''
     *Function to cut the potential well in order to take only the separatrix
@@ -11,12 +11,29 @@ from ..utils import butils_wrap
 
 precision = butils_wrap.precision
 __exec_mode = 'single_node'
-# Other modes: multi_node
+# Other modes: multi_node, shared_memory
+
+
+# numpy.fft counterparts of the FFTW rfft/irfft of butils_wrap, with the same
+# interface. numpy can not write to an output array, the result is copied.
+def _np_rfft(a, n=0, result=None):
+    if result is None:
+        return np.fft.rfft(a, n if n != 0 else None)
+    result[:] = np.fft.rfft(a, n if n != 0 else None)
+    return result
+
+
+def _np_irfft(a, n=0, result=None):
+    if result is None:
+        return np.fft.irfft(a, n if n != 0 else None)
+    result[:] = np.fft.irfft(a, n if n != 0 else None)
+    return result
+
 
 # dictionary storing the CPU versions of the desired functions #
 _CPU_func_dict = {
-    'rfft': np.fft.rfft,
-    'irfft': np.fft.irfft,
+    'rfft': _np_rfft,
+    'irfft': _np_irfft,
     'rfftfreq': np.fft.rfftfreq,
     'irfft_packed': butils_wrap.irfft_packed,
     'sin': butils_wrap.sin,
@@ -40,20 +57,30 @@ _CPU_func_dict = {
     'mul': butils_wrap.mul,
     'beam_phase': butils_wrap.beam_phase,
     'fast_resonator': butils_wrap.fast_resonator,
+    'resonator_induced_voltage': butils_wrap.resonator_induced_voltage,
     'kick': butils_wrap.kick,
     'rf_volt_comp': butils_wrap.rf_volt_comp,
     'drift': butils_wrap.drift,
     'linear_interp_kick': butils_wrap.linear_interp_kick,
     'LIKick_n_drift': butils_wrap.linear_interp_kick_n_drift,
+    'kick_drift_slice': butils_wrap.kick_drift_slice,
+    'kick_drift_periodic': butils_wrap.kick_drift_periodic,
     'synchrotron_radiation': butils_wrap.synchrotron_radiation,
     'synchrotron_radiation_full': butils_wrap.synchrotron_radiation_full,
     'set_random_seed': butils_wrap.set_random_seed,
     'sparse_histogram': butils_wrap.sparse_histogram,
     # 'linear_interp_time_translation': butils_wrap.linear_interp_time_translation,
     'slice': butils_wrap.slice,
+    'slice_workspace': butils_wrap.slice_workspace,
+    'histogram_max_threads': butils_wrap.histogram_max_threads,
+    'beam_statistics': butils_wrap.beam_statistics,
+    'compact_particles': butils_wrap.compact_particles,
     'slice_smooth': butils_wrap.slice_smooth,
     'music_track': butils_wrap.music_track,
     'music_track_multiturn': butils_wrap.music_track_multiturn,
+    'music_track_parallel': butils_wrap.music_track_parallel,
+    'music_track_multiturn_parallel': butils_wrap.music_track_multiturn_parallel,
+    'music_sort_particles': butils_wrap.music_sort_particles,
     'diff': np.diff,
     'cumsum': np.cumsum,
     'cumprod': np.cumprod,
@@ -65,7 +92,12 @@ _CPU_func_dict = {
 _FFTW_func_dict = {
     'rfft': butils_wrap.rfft,
     'irfft': butils_wrap.irfft,
-    'rfftfreq': butils_wrap.rfftfreq
+    'rfftfreq': butils_wrap.rfftfreq,
+    'fftw_import_wisdom': butils_wrap.fftw_import_wisdom,
+    'fftw_export_wisdom': butils_wrap.fftw_export_wisdom,
+    'fftw_set_max_plans': butils_wrap.fftw_set_max_plans,
+    'fftw_n_plans': butils_wrap.fftw_n_plans,
+    'fftw_destroy_plans': butils_wrap.fftw_destroy_plans
 }
 
 _MPI_func_dict = {
@@ -82,17 +114,54 @@ def use_mpi():
     __exec_mode = 'multi_node'
 
 
+def use_shared_memory(n_workers=None):
+    '''
+    Fork n_workers processes (default is the number of CPUs) running the
+    rest of the main file like MPI ranks, on a single node and without MPI;
+    the beam coordinates are shared by the workers (see shm_config). To be
+    called at the top of the main file, in place of use_mpi.
+    '''
+    global __exec_mode
+    from . import shm_config
+    shm_config.start(n_workers)
+    __exec_mode = 'shared_memory'
+
+
 def mpiMode():
+    # The shared memory mode is a distributed mode as well
+    global __exec_mode
+    return __exec_mode in ['multi_node', 'shared_memory']
+
+
+def shmMode():
     global __exec_mode
-    return __exec_mode == 'multi_node'
+    return __exec_mode == 'shared_memory'
+
+
+def get_worker():
+    '''
+    Worker of the distributed mode, from mpi_config or shm_config
+    '''
+    if shmMode():
+        from .shm_config import worker
+    else:
+        from .mpi_config import worker
+    return worker
 
 
-def use_fftw():
+def use_fftw(wisdom_file=None, max_plans=None):
     '''
     Replace the existing rfft and irfft implementations
     with the ones coming from butils_wrap.
+    Optionally imports the FFTW wisdom stored in wisdom_file (e.g. by
+    fftw_export_wisdom at the end of a previous run) and bounds the number
+    of cached FFTW plans to max_plans.
     '''
     globals().update(_FFTW_func_dict)
+    if wisdom_file is not None:
+        butils_wrap.fftw_import_wisdom(wisdom_file)
+    if max_plans is not None:
+        butils_wrap.fftw_set_max_plans(max_plans)
 
 
 # precision can be single or double
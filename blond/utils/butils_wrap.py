@@ -424,9 +424,9 @@ def interp_const_space(x, xp, yp, left=None, right=None, result=None):
 
 def rfft(a, n=0, result=None):
     a = a.astype(dtype=precision.real_t, order='C', copy=False)
-    if (n == 0) and (result == None):
+    if (n == 0) and (result is None):
         result = np.empty(len(a)//2 + 1, dtype=precision.complex_t, order='C')
-    elif (n != 0) and (result == None):
+    elif (n != 0) and (result is None):
         result = np.empty(n//2 + 1, dtype=precision.complex_t, order='C')
 
     if precision.num == 1:
@@ -448,9 +448,9 @@ def rfft(a, n=0, result=None):
 def irfft(a, n=0, result=None):
     a = a.astype(dtype=precision.complex_t, order='C', copy=False)
 
-    if (n == 0) and (result == None):
+    if (n == 0) and (result is None):
         result = np.empty(2*(len(a)-1), dtype=precision.real_t, order='C')
-    elif (n != 0) and (result == None):
+    elif (n != 0) and (result is None):
         result = np.empty(n, dtype=precision.real_t, order='C')
 
     if precision.num == 1:
@@ -487,6 +487,59 @@ def rfftfreq(n, d=1.0, result=None):
     return result
 
 
+def fftw_import_wisdom(filename):
+    '''
+    Imports the FFTW wisdom of the current precision from filename.
+    Returns False if the file does not exist or can not be read, so that
+    the first run of a batch of jobs can start without it.
+    '''
+    if not os.path.isfile(filename):
+        return False
+    if precision.num == 1:
+        ret = __lib.import_wisdomf(ct.c_char_p(filename.encode()))
+    else:
+        ret = __lib.import_wisdom(ct.c_char_p(filename.encode()))
+    return bool(ret)
+
+
+def fftw_export_wisdom(filename):
+    '''
+    Exports the FFTW wisdom of the current precision, accumulated while
+    planning the FFTs, to filename.
+    '''
+    if precision.num == 1:
+        ret = __lib.export_wisdomf(ct.c_char_p(filename.encode()))
+    else:
+        ret = __lib.export_wisdom(ct.c_char_p(filename.encode()))
+    if ret == 0:
+        raise IOError('[butils_wrap:fftw_export_wisdom] Could not write ' +
+                      'FFTW wisdom to %s' % filename)
+
+
+def fftw_set_max_plans(max_plans):
+    '''
+    Sets the maximum number of FFTW plans kept per precision. The least
+    recently used plans are destroyed when the limit is exceeded. A value of
+    0 means no limit.
+    '''
+    __lib.set_max_plans(ct.c_int(int(max_plans)))
+
+
+def fftw_n_plans():
+    '''
+    Returns the number of FFTW plans currently cached for the current
+    precision.
+    '''
+    if precision.num == 1:
+        return __lib.get_n_plansf()
+    else:
+        return __lib.get_n_plans()
+
+
+def fftw_destroy_plans():
+    __lib.destroy_plans()
+
+
 def irfft_packed(signal, fftsize=0, result=None):
 
     n0 = len(signal[0])
@@ -495,9 +548,9 @@ def irfft_packed(signal, fftsize=0, result=None):
     signal = np.ascontiguousarray(np.reshape(
         signal, -1), dtype=precision.complex_t)
 
-    if (fftsize == 0) and (result == None):
+    if (fftsize == 0) and (result is None):
         result = np.empty(howmany * 2*(n0-1), dtype=precision.real_t)
-    elif (fftsize != 0) and (result == None):
+    elif (fftsize != 0) and (result is None):
         result = np.empty(howmany * fftsize, dtype=precision.real_t)
 
     if precision.num == 1:
@@ -773,6 +826,145 @@ def linear_interp_kick_n_drift(dt, dE, total_voltage, bin_centers, charge, acc_k
                                          __c_real(charge))
 
 
+def kick_drift_slice(dt, dE, voltage, omega_rf, phi_rf, charge, n_rf,
+                     acceleration_kick, solver, t_rev, length_ratio,
+                     alpha_order, eta_0, eta_1, eta_2, alpha_0, alpha_1,
+                     alpha_2, beta, energy, profile, cut_left, cut_right,
+                     total_voltage=None, bin_centers=None,
+                     interp_acceleration_kick=0., kick_coefficients=None,
+                     sub_histograms=None):
+    '''
+    Applies in a single pass over the beam coordinates the RF kick of the
+    n_rf systems, the kick of total_voltage linearly interpolated on
+    bin_centers (optional), the drift and the slicing of the updated dt
+    coordinates into profile. As in linear_interp_kick,
+    interp_acceleration_kick is applied only to the particles inside
+    bin_centers, whereas acceleration_kick is applied to all particles.
+    The work arrays can be allocated once by the caller: kick_coefficients
+    of 2*(len(bin_centers)-1) real values, and sub_histograms of
+    histogram_max_threads()*len(profile) float64 values (the counts are
+    accumulated in double precision); otherwise they are allocated at each
+    call.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(dE[0], precision.real_t)
+    assert isinstance(profile[0], precision.real_t)
+
+    voltage_kick = charge * \
+        voltage.astype(dtype=precision.real_t, order='C', copy=False)
+    omegarf_kick = omega_rf.astype(
+        dtype=precision.real_t, order='C', copy=False)
+    phirf_kick = phi_rf.astype(dtype=precision.real_t, order='C', copy=False)
+
+    if total_voltage is None:
+        voltage_ptr = None
+        bin_centers_ptr = None
+        kick_coefficients_ptr = None
+        n_bins = ct.c_int(0)
+    else:
+        assert isinstance(total_voltage[0], precision.real_t)
+        assert isinstance(bin_centers[0], precision.real_t)
+        voltage_ptr = __getPointer(total_voltage)
+        bin_centers_ptr = __getPointer(bin_centers)
+        n_bins = __getLen(bin_centers)
+        if kick_coefficients is None:
+            kick_coefficients = np.empty(2*max(len(bin_centers)-1, 0),
+                                         dtype=precision.real_t)
+        assert kick_coefficients.dtype == precision.real_t
+        assert len(kick_coefficients) >= 2*(len(bin_centers)-1)
+        kick_coefficients_ptr = __getPointer(kick_coefficients)
+
+    if sub_histograms is None:
+        sub_histograms = np.empty(histogram_max_threads()*len(profile),
+                                  dtype=np.float64)
+    assert sub_histograms.dtype == np.float64
+    assert len(sub_histograms) >= histogram_max_threads()*len(profile)
+
+    if precision.num == 1:
+        func = __lib.kick_drift_slicef
+    else:
+        func = __lib.kick_drift_slice
+
+    func(__getPointer(dt),
+         __getPointer(dE),
+         __getLen(dt),
+         ct.c_int(n_rf),
+         __getPointer(voltage_kick),
+         __getPointer(omegarf_kick),
+         __getPointer(phirf_kick),
+         voltage_ptr,
+         bin_centers_ptr,
+         n_bins,
+         __c_real(charge),
+         __c_real(interp_acceleration_kick),
+         __c_real(acceleration_kick),
+         ct.c_char_p(solver),
+         __c_real(t_rev),
+         __c_real(length_ratio),
+         __c_real(alpha_order),
+         __c_real(eta_0),
+         __c_real(eta_1),
+         __c_real(eta_2),
+         __c_real(alpha_0),
+         __c_real(alpha_1),
+         __c_real(alpha_2),
+         __c_real(beta),
+         __c_real(energy),
+         __getPointer(profile),
+         __c_real(cut_left),
+         __c_real(cut_right),
+         __getLen(profile),
+         kick_coefficients_ptr,
+         __getPointer(sub_histograms))
+
+
+def kick_drift_periodic(dt, dE, voltage, omega_rf, phi_rf, charge, n_rf,
+                        acceleration_kick, solver, t_rev, length_ratio,
+                        alpha_order, eta_0, eta_1, eta_2, alpha_0, alpha_1,
+                        alpha_2, beta, energy):
+    '''
+    Applies the RF kick and the drift with periodic boundary conditions on
+    the frame [0, t_rev]. Particles on the right of the frame change
+    reference and skip the kick and drift, particles on the left of the
+    updated frame change reference and get a second kick and drift. The
+    wrap-around is done in place.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(dE[0], precision.real_t)
+
+    voltage_kick = charge * \
+        voltage.astype(dtype=precision.real_t, order='C', copy=False)
+    omegarf_kick = omega_rf.astype(
+        dtype=precision.real_t, order='C', copy=False)
+    phirf_kick = phi_rf.astype(dtype=precision.real_t, order='C', copy=False)
+
+    if precision.num == 1:
+        func = __lib.kick_drift_periodicf
+    else:
+        func = __lib.kick_drift_periodic
+
+    func(__getPointer(dt),
+         __getPointer(dE),
+         __getLen(dt),
+         ct.c_int(n_rf),
+         __getPointer(voltage_kick),
+         __getPointer(omegarf_kick),
+         __getPointer(phirf_kick),
+         __c_real(acceleration_kick),
+         ct.c_char_p(solver),
+         __c_real(t_rev),
+         __c_real(length_ratio),
+         __c_real(alpha_order),
+         __c_real(eta_0),
+         __c_real(eta_1),
+         __c_real(eta_2),
+         __c_real(alpha_0),
+         __c_real(alpha_1),
+         __c_real(alpha_2),
+         __c_real(beta),
+         __c_real(energy))
+
+
 def slice(dt, profile, cut_left, cut_right):
     assert isinstance(dt[0], precision.real_t)
     assert isinstance(profile[0], precision.real_t)
@@ -796,6 +988,119 @@ def slice(dt, profile, cut_left, cut_right):
                         __getLen(dt))
 
 
+# Strategies of slice_workspace
+histogram_strategies = {'private': 0, 'atomic': 1, 'sort': 2}
+
+
+def histogram_max_threads():
+    '''
+    Number of threads used by the histogram routines.
+    '''
+    return __lib.histogram_max_threads()
+
+
+def slice_workspace(dt, profile, cut_left, cut_right, strategy='private',
+                    sub_histograms=None, bins=None):
+    '''
+    Histogram of dt computed with strategy ('private', 'atomic' or 'sort'),
+    in work arrays that can be allocated once by the caller. 'private' needs
+    sub_histograms of histogram_max_threads()*len(profile) float64 values,
+    'atomic' of len(profile) float64 values (the counts are accumulated in
+    double precision), 'sort' needs bins of len(dt) int32 values.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(profile[0], precision.real_t)
+
+    if strategy not in histogram_strategies:
+        # StrategyError
+        raise RuntimeError('ERROR in slice_workspace: strategy should be ' +
+                           "'private', 'atomic' or 'sort'")
+
+    sub_histograms_ptr = None
+    if strategy in ['private', 'atomic']:
+        if sub_histograms is None:
+            sub_histograms = np.empty(histogram_max_threads()*len(profile),
+                                      dtype=np.float64)
+        assert sub_histograms.dtype == np.float64
+        assert len(sub_histograms) >= len(profile) * \
+            (histogram_max_threads() if strategy == 'private' else 1)
+        sub_histograms_ptr = __getPointer(sub_histograms)
+    bins_ptr = None
+    if strategy == 'sort':
+        if bins is None:
+            bins = np.empty(len(dt), dtype=np.int32)
+        assert bins.dtype == np.int32
+        assert len(bins) >= len(dt)
+        bins_ptr = __getPointer(bins)
+
+    if precision.num == 1:
+        func = __lib.histogram_workspacef
+    else:
+        func = __lib.histogram_workspace
+
+    func(__getPointer(dt),
+         __getPointer(profile),
+         __c_real(cut_left),
+         __c_real(cut_right),
+         __getLen(profile),
+         __getLen(dt),
+         ct.c_int(histogram_strategies[strategy]),
+         sub_histograms_ptr,
+         bins_ptr)
+
+
+def beam_statistics(dt, dE, id, result=None):
+    '''
+    Statistics of the particles that are not lost (id != 0), computed in a
+    single pass and in double precision: the number of alive particles, then
+    the mean, the sum of the squared deviations from the mean, the minimum
+    and the maximum of dt, then of dE. Returns an array of 9 float64 values,
+    written to result if given.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(dE[0], precision.real_t)
+    assert len(dt) == len(dE) == len(id)
+
+    id = np.ascontiguousarray(id, dtype=np.int_)
+    if result is None:
+        result = np.empty(9, dtype=np.float64)
+    assert result.dtype == np.float64 and len(result) >= 9
+
+    if precision.num == 1:
+        func = __lib.beam_statisticsf
+    else:
+        func = __lib.beam_statistics
+
+    func(__getPointer(dt),
+         __getPointer(dE),
+         __getPointer(id),
+         __getLen(dt),
+         __getPointer(result))
+
+    return result
+
+
+def compact_particles(dt, dE, id):
+    '''
+    Moves the particles that are not lost (id != 0) to the front of dt, dE
+    and id, in place and in their original order. Returns their number.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(dE[0], precision.real_t)
+    assert id.dtype == np.int_
+    assert len(dt) == len(dE) == len(id)
+
+    if precision.num == 1:
+        func = __lib.compact_particlesf
+    else:
+        func = __lib.compact_particles
+
+    return func(__getPointer(dt),
+                __getPointer(dE),
+                __getPointer(id),
+                __getLen(dt))
+
+
 def slice_smooth(dt, profile, cut_left, cut_right):
     assert isinstance(dt[0], precision.real_t)
     assert isinstance(profile[0], precision.real_t)
@@ -933,6 +1238,87 @@ def music_track_multiturn(dt, dE, induced_voltage, array_parameters,
                                     __c_real(coeff4))
 
 
+def music_track_parallel(dt, dE, induced_voltage, array_parameters,
+                         alpha, omega_bar,
+                         const, coeff1, coeff2, coeff3, coeff4):
+    '''
+    Multi-threaded equivalent of music_track, the MuSiC recurrence being
+    evaluated with a parallel prefix scan over the sorted particles.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(dE[0], precision.real_t)
+    assert isinstance(induced_voltage[0], precision.real_t)
+    assert isinstance(array_parameters[0], precision.real_t)
+
+    if precision.num == 1:
+        func = __lib.music_track_parallelf
+    else:
+        func = __lib.music_track_parallel
+
+    func(__getPointer(dt),
+         __getPointer(dE),
+         __getPointer(induced_voltage),
+         __getPointer(array_parameters),
+         __getLen(dt),
+         __c_real(alpha),
+         __c_real(omega_bar),
+         __c_real(const),
+         __c_real(coeff1),
+         __c_real(coeff2),
+         __c_real(coeff3),
+         __c_real(coeff4))
+
+
+def music_track_multiturn_parallel(dt, dE, induced_voltage, array_parameters,
+                                   alpha, omega_bar,
+                                   const, coeff1, coeff2, coeff3, coeff4):
+    '''
+    Multi-threaded equivalent of music_track_multiturn, the MuSiC recurrence
+    being evaluated with a parallel prefix scan over the sorted particles.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(dE[0], precision.real_t)
+    assert isinstance(induced_voltage[0], precision.real_t)
+    assert isinstance(array_parameters[0], precision.real_t)
+
+    if precision.num == 1:
+        func = __lib.music_track_multiturn_parallelf
+    else:
+        func = __lib.music_track_multiturn_parallel
+
+    func(__getPointer(dt),
+         __getPointer(dE),
+         __getPointer(induced_voltage),
+         __getPointer(array_parameters),
+         __getLen(dt),
+         __c_real(alpha),
+         __c_real(omega_bar),
+         __c_real(const),
+         __c_real(coeff1),
+         __c_real(coeff2),
+         __c_real(coeff3),
+         __c_real(coeff4))
+
+
+def music_sort_particles(dt, dE):
+    '''
+    Sorts in place dt, and dE accordingly, with an adaptive sort of cost
+    O(n + m log m) for m particles out of order. Used by the MuSiC algorithm,
+    for which the particles are almost sorted from the previous turn.
+    '''
+    assert isinstance(dt[0], precision.real_t)
+    assert isinstance(dE[0], precision.real_t)
+
+    if precision.num == 1:
+        func = __lib.music_sort_particlesf
+    else:
+        func = __lib.music_sort_particles
+
+    func(__getPointer(dt),
+         __getPointer(dE),
+         __getLen(dt))
+
+
 def synchrotron_radiation(dE, U0, n_kicks, tau_z):
     assert isinstance(dE[0], precision.real_t)
     # dE = dE.astype(dtype=precision.real_t, order='C', copy=False)
@@ -1018,6 +1404,48 @@ def fast_resonator(R_S, Q, frequency_array, frequency_R, impedance=None):
     return impedance
 
 
+def resonator_induced_voltage(weights, bin_centers, time_array, K, reOmegaP,
+                              imOmegaP, Qtilde, result=None):
+    '''
+    Induced voltage at time_array of the resonators (K = R_S/(2 omega_R Q),
+    reOmegaP, imOmegaP, Qtilde) for a linearly interpolated line density,
+    given the slope differences weights at bin_centers. bin_centers and
+    time_array must be sorted. Computed with a recursive filter in
+    O(len(bin_centers) + len(time_array)) per resonator.
+    '''
+    weights = weights.astype(dtype=precision.real_t, order='C', copy=False)
+    bin_centers = bin_centers.astype(dtype=precision.real_t, order='C',
+                                     copy=False)
+    time_array = time_array.astype(dtype=precision.real_t, order='C',
+                                   copy=False)
+    K = K.astype(dtype=precision.real_t, order='C', copy=False)
+    reOmegaP = reOmegaP.astype(dtype=precision.real_t, order='C', copy=False)
+    imOmegaP = imOmegaP.astype(dtype=precision.real_t, order='C', copy=False)
+    Qtilde = Qtilde.astype(dtype=precision.real_t, order='C', copy=False)
+
+    if result is None:
+        result = np.empty(len(time_array), dtype=precision.real_t)
+
+    if precision.num == 1:
+        func = __lib.resonator_induced_voltagef
+    else:
+        func = __lib.resonator_induced_voltage
+
+    func(__getPointer(weights),
+         __getPointer(bin_centers),
+         __getLen(bin_centers),
+         __getPointer(time_array),
+         __getLen(time_array),
+         __getPointer(K),
+         __getPointer(reOmegaP),
+         __getPointer(imOmegaP),
+         __getPointer(Qtilde),
+         __getLen(K),
+         __getPointer(result))
+
+    return result
+
+
 # def mean(x):
 #     __lib.mean.restype = ct.c_double
 #     return __lib.mean(__getPointer(x), __getLen(x))
@@ -0,0 +1,210 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+'''
+**Module to checkpoint the state of a simulation every n turns and to
+restart it from the last checkpoint.**
+
+The state is the attributes of the objects of the tracking map (Beam,
+trackers, profiles, induced voltages, feedbacks, monitors...), followed
+recursively through the nested BLonD objects with the walker of
+input_parameters.serialisation: the arrays, e.g. the beam coordinates, the
+multi-turn wake memory or the buffers of the feedbacks, and the numbers,
+e.g. the integrators of the loops. Of the input objects (Ring, RFStation),
+only the state changed by the tracking is saved (turn counter, phi_rf,
+dphi_rf, omega_rf), their programs being rebuilt by the main file. The
+objects shared by several others (e.g. the Beam of the tracker and of the
+profile) are saved once and stay shared at the restart. Functions, files,
+MPI requests and the objects of other packages are not saved; the state of
+numpy's global random generator is saved as well.
+
+The arrays are copied at the checkpoint turn and written to an uncompressed
+.npz file in a background thread, overlapped with the tracking; the file
+replaces the previous checkpoint only once complete. In MPI (or shared
+memory) mode, each worker saves its own part of the beam to its own file.
+'''
+
+from builtins import object
+import os
+import json
+import numpy as np
+from ..utils import bmath as bm
+from ..input_parameters.serialisation import _describe, _join
+from ..monitors.monitors import AsyncWriter
+
+
+class Checkpoint(object):
+    r"""Class saving the state of the tracking map every n turns, and
+    restoring it bit-exactly to restart the simulation.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the .npz checkpoint file; in MPI mode, the rank of the
+        worker is appended to it
+    track_map : list
+        Objects of the tracking map, or their track methods; at the
+        restart, the same objects built by the main file are filled with
+        the saved state
+    every : int
+        Number of turns between two checkpoints, counted by the calls to
+        track(); default is 1000
+    asynchronous : bool
+        Write the checkpoints in a background thread; default is True
+
+    Attributes
+    ----------
+    turn : int
+        Number of calls to track(), restored by restore()
+    filename : str
+        Name of the checkpoint file of this worker
+
+    Examples
+    --------
+    >>> checkpoint = Checkpoint('run.npz', [tracker, profile, induced], 1000)
+    >>> start = checkpoint.restore() if os.path.exists(checkpoint.filename) \
+    >>>     else 0
+    >>> for turn in range(start, n_turns):
+    >>>     tracker.track()
+    >>>     profile.track()
+    >>>     induced.induced_voltage_sum()
+    >>>     checkpoint.track()
+    >>> checkpoint.close()
+
+    """
+
+    def __init__(self, filename, track_map, every=1000, asynchronous=True):
+
+        if int(every) < 1:
+            #InputDataError
+            raise RuntimeError("ERROR in Checkpoint: the number of turns " +
+                               "between the checkpoints should be positive!")
+
+        self.every = int(every)
+        self.turn = 0
+        # Bound methods (e.g. tracker.track) stand for their object
+        self.track_map = [getattr(element, '__self__', element)
+                          for element in track_map]
+
+        if bm.mpiMode():
+            self.rank = bm.get_worker().rank
+            self.workers = bm.get_worker().workers
+            root, extension = os.path.splitext(filename)
+            self.filename = root + '_rank{}'.format(self.rank) + extension
+        else:
+            self.rank = 0
+            self.workers = 1
+            self.filename = filename
+
+        if asynchronous:
+            self.writer = AsyncWriter(queue_size=1)
+        else:
+            self.writer = None
+
+    def track(self):
+        r"""Counts the turn and saves the checkpoint every n turns; to be
+        called at the end of the turn."""
+
+        self.turn += 1
+        if self.turn % self.every == 0:
+            self.save()
+
+    def save(self):
+        r"""Copies the state of the tracking map and writes it, in the
+        background thread if asynchronous."""
+
+        arrays = {}
+        memo = {id(self): None}
+        description = [_describe(element, 'map.' + str(i), arrays, memo)
+                       for i, element in enumerate(self.track_map)]
+        # Copied at this turn, as the writing overlaps with the tracking
+        for name in arrays:
+            arrays[name] = arrays[name].copy()
+
+        random_state = np.random.get_state()
+        arrays['__random_keys__'] = np.array(random_state[1])
+        header = json.dumps({'turn': self.turn, 'rank': self.rank,
+                             'workers': self.workers,
+                             'description': description,
+                             'random_state': [random_state[0]] +
+                             [_python_value(value) for value
+                              in random_state[2:]]})
+
+        if self.writer is None:
+            _write(self.filename, header, arrays)
+        else:
+            self.writer.submit(_write, self.filename, header, arrays)
+
+    def restore(self):
+        r"""Fills the objects of the tracking map with the state of the
+        checkpoint file.
+
+        Returns
+        -------
+        int
+            Turn of the checkpoint, from which the tracking is resumed
+
+        """
+
+        self.flush()
+        with np.load(self.filename) as npzfile:
+            header = json.loads(str(npzfile['__header__']))
+            arrays = dict((name, npzfile[name]) for name in npzfile.files
+                          if name != '__header__')
+
+        if header['workers'] != self.workers or header['rank'] != self.rank:
+            #InputDataError
+            raise RuntimeError("ERROR in Checkpoint: " + self.filename +
+                               " was saved by the worker {} of {}!".format(
+                                   header['rank'], header['workers']))
+        if len(header['description']) != len(self.track_map):
+            #InputDataError
+            raise RuntimeError("ERROR in Checkpoint: " + self.filename +
+                               " does not match the tracking map!")
+
+        restored = {}
+        for i, (element, description) in enumerate(zip(
+                self.track_map, header['description'])):
+            if description is not None:
+                _join(description, 'map.' + str(i), arrays, element, restored)
+
+        random_state = header['random_state']
+        np.random.set_state((random_state[0], arrays['__random_keys__']) +
+                            tuple(random_state[1:]))
+        self.turn = header['turn']
+
+        return self.turn
+
+    def flush(self):
+        r"""Waits for the checkpoint being written, if any."""
+
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        r"""Waits for the checkpoint being written and stops the background
+        thread."""
+
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _write(filename, header, arrays):
+
+    # Written to a temporary file first, so that a failure during the
+    # writing keeps the previous checkpoint
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as npzfile:
+        np.savez(npzfile, __header__=np.array(header), **arrays)
+    os.replace(temporary, filename)
+
+
+def _python_value(value):
+
+    return value.item() if isinstance(value, np.generic) else value
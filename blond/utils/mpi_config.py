@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 import numpy as np
 import logging
 from functools import wraps
@@ -61,6 +62,10 @@ class Worker:
             self.logger = MPILog(rank=self.rank)
             self.logger.disable()
 
+        # Per name: number of calls, time overlapped with the communication
+        # and time spent waiting for it
+        self.comm_timing = {}
+
         # if self.trace:
         #     mpiprof.mode = 'tracing'
         #     mpiprof.init(logfile=args.get('tracefile', 'trace'))
@@ -141,6 +146,39 @@ class Worker:
 
         return recvbuf
 
+    def redistribute(self, var, counts):
+        # Moves the elements of var (distributed over the workers) so that
+        # worker i ends up with counts[i] of them, keeping their global order
+        # (worker 0 first): each worker only exchanges with the workers whose
+        # new range of elements overlaps its current one
+        self.logger.debug('redistribute')
+
+        current = np.zeros(self.workers, dtype=int)
+        self.intercomm.Allgather(np.array([len(var)], dtype=int), current)
+        counts = np.asarray(counts, dtype=int)
+        if np.sum(counts) != np.sum(current):
+            #MPIError
+            raise RuntimeError("ERROR in redistribute: the counts do not " +
+                               "add up to the number of elements!")
+
+        old_edges = np.append([0], np.cumsum(current))
+        new_edges = np.append([0], np.cumsum(counts))
+        sendcounts = np.maximum(
+            np.minimum(old_edges[self.rank+1], new_edges[1:]) -
+            np.maximum(old_edges[self.rank], new_edges[:-1]), 0)
+        recvcounts = np.maximum(
+            np.minimum(new_edges[self.rank+1], old_edges[1:]) -
+            np.maximum(new_edges[self.rank], old_edges[:-1]), 0)
+        sdispls = np.append([0], np.cumsum(sendcounts[:-1]))
+        rdispls = np.append([0], np.cumsum(recvcounts[:-1]))
+
+        sendbuf = np.ascontiguousarray(var)
+        recvbuf = np.empty(counts[self.rank], dtype=sendbuf.dtype)
+        self.intercomm.Alltoallv(
+            [sendbuf, sendcounts, sdispls, sendbuf.dtype.char],
+            [recvbuf, recvcounts, rdispls, recvbuf.dtype.char])
+        return recvbuf
+
     def broadcast(self, var):
         self.logger.debug('broadcast')
 
@@ -247,11 +285,18 @@ class Worker:
             self.intercomm.Reduce(sendbuf, recvbuf, op=op, root=0)
             return sendbuf
 
-    def allreduce(self, sendbuf, recvbuf=None, dtype=np.uint32, operator='custom_sum'):
+    def allreduce(self, sendbuf, recvbuf=None, dtype=np.uint32, operator='custom_sum',
+                  name=None):
         # supported ops:
         # sum, mean, std, max, min, prod, custom_sum
+        # if name is given, the time of the call is added to comm_timing
         if self.log:
             self.logger.debug('allreduce')
+        if name is not None:
+            start = time.perf_counter()
+            result = self.allreduce(sendbuf, recvbuf, dtype, operator)
+            self._add_comm_timing(name, 0., time.perf_counter() - start)
+            return result
         operator = operator.lower()
         if operator == 'custom_sum':
             dtype = sendbuf.dtype.name
@@ -304,6 +349,64 @@ class Worker:
             return recvbuf
 
 
+    def iallreduce(self, sendbuf, operator='sum', name='iallreduce'):
+        # Non-blocking in place allreduce, returning the pending reduction to
+        # be completed with wait(); sendbuf must not be used until then.
+        # Only the predefined operators (sum, max, min, prod) are supported,
+        # as the custom ones would only progress inside wait()
+        if self.log:
+            self.logger.debug('iallreduce')
+        operator = operator.lower()
+        if operator == 'sum':
+            op = MPI.SUM
+        elif operator == 'max':
+            op = MPI.MAX
+        elif operator == 'min':
+            op = MPI.MIN
+        elif operator == 'prod':
+            op = MPI.PROD
+        else:
+            #MPIError
+            raise RuntimeError("ERROR in iallreduce: operator " + operator +
+                               " not supported!")
+
+        request = self.intercomm.Iallreduce(MPI.IN_PLACE, sendbuf, op=op)
+        return [request, name, time.perf_counter()]
+
+    def wait(self, pending):
+        # Completes a reduction started by iallreduce(); the time since its
+        # start is counted as overlapped, the time in Wait as exposed
+        if self.log:
+            self.logger.debug('wait')
+        request, name, posted = pending
+        start = time.perf_counter()
+        request.Wait()
+        self._add_comm_timing(name, start - posted,
+                              time.perf_counter() - start)
+
+    def _add_comm_timing(self, name, overlapped, exposed):
+        if name not in self.comm_timing:
+            self.comm_timing[name] = np.zeros(3)
+        self.comm_timing[name] += [1, overlapped, exposed]
+
+    def print_comm_timing(self):
+        # Time per call overlapped with and waiting for each communication,
+        # the maximum over the workers. A blocking call only has exposed
+        # time; the hidden communication is the exposed time saved by its
+        # non-blocking counterpart
+        self.logger.debug('print_comm_timing')
+        names = sorted(self.comm_timing)
+        timing = np.array([self.comm_timing[name] for name in names])
+        timing = self.intercomm.allreduce(timing, op=MPI.MAX)
+        if self.isMaster:
+            print('[{}] {:<20}\t{:>8}\t{:>16}\t{:>16}'.format(
+                self.rank, 'communication', 'calls', 'overlapped [ms]',
+                'exposed [ms]'))
+            for name, (calls, overlapped, exposed) in zip(names, timing):
+                print('[{}] {:<20}\t{:>8d}\t{:>16.4f}\t{:>16.4f}'.format(
+                    self.rank, name, int(calls), 1e3 * overlapped / calls,
+                    1e3 * exposed / calls))
+
     def sync(self):
         self.logger.debug('sync')
         self.intercomm.Barrier()
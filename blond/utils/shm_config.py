@@ -0,0 +1,309 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+'''
+**Shared memory counterpart of mpi_config, to run the MPI main files on a
+single node without MPI (see bmath.use_shared_memory).**
+
+The workers are forked processes running the rest of the main file, like
+the MPI ranks. The arrays scattered to the workers (the beam coordinates
+with Beam.split) live in memory mapped segments shared by all of them, each
+worker owning a disjoint range; the reductions (e.g. of the profile) are
+done in place in a shared work array, as a binary tree.
+'''
+
+import sys
+import os
+import time
+import logging
+import tempfile
+import multiprocessing
+import numpy as np
+
+worker = None
+
+
+def start(n_workers=None):
+    '''
+    Forks the workers; to be called at the top of the main file, before
+    the first call to the C++ routines (OpenMP is not fork safe).
+    '''
+    global worker
+    if worker is None:
+        worker = Worker(n_workers)
+    return worker
+
+
+def shmprint(*args, all=False):
+    if worker.isMaster or all:
+        print('[{}]'.format(worker.rank), *args)
+
+
+class Worker(object):
+
+    def __init__(self, n_workers=None):
+
+        if n_workers is None:
+            n_workers = os.cpu_count()
+        self.workers = int(n_workers)
+        if self.workers < 1:
+            #InputDataError
+            raise RuntimeError("ERROR in shm_config: the number of workers " +
+                               "should be positive!")
+
+        self.hostname = os.uname()[1]
+        self.logger = logging.getLogger('blond.shm_config')
+        self.comm_timing = {}
+
+        if os.path.isdir('/dev/shm'):
+            self._directory = '/dev/shm'
+        else:
+            self._directory = tempfile.gettempdir()
+        self._master_pid = os.getpid()
+        # Number of shared segments created so far, the same in all the
+        # workers as they make the same calls
+        self._n_segments = 0
+        # Work arrays reused over the calls, per size and type
+        self._work_arrays = {}
+
+        context = multiprocessing.get_context('fork')
+        self._barrier = context.Barrier(self.workers)
+
+        self.rank = 0
+        self._children = []
+        for rank in range(1, self.workers):
+            pid = os.fork()
+            if pid == 0:
+                self.rank = rank
+                self._children = []
+                break
+            self._children.append(pid)
+
+        # A worker failing breaks the barrier, so that the others fail too
+        # instead of waiting forever
+        excepthook = sys.excepthook
+
+        def abort_excepthook(*args):
+            self._barrier.abort()
+            excepthook(*args)
+
+        sys.excepthook = abort_excepthook
+
+    @property
+    def isMaster(self):
+        return self.rank == 0
+
+    def sync(self):
+        self.logger.debug('sync')
+        self._barrier.wait()
+
+    def finalize(self):
+        self.logger.debug('finalize')
+        if not self.isMaster:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(0)
+        for pid in self._children:
+            os.waitpid(pid, 0)
+        self._children = []
+
+    def greet(self):
+        self.logger.debug('greet')
+        print('[{}]@{}: Hello World!'.format(self.rank, self.hostname))
+
+    def _shared_array(self, size, dtype):
+        # New shared segment, created by the master and mapped by all the
+        # workers; the file is removed once mapped everywhere
+        self._n_segments += 1
+        filename = os.path.join(self._directory, 'blond-{}-{}'.format(
+            self._master_pid, self._n_segments))
+        shape = (max(int(size), 1),)
+        if self.isMaster:
+            array = np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+        self.sync()
+        if not self.isMaster:
+            array = np.memmap(filename, dtype=dtype, mode='r+', shape=shape)
+        self.sync()
+        if self.isMaster:
+            os.remove(filename)
+
+        return array.view(np.ndarray)[:size]
+
+    def _work_array(self, key, size, dtype):
+        # Shared work array of at least size elements, grown if needed
+        work = self._work_arrays.get((key, np.dtype(dtype).str))
+        if work is None or len(work) < size:
+            work = self._shared_array(size, dtype)
+            self._work_arrays[(key, np.dtype(dtype).str)] = work
+        return work[:size]
+
+    def _counts(self, size):
+        # Sizes of the local arrays of all the workers
+        counts = self._work_array('counts', self.workers, np.int64)
+        counts[self.rank] = size
+        self.sync()
+        counts = np.array(counts, dtype=int)
+        self.sync()
+        return counts
+
+    def gather(self, var):
+        self.logger.debug('gather')
+        recvbuf = self._gather(var)
+        if self.isMaster:
+            return recvbuf
+        else:
+            return var
+
+    # All workers gather the variable var (from all workers)
+    def allgather(self, var):
+        self.logger.debug('allgather')
+        return self._gather(var)
+
+    def _gather(self, var):
+        var = np.asarray(var)
+        counts = self._counts(len(var))
+        displs = np.append([0], np.cumsum(counts))
+        exchange = self._work_array('exchange', displs[-1], var.dtype)
+        exchange[displs[self.rank]:displs[self.rank+1]] = var
+        self.sync()
+        recvbuf = np.array(exchange)
+        self.sync()
+        return recvbuf
+
+    def scatter(self, var):
+        # The array of the master is copied to a new shared segment, of
+        # which each worker gets its range (a view, without copy)
+        self.logger.debug('scatter')
+        var = np.asarray(var)
+        total_size = self._counts(len(var))[0]
+        counts = [total_size // self.workers + 1 if i < total_size % self.workers
+                  else total_size // self.workers for i in range(self.workers)]
+        displs = np.append([0], np.cumsum(counts))
+
+        segment = self._shared_array(total_size, var.dtype)
+        if self.isMaster:
+            segment[:] = var
+        self.sync()
+
+        return segment[displs[self.rank]:displs[self.rank+1]]
+
+    def broadcast(self, var):
+        self.logger.debug('broadcast')
+        var = np.asarray(var)
+        total_size = self._counts(len(var))[0]
+        exchange = self._work_array('exchange', total_size, var.dtype)
+        if self.isMaster:
+            exchange[:] = var
+        self.sync()
+        recvbuf = np.array(exchange)
+        self.sync()
+        return recvbuf
+
+    def redistribute(self, var, counts):
+        # Same as mpi_config.Worker.redistribute: the arrays of the workers
+        # are copied in order to a new shared segment, of which each worker
+        # gets its new range (a view, as with scatter)
+        self.logger.debug('redistribute')
+        var = np.asarray(var)
+        counts = np.asarray(counts, dtype=int)
+        displs = np.append([0], np.cumsum(self._counts(len(var))))
+        if np.sum(counts) != displs[-1]:
+            #MPIError
+            raise RuntimeError("ERROR in redistribute: the counts do not " +
+                               "add up to the number of elements!")
+
+        segment = self._shared_array(displs[-1], var.dtype)
+        segment[displs[self.rank]:displs[self.rank+1]] = var
+        self.sync()
+
+        edges = np.append([0], np.cumsum(counts))
+        return segment[edges[self.rank]:edges[self.rank+1]]
+
+    def allreduce(self, sendbuf, recvbuf=None, dtype=np.uint32, operator='custom_sum',
+                  name=None):
+        # supported ops:
+        # sum, mean, max, min, prod, custom_sum
+        # if name is given, the time of the call is added to comm_timing
+        self.logger.debug('allreduce')
+        start_time = time.perf_counter()
+        if recvbuf is None:
+            recvbuf = sendbuf
+        if sendbuf.size == 0:
+            return recvbuf
+
+        operator = operator.lower()
+        if operator in ['sum', 'custom_sum', 'mean', 'avg']:
+            op = np.add
+        elif operator == 'max':
+            op = np.maximum
+        elif operator == 'min':
+            op = np.minimum
+        elif operator == 'prod':
+            op = np.multiply
+        else:
+            #MPIError
+            raise RuntimeError("ERROR in allreduce: operator " + operator +
+                               " not supported!")
+
+        # Each worker reduces into its row the row of the worker step after
+        # it, for step = 1, 2, 4...; the result is in the first row
+        work = self._work_array('reduce', self.workers * sendbuf.size,
+                                sendbuf.dtype).reshape(self.workers, -1)
+        work[self.rank] = sendbuf.ravel()
+        self.sync()
+        step = 1
+        while step < self.workers:
+            if self.rank % (2 * step) == 0 and self.rank + step < self.workers:
+                op(work[self.rank], work[self.rank + step],
+                   out=work[self.rank])
+            self.sync()
+            step *= 2
+
+        recvbuf.ravel()[:] = work[0]
+        self.sync()
+
+        if name is not None:
+            self._add_comm_timing(name, 0., time.perf_counter() - start_time)
+
+        if operator in ['mean', 'avg']:
+            return recvbuf / self.workers
+        else:
+            return recvbuf
+
+    def iallreduce(self, sendbuf, operator='sum', name='iallreduce'):
+        # The shared memory reductions are done by the workers themselves,
+        # so there is nothing to overlap: the reduction is done at once and
+        # counted as exposed
+        self.logger.debug('iallreduce')
+        self.allreduce(sendbuf, operator=operator, name=name)
+        return [None, name, None]
+
+    def wait(self, pending):
+        # The reduction is already complete
+        self.logger.debug('wait')
+
+    def _add_comm_timing(self, name, overlapped, exposed):
+        if name not in self.comm_timing:
+            self.comm_timing[name] = np.zeros(3)
+        self.comm_timing[name] += [1, overlapped, exposed]
+
+    def print_comm_timing(self):
+        # Same as mpi_config.Worker.print_comm_timing
+        self.logger.debug('print_comm_timing')
+        names = sorted(self.comm_timing)
+        timing = np.array([self.comm_timing[name] for name in names])
+        timing = self.allreduce(timing, operator='max')
+        if self.isMaster:
+            print('[{}] {:<20}\t{:>8}\t{:>16}\t{:>16}'.format(
+                self.rank, 'communication', 'calls', 'overlapped [ms]',
+                'exposed [ms]'))
+            for name, (calls, overlapped, exposed) in zip(names, timing):
+                print('[{}] {:<20}\t{:>8d}\t{:>16.4f}\t{:>16.4f}'.format(
+                    self.rank, name, int(calls), 1e3 * overlapped / calls,
+                    1e3 * exposed / calls))
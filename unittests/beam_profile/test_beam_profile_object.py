@@ -278,6 +278,99 @@ class testProfileClass(unittest.TestCase):
             rtol=rtol, atol=atol,
             err_msg='Bunch length values not correct')
 
+    def test_reduce_every(self):
+        self.assertEqual(profileModule.OtherSlicesOptions(
+            reduce_every=10).reduce_every, 10)
+        for reduce_every in [0, 2.5]:
+            with self.assertRaises(RuntimeError):
+                profileModule.OtherSlicesOptions(reduce_every=reduce_every)
+
+
+class testHistogramWorkspace(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(4)
+        self.dt = np.random.normal(1e-9, 0.2e-9, 10000)
+
+    def _check(self, strategy, n_slices):
+        cut_left, cut_right = 0.2e-9, 1.7e-9
+        reference = np.histogram(self.dt, bins=n_slices,
+                                 range=(cut_left, cut_right))[0]
+        profile = np.zeros(n_slices)
+        workspace = profileModule.HistogramWorkspace(strategy)
+        # The work arrays are reused at the second call
+        for i in range(2):
+            workspace.slice(self.dt, profile, cut_left, cut_right)
+            np.testing.assert_array_equal(profile, reference)
+        return workspace
+
+    def test_private(self):
+        self._check('private', 100)
+
+    def test_atomic(self):
+        self._check('atomic', 100)
+
+    def test_sort(self):
+        self._check('sort', 100)
+        self._check('sort', 100000)
+
+    def test_not_finite(self):
+        # Lost (NaN) or diverging particles are outside the histogram
+        self.dt[::7] = np.nan
+        self.dt[1::7] = np.inf
+        self.dt[2::7] = -1e30
+        for strategy in ['private', 'atomic', 'sort']:
+            self._check(strategy, 100)
+
+    def test_single_precision(self):
+        # The counts are accumulated in double precision: a single precision
+        # sum would stop at 2**24
+        profileModule.bm.use_precision('single')
+        try:
+            dt = np.full(2**24 + 2, 1.05e-9, dtype=np.float32)
+            for strategy in ['private', 'atomic']:
+                profile = np.zeros(10, dtype=np.float32)
+                profileModule.HistogramWorkspace(strategy).slice(
+                    dt, profile, 0.5e-9, 1.5e-9)
+                self.assertEqual(profile[5], 2**24 + 2)
+                self.assertEqual(np.sum(profile[:5]) + np.sum(profile[6:]),
+                                 0)
+        finally:
+            profileModule.bm.use_precision('double')
+
+    def test_auto(self):
+        n_threads = profileModule.bm.histogram_max_threads()
+        workspace = self._check('auto', 100)
+        if n_threads * 100 <= len(self.dt):
+            self.assertEqual(workspace.strategy, 'private')
+        workspace = profileModule.HistogramWorkspace()
+        self.assertEqual(workspace.choose_strategy(100, 10**6, 64),
+                         'private')
+        self.assertEqual(workspace.choose_strategy(10**5, 10**6, 64),
+                         'atomic')
+        self.assertEqual(workspace.choose_strategy(10**7, 10**6, 64), 'sort')
+        self.assertEqual(workspace.choose_strategy(10**7, 10**6, 1),
+                         'private')
+
+    def test_profile(self):
+        ring = Ring(125, 0.001, 1e9, Proton(), 1)
+        beam = Beam(ring, len(self.dt), 1e10)
+        beam.dt = self.dt
+        profile = profileModule.Profile(
+            beam, CutOptions=profileModule.CutOptions(
+                cut_left=0.2e-9, cut_right=1.7e-9, n_slices=100),
+            OtherSlicesOptions=profileModule.OtherSlicesOptions(
+                histogram_strategy='atomic'))
+        profile.track()
+        self.assertEqual(profile.histogram_workspace.strategy, 'atomic')
+        np.testing.assert_array_equal(
+            profile.n_macroparticles,
+            np.histogram(self.dt, bins=100, range=(0.2e-9, 1.7e-9))[0])
+
+    def test_wrong_strategy(self):
+        with self.assertRaises(RuntimeError):
+            profileModule.HistogramWorkspace('shared')
+
 
 if __name__ == '__main__':
 
@@ -27,9 +27,11 @@ from blond.beam.beam import Particle, Proton, Electron
 from blond.input_parameters.ring import Ring
 from blond.input_parameters.rf_parameters import RFStation
 from blond.beam.beam import Beam
-from blond.beam.distributions import matched_from_distribution_function
+from blond.beam.distributions import matched_from_distribution_function, \
+    bigaussian
 from blond.trackers.tracker import FullRingAndRF, RingAndRFTracker
 import blond.utils.exceptions as blExcept
+from blond.utils import bmath as bm
 
 
 class testParticleClass(unittest.TestCase):
@@ -189,6 +191,49 @@ class testBeamClass(unittest.TestCase):
         self.assertAlmostEqual(self.beam.mean_dE, 0., delta=1e-2,
                                msg='Beam: Failed statistic mean_dE')
 
+    def test_beam_statistic_losses(self):
+
+        self.beam.dt = 1e-9*numpy.random.randn(self.beam.n_macroparticles)
+        self.beam.dE = 1e7*numpy.random.randn(self.beam.n_macroparticles)
+        self.beam.id[::3] = 0
+        alive = self.beam.id != 0
+
+        self.beam.statistics()
+
+        for coordinate in ['dt', 'dE']:
+            x = getattr(self.beam, coordinate)[alive]
+            numpy.testing.assert_allclose(
+                numpy.array([getattr(self.beam, name + coordinate) for name in
+                             ['mean_', 'sigma_', 'min_', 'max_']]) / numpy.std(x),
+                numpy.array([numpy.mean(x), numpy.std(x), numpy.min(x),
+                             numpy.max(x)]) / numpy.std(x),
+                rtol=0, atol=1e-10,
+                err_msg='Beam: Failed statistic ' + coordinate)
+
+    def test_beam_statistic_partials(self):
+        # The statistics of parts of the beam (e.g. of the MPI workers) are
+        # combined exactly, up to the rounding relative to the spread
+
+        self.beam.dt = 1e-9*numpy.random.randn(self.beam.n_macroparticles)
+        self.beam.dE = 1e7*numpy.random.randn(self.beam.n_macroparticles)
+        self.beam.id[:1000] = 0
+        self.beam.statistics()
+        reference = [self.beam.mean_dt, self.beam.sigma_dt, self.beam.mean_dE,
+                     self.beam.sigma_dE, self.beam.min_dE, self.beam.max_dE]
+
+        parts = numpy.array_split(numpy.arange(self.beam.n_macroparticles), 3)
+        partials = numpy.array([
+            bm.beam_statistics(self.beam.dt[part], self.beam.dE[part],
+                               self.beam.id[part]) for part in parts])
+        self.beam._set_statistics(partials)
+
+        scale = numpy.array([1e-9, 1e-9, 1e7, 1e7, 1e7, 1e7])
+        numpy.testing.assert_allclose(
+            numpy.array([self.beam.mean_dt, self.beam.sigma_dt,
+                         self.beam.mean_dE, self.beam.sigma_dE,
+                         self.beam.min_dE, self.beam.max_dE]) / scale,
+            numpy.array(reference) / scale, rtol=0, atol=1e-12)
+
     def test_losses_separatrix(self):
 
         longitudinal_tracker = RingAndRFTracker(self.rf_params, self.beam)
@@ -266,6 +311,61 @@ class testBeamClass(unittest.TestCase):
                          self.beam.n_macroparticles,
                          msg='Beam: Failed losses_energy_cut, second')
 
+    def test_compaction(self):
+
+        beam = Beam(self.general_params, 1000, 1e9, compaction_threshold=0.2)
+        beam.dt[:] = numpy.linspace(0, 10e-9, 1000)
+        beam.dE[:] = numpy.linspace(-1e6, 1e6, 1000)
+        dt, dE, buffer = beam.dt.copy(), beam.dE.copy(), beam.dt
+
+        # Below the threshold, the lost particles stay in the arrays
+        beam.losses_longitudinal_cut(0., 9e-9)
+        self.assertEqual(len(beam.dt), 1000)
+
+        beam.losses_energy_cut(-0.5e6, 0.5e6)
+        alive = ((dt*(9e-9 - dt) >= 0) &
+                 ((dE + 0.5e6)*(0.5e6 - dE) >= 0))
+        numpy.testing.assert_array_equal(beam.id,
+                                         numpy.arange(1, 1001)[alive])
+        numpy.testing.assert_array_equal(beam.dt, dt[alive])
+        numpy.testing.assert_array_equal(beam.dE, dE[alive])
+        self.assertTrue(numpy.shares_memory(beam.dt, buffer),
+                        msg='Beam: compaction reallocated the arrays')
+        self.assertEqual(beam.n_macroparticles, numpy.sum(alive))
+        self.assertEqual(beam.n_macroparticles_alive, numpy.sum(alive))
+        self.assertEqual(beam.n_macroparticles_lost, 1000 - numpy.sum(alive))
+
+        # The ids of the compacted particles are not reused
+        beam.add_particles([[1e-9, 2e-9], [0., 0.]])
+        self.assertEqual(beam.id[-2:].tolist(), [1001, 1002])
+
+        with self.assertRaises(RuntimeError):
+            Beam(self.general_params, 1000, 1e9, compaction_threshold=1)
+
+    def test_compaction_tracking(self):
+
+        beams = []
+        for compaction_threshold in [None, 0.]:
+            beam = Beam(self.general_params, 1000, 1e9,
+                        compaction_threshold=compaction_threshold)
+            bigaussian(self.general_params, self.rf_params, beam, 1e-9,
+                       seed=1)
+            beam.losses_energy_cut(-0.5*beam.sigma_dE, 2*beam.sigma_dE)
+            tracker = RingAndRFTracker(self.rf_params, beam)
+            for turn in range(50):
+                tracker.track()
+                beam.losses_longitudinal_cut(0.3e-9, 2.3e-9)
+            beams.append(beam)
+
+        reference, compacted = beams
+        self.assertLess(len(compacted.dt), 1000)
+        alive = reference.id != 0
+        numpy.testing.assert_array_equal(compacted.id, reference.id[alive])
+        numpy.testing.assert_array_equal(compacted.dt, reference.dt[alive])
+        numpy.testing.assert_array_equal(compacted.dE, reference.dE[alive])
+        self.assertEqual(compacted.n_macroparticles_lost,
+                         reference.n_macroparticles_lost)
+
     def test_addition(self):
         np = numpy
 
@@ -16,9 +16,15 @@ Unittest for impedances.impedance
 import unittest
 import numpy as np
 
+from scipy.constants import e
+
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.rf_parameters import RFStation
+from blond.beam.beam import Beam, Proton
 from blond.beam.profile import Profile, CutOptions
-from blond.impedances.impedance import InducedVoltageFreq, InducedVoltageTime
-from blond.impedances.impedance_sources import Resonators
+from blond.impedances.impedance import InducedVoltageFreq, InducedVoltageTime, \
+    TotalInducedVoltage, InducedVoltageResonator
+from blond.impedances.impedance_sources import Resonators, InputTable
 
 class TestInducedVoltageFreq(unittest.TestCase):
 
@@ -120,6 +126,215 @@ class TestInducedVoltageTime(unittest.TestCase):
         np.testing.assert_allclose(test_object.wake_length_input, 11e-9)
 
 
+class TestInducedVoltageBuffers(unittest.TestCase):
+
+    def setUp(self):
+
+        ring = Ring(26658.883, 1/55.759505**2, 450e9, Proton(), 10)
+        self.beam = Beam(ring, 1000, 1e11)
+        np.random.seed(0)
+        self.beam.dt = np.random.normal(2.5e-9, 0.3e-9, 1000)
+        self.profile = Profile(self.beam,
+           CutOptions=CutOptions(cut_left=0, cut_right=5e-9, n_slices=64))
+        self.profile.track()
+        self.impedance_source = Resonators([4.5e6], [200.222e6], [200])
+
+    def _reference(self, induced_voltage_object):
+        # Induced voltage computed with temporary arrays
+        spectrum = np.fft.rfft(self.profile.n_macroparticles,
+                               induced_voltage_object.n_fft)
+        return - (self.beam.Particle.charge * e * self.beam.ratio
+                  * np.fft.irfft(induced_voltage_object.total_impedance
+                                 * spectrum))[:self.profile.n_slices]
+
+    def _check(self, induced_voltage_object):
+        total = TotalInducedVoltage(self.beam, self.profile,
+                                    [induced_voltage_object])
+        total.induced_voltage_sum()
+        first = total.induced_voltage
+        buffer = induced_voltage_object._induced_voltage_buffer
+        first_reference = self._reference(induced_voltage_object)
+        np.testing.assert_allclose(first, first_reference,
+                                   rtol=1e-12, atol=1e-12*np.max(np.abs(first)))
+
+        self.profile.n_macroparticles[:] = self.profile.n_macroparticles[::-1]
+        total.induced_voltage_sum()
+        # The work arrays are reused at the next turn, but the induced
+        # voltage of the previous turn is kept
+        self.assertIs(induced_voltage_object._induced_voltage_buffer, buffer)
+        self.assertIsNot(total.induced_voltage, first)
+        np.testing.assert_allclose(first, first_reference,
+                                   rtol=1e-12, atol=1e-12*np.max(np.abs(first)))
+        np.testing.assert_allclose(total.induced_voltage,
+                                   self._reference(induced_voltage_object),
+                                   rtol=1e-12, atol=1e-12*np.max(np.abs(first)))
+
+    def test_freq(self):
+        self._check(InducedVoltageFreq(self.beam, self.profile,
+                                       [self.impedance_source],
+                                       frequency_resolution=5e6))
+
+    def test_time(self):
+        self._check(InducedVoltageTime(self.beam, self.profile,
+                                       [self.impedance_source],
+                                       wake_length=11e-9))
+
+
+class TestMultiTurnWakeRecursive(unittest.TestCase):
+
+    def setUp(self):
+
+        ring = Ring(2*np.pi*25, 1/4.4**2, 26e9, Proton(), 20)
+        self.rf = RFStation(ring, [1], [1e3], [0])
+        self.t_rev = ring.t_rev[0]
+        self.beam = Beam(ring, 10000, 1e11)
+        np.random.seed(0)
+        self.beam.dt = np.random.normal(100e-9, 10e-9, 10000)
+        self.profile = Profile(self.beam,
+           CutOptions=CutOptions(cut_left=0, cut_right=200e-9, n_slices=200))
+        self.profile.track()
+        self.resonator = Resonators([1e4], [2e6], [50])
+
+    def test_against_time_mode(self):
+        # Memory long enough for the wake to be fully damped
+        mtw_time = InducedVoltageTime(self.beam, self.profile,
+                                      [self.resonator],
+                                      wake_length=40*self.t_rev,
+                                      multi_turn_wake=True,
+                                      RFParams=self.rf, mtw_mode='time')
+        mtw_recursive = InducedVoltageTime(self.beam, self.profile,
+                                           [self.resonator],
+                                           multi_turn_wake=True,
+                                           RFParams=self.rf,
+                                           mtw_mode='recursive')
+        for turn in range(10):
+            mtw_time.induced_voltage_generation()
+            mtw_recursive.induced_voltage_generation()
+            reference = mtw_time.induced_voltage[:self.profile.n_slices]
+            np.testing.assert_allclose(
+                mtw_recursive.induced_voltage, reference, rtol=0,
+                atol=1e-3*np.max(np.abs(reference)))
+            self.rf.counter[0] += 1
+
+    def test_broadband(self):
+        # The wake is damped within the turn, the previous turns do not
+        # contribute
+        resonator = Resonators([1e4], [5e9], [1])
+        single = InducedVoltageTime(self.beam, self.profile, [resonator])
+        mtw_recursive = InducedVoltageTime(self.beam, self.profile,
+                                           [resonator],
+                                           multi_turn_wake=True,
+                                           RFParams=self.rf,
+                                           mtw_mode='recursive')
+        single.induced_voltage_generation()
+        for turn in range(5):
+            mtw_recursive.induced_voltage_generation()
+            self.assertTrue(np.all(np.isfinite(mtw_recursive.mtw_state)))
+            np.testing.assert_allclose(
+                mtw_recursive.induced_voltage,
+                single.induced_voltage[:self.profile.n_slices], rtol=0,
+                atol=1e-9*np.max(np.abs(single.induced_voltage)))
+            self.rf.counter[0] += 1
+
+    def test_non_resonator_source(self):
+        table = InputTable(np.linspace(0, 1e-6, 100), np.ones(100))
+        with self.assertRaises(RuntimeError):
+            InducedVoltageTime(self.beam, self.profile, [table],
+                               multi_turn_wake=True, RFParams=self.rf,
+                               mtw_mode='recursive')
+
+
+class TestInducedVoltageResonator(unittest.TestCase):
+
+    def setUp(self):
+
+        ring = Ring(2*np.pi*25, 1/4.4**2, 26e9, Proton(), 20)
+        self.rf = RFStation(ring, [1], [1e3], [0])
+        self.t_rev = ring.t_rev[0]
+        self.beam = Beam(ring, 10000, 1e11)
+        np.random.seed(0)
+        self.beam.dt = np.random.normal(100e-9, 10e-9, 10000)
+        self.profile = Profile(self.beam,
+           CutOptions=CutOptions(cut_left=0, cut_right=200e-9, n_slices=200))
+        self.profile.track()
+        self.resonators = Resonators([1e4, 2e3], [2e6, 1.5e7], [50, 3])
+
+    def test_recursive_at_line_density_times(self):
+        matrix = InducedVoltageResonator(self.beam, self.profile,
+                                         self.resonators)
+        recursive = InducedVoltageResonator(self.beam, self.profile,
+                                            self.resonators,
+                                            method='recursive')
+        matrix.induced_voltage_generation()
+        recursive.induced_voltage_generation()
+        np.testing.assert_allclose(
+            recursive.induced_voltage, matrix.induced_voltage, rtol=0,
+            atol=1e-9*np.max(np.abs(matrix.induced_voltage)))
+
+    def test_recursive_time_array(self):
+        # Unsorted time values, inside and outside the profile
+        time_array = np.random.uniform(-50e-9, 300e-9, 300)
+        time_array[:10] = self.profile.bin_centers[::20]
+        matrix = InducedVoltageResonator(self.beam, self.profile,
+                                         self.resonators,
+                                         timeArray=time_array)
+        recursive = InducedVoltageResonator(self.beam, self.profile,
+                                            self.resonators,
+                                            timeArray=time_array,
+                                            method='recursive')
+        matrix.induced_voltage_generation()
+        recursive.induced_voltage_generation()
+        np.testing.assert_allclose(
+            recursive.induced_voltage, matrix.induced_voltage, rtol=0,
+            atol=1e-9*np.max(np.abs(matrix.induced_voltage)))
+
+    def test_multi_turn_wake(self):
+        recursive = InducedVoltageResonator(self.beam, self.profile,
+                                            self.resonators,
+                                            method='recursive',
+                                            multi_turn_wake=True,
+                                            RFParams=self.rf)
+        for turn in range(5):
+            recursive.induced_voltage_generation()
+            self.rf.counter[0] += 1
+
+        # Same profile at every turn: sum of the single-turn voltages seen
+        # one to four revolution periods later
+        reference = np.zeros(self.profile.n_slices)
+        for turn in range(5):
+            single = InducedVoltageResonator(
+                self.beam, self.profile, self.resonators,
+                timeArray=self.profile.bin_centers + turn*self.t_rev)
+            single.induced_voltage_generation()
+            reference += single.induced_voltage
+
+        np.testing.assert_allclose(
+            recursive.induced_voltage, reference, rtol=0,
+            atol=1e-9*np.max(np.abs(reference)))
+
+    def test_multi_turn_wake_broadband(self):
+        resonator = Resonators([1e4], [5e9], [1])
+        single = InducedVoltageResonator(self.beam, self.profile, resonator,
+                                         method='recursive')
+        recursive = InducedVoltageResonator(self.beam, self.profile,
+                                            resonator, method='recursive',
+                                            multi_turn_wake=True,
+                                            RFParams=self.rf)
+        single.induced_voltage_generation()
+        for turn in range(5):
+            recursive.induced_voltage_generation()
+            self.assertTrue(np.all(np.isfinite(recursive.mtw_state)))
+            np.testing.assert_allclose(
+                recursive.induced_voltage, single.induced_voltage, rtol=0,
+                atol=1e-9*np.max(np.abs(single.induced_voltage)))
+            self.rf.counter[0] += 1
+
+    def test_wrong_method(self):
+        with self.assertRaises(RuntimeError):
+            InducedVoltageResonator(self.beam, self.profile, self.resonators,
+                                    method='fft')
+
+
 if __name__ == '__main__':
 
     unittest.main()
@@ -0,0 +1,115 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unittest for impedances.impedance_cache
+"""
+
+import unittest
+import shutil
+import tempfile
+import numpy as np
+
+from blond.beam.profile import Profile, CutOptions
+from blond.impedances.impedance import InducedVoltageFreq, InducedVoltageTime
+from blond.impedances.impedance_sources import Resonators, InputTable
+from blond.impedances.impedance_cache import ImpedanceCache
+
+
+class TestImpedanceCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.profile = Profile(None,
+            CutOptions=CutOptions(cut_left=0, cut_right=5e-9, n_slices=16))
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _resonator(self, R_S=4.5e6):
+        return Resonators([R_S], [200.222e6], [200])
+
+    def test_freq_hit(self):
+        cache = ImpedanceCache()
+        reference = InducedVoltageFreq(None, self.profile,
+                                       [self._resonator()])
+        first = InducedVoltageFreq(None, self.profile, [self._resonator()],
+                                   cache=cache)
+        second = InducedVoltageFreq(None, self.profile, [self._resonator()],
+                                    cache=cache)
+
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 1)
+        np.testing.assert_array_equal(first.total_impedance,
+                                      reference.total_impedance)
+        np.testing.assert_array_equal(second.total_impedance,
+                                      reference.total_impedance)
+        np.testing.assert_array_equal(
+            second.impedance_source_list[0].frequency_array, second.freq)
+
+    def test_different_parameters(self):
+        cache = ImpedanceCache()
+        InducedVoltageFreq(None, self.profile, [self._resonator()],
+                           cache=cache)
+        other = InducedVoltageFreq(None, self.profile,
+                                   [self._resonator(R_S=1e6)], cache=cache)
+        reference = InducedVoltageFreq(None, self.profile,
+                                       [self._resonator(R_S=1e6)])
+
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 0)
+        np.testing.assert_array_equal(other.total_impedance,
+                                      reference.total_impedance)
+
+    def test_different_grid(self):
+        cache = ImpedanceCache()
+        InducedVoltageFreq(None, self.profile, [self._resonator()],
+                           cache=cache)
+        InducedVoltageFreq(None, self.profile, [self._resonator()],
+                           frequency_resolution=3e6, cache=cache)
+
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 0)
+
+    def test_time_on_disk(self):
+        cache = ImpedanceCache(self.cache_dir)
+        reference = InducedVoltageTime(None, self.profile,
+                                       [self._resonator()])
+        InducedVoltageTime(None, self.profile, [self._resonator()],
+                           cache=cache)
+
+        # A new cache with the same directory loads the stored wake
+        cache = ImpedanceCache(self.cache_dir)
+        loaded = InducedVoltageTime(None, self.profile, [self._resonator()],
+                                    cache=cache)
+
+        self.assertEqual(cache.misses, 0)
+        self.assertEqual(cache.hits, 1)
+        np.testing.assert_array_equal(loaded.total_wake,
+                                      reference.total_wake)
+
+    def test_input_table(self):
+        cache = ImpedanceCache()
+        freq = np.linspace(0, 2e9, 100)
+        table = InputTable(freq, np.exp(-freq / 1e9), freq / 1e9)
+        cache.imped_calc(table, np.linspace(0, 1e9, 50))
+        reference = table.impedance
+
+        table = InputTable(freq, np.exp(-freq / 1e9), freq / 1e9)
+        cache.imped_calc(table, np.linspace(0, 1e9, 50))
+
+        self.assertEqual(cache.hits, 1)
+        np.testing.assert_array_equal(table.impedance, reference)
+        np.testing.assert_array_equal(table.Re_Z_array, reference.real)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,129 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unittest for impedances.music
+"""
+
+import unittest
+import numpy as np
+
+from blond.input_parameters.ring import Ring
+from blond.beam.beam import Beam, Proton
+from blond.impedances.music import Music
+from blond.utils import bmath as bm
+
+
+class TestMusicParallel(unittest.TestCase):
+
+    def setUp(self):
+
+        self.ring = Ring(2*np.pi*1100.009, 1/18.**2, 25.92e9, Proton(), 10)
+        self.n_macroparticles = 100000
+        self.resonator = [5e6, 2*np.pi*200e6, 100]
+
+    def _beams(self):
+        beams = []
+        for i in range(2):
+            beam = Beam(self.ring, self.n_macroparticles, 1e11)
+            np.random.seed(1)
+            beam.dt = np.random.normal(1e-9, 0.2e-9, self.n_macroparticles)
+            beam.dE = np.random.normal(0, 1e7, self.n_macroparticles)
+            beams.append(beam)
+        return beams
+
+    def _music(self, beam, parallel):
+        return Music(beam, self.resonator, self.n_macroparticles, 1e11,
+                     self.ring.t_rev[0], parallel=parallel)
+
+    def _check(self, serial, parallel):
+        np.testing.assert_array_equal(parallel.beam.dt, serial.beam.dt)
+        np.testing.assert_allclose(parallel.induced_voltage,
+                                   serial.induced_voltage, rtol=1e-9)
+        np.testing.assert_allclose(parallel.beam.dE, serial.beam.dE,
+                                   rtol=1e-9)
+        np.testing.assert_allclose(parallel.array_parameters,
+                                   serial.array_parameters, rtol=1e-9)
+
+    def test_single_turn(self):
+        beam_serial, beam_parallel = self._beams()
+        serial = self._music(beam_serial, False)
+        parallel = self._music(beam_parallel, True)
+
+        serial.track_cpp()
+        parallel.track_cpp()
+        self._check(serial, parallel)
+
+    def test_multi_turn(self):
+        beam_serial, beam_parallel = self._beams()
+        serial = self._music(beam_serial, False)
+        parallel = self._music(beam_parallel, True)
+
+        serial.track_cpp()
+        parallel.track_cpp()
+        for turn in range(3):
+            serial.track_cpp_multi_turn()
+            parallel.track_cpp_multi_turn()
+        self._check(serial, parallel)
+
+
+class TestMusicSort(unittest.TestCase):
+
+    def _check(self, dt, dE):
+        order = np.argsort(dt, kind='stable')
+        dt_sorted, dE_sorted = dt[order], dE[order]
+        bm.music_sort_particles(dt, dE)
+        np.testing.assert_array_equal(dt, dt_sorted)
+        np.testing.assert_array_equal(dE, dE_sorted)
+
+    def test_almost_sorted(self):
+        np.random.seed(2)
+        dt = np.sort(np.random.normal(1e-9, 0.2e-9, 10000))
+        dt += np.random.normal(0, 1e-12, 10000)
+        self._check(dt, np.random.normal(0, 1e7, 10000))
+
+    def test_unsorted(self):
+        np.random.seed(3)
+        self._check(np.random.uniform(0, 1e-9, 10000),
+                    np.random.normal(0, 1e7, 10000))
+
+    def test_single_particle_out_of_order(self):
+        dt = np.linspace(0, 1e-9, 1000)
+        dt[10] = 2e-9
+        dt[500] = -1e-9
+        self._check(dt, np.arange(1000, dtype=float))
+
+    def test_track_py(self):
+        ring = Ring(2*np.pi*1100.009, 1/18.**2, 25.92e9, Proton(), 10)
+        beams = []
+        for i in range(2):
+            beam = Beam(ring, 1000, 1e11)
+            np.random.seed(1)
+            beam.dt = np.random.normal(1e-9, 0.2e-9, 1000)
+            beam.dE = np.random.normal(0, 1e7, 1000)
+            beams.append(beam)
+        resonator = [5e6, 2*np.pi*200e6, 100]
+        music_py = Music(beams[0], resonator, 1000, 1e11, ring.t_rev[0])
+        music_cpp = Music(beams[1], resonator, 1000, 1e11, ring.t_rev[0])
+
+        music_py.track_py()
+        music_cpp.track_cpp()
+        for turn in range(2):
+            beams[0].dt += np.random.normal(0, 1e-12, 1000)
+            beams[1].dt[:] = beams[0].dt
+            music_py.track_py_multi_turn()
+            music_cpp.track_cpp_multi_turn()
+
+        np.testing.assert_array_equal(beams[0].dt, beams[1].dt)
+        np.testing.assert_allclose(beams[0].dE, beams[1].dE, rtol=1e-8)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
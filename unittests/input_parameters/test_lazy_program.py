@@ -0,0 +1,181 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unit-test for input_parameters.lazy_program.py
+"""
+
+import unittest
+import numpy as np
+
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.ring_options import RingOptions
+from blond.input_parameters.rf_parameters import RFStation
+from blond.input_parameters.rf_parameters_options import RFStationOptions
+from blond.input_parameters.lazy_program import LazyProgram, \
+    ConstantProgram, InterpolatedProgram, CumulativeProgram
+from blond.beam.beam import Beam, Proton
+from blond.beam.distributions import bigaussian
+from blond.trackers.tracker import RingAndRFTracker
+
+
+class TestLazyProgram(unittest.TestCase):
+
+    def test_constant(self):
+        program = ConstantProgram([[1.], [2.]], 11, window=4)
+        self.assertEqual(program.shape, (2, 11))
+        np.testing.assert_array_equal(program[:, 7], [1., 2.])
+        np.testing.assert_array_equal(np.array(program)[1], 2.*np.ones(11))
+        np.testing.assert_array_equal(program[1][3:5], [2., 2.])
+
+    def test_interpolated(self):
+        time = np.linspace(0, 1, 101)
+        program = InterpolatedProgram([[0., 1.]], [[1., 3.]], time, window=6)
+        np.testing.assert_allclose(np.array(program)[0], 1 + 2*time)
+        np.testing.assert_allclose(program[:, 50], [2.])
+
+    def test_ufunc(self):
+        program = ConstantProgram([[2.]], 11, window=4)
+        derived = np.sqrt(2*program + 5)
+        self.assertIsInstance(derived, LazyProgram)
+        np.testing.assert_array_equal(np.array(derived), 3*np.ones((1, 11)))
+
+    def test_cumulative(self):
+        time = np.linspace(0, 1, 101)
+        program = InterpolatedProgram([[0., 1.]], [[1., 3.]], time,
+                                      window=6)[0]
+        cumulative = CumulativeProgram(program)
+        np.testing.assert_array_equal(np.array(cumulative),
+                                      np.cumsum(np.array(program)))
+        self.assertEqual(cumulative[77], np.cumsum(np.array(program))[77])
+
+    def test_writes_kept(self):
+        program = ConstantProgram([[1.]], 20, window=5)
+        for turn in range(19):
+            program[:, turn+1] += program[:, turn]
+        np.testing.assert_array_equal(program[0, 19], 20.)
+        # Only the turns of the current window keep the written values
+        np.testing.assert_array_equal(np.array(program)[0, 16:],
+                                      np.arange(17, 21))
+        np.testing.assert_array_equal(np.array(program)[0, :16], 1.)
+
+    def test_window(self):
+        with self.assertRaises(RuntimeError):
+            ConstantProgram([[1.]], 20, window=1)
+
+    def test_slice_assignment(self):
+        program = ConstantProgram([[1.]], 20, window=5)
+        with self.assertRaises(RuntimeError):
+            program[:, 2:4] = 0
+
+
+class TestLazyRing(unittest.TestCase):
+
+    def setUp(self):
+        self.n_turns = 500
+        self.circumference = 2*np.pi*100
+        self.alpha = 1/4.4**2
+        self.ramp = (np.linspace(0, 0.02, 6),
+                     np.array([2e9, 2.1e9, 2.3e9, 2.5e9, 2.58e9, 2.6e9]))
+
+    def _rings(self, momentum, window=17, **kwargs):
+        eager = Ring(self.circumference, self.alpha, momentum, Proton(),
+                     self.n_turns, RingOptions=RingOptions(**kwargs))
+        lazy = Ring(self.circumference, self.alpha, momentum, Proton(),
+                    self.n_turns, RingOptions=RingOptions(lazy=True,
+                                                          window=window,
+                                                          **kwargs))
+        return eager, lazy
+
+    def _compare(self, eager, lazy):
+        for name in ['momentum', 'beta', 'gamma', 'energy', 'kin_energy',
+                     'delta_E', 't_rev', 'f_rev', 'omega_rev', 'cycle_time',
+                     'eta_0', 'eta_1', 'eta_2']:
+            self.assertIsInstance(getattr(lazy, name), LazyProgram)
+            np.testing.assert_array_equal(np.array(getattr(lazy, name)),
+                                          getattr(eager, name), err_msg=name)
+
+    def test_turn_by_turn(self):
+        # Programs passed turn by turn are kept as arrays
+        momentum = np.linspace(26e9, 27e9, self.n_turns+1)
+        eager, lazy = self._rings(momentum)
+        self.assertNotIsInstance(lazy.momentum, LazyProgram)
+        self.assertIsInstance(lazy.eta_0, LazyProgram)
+        np.testing.assert_array_equal(lazy.delta_E, eager.delta_E)
+        np.testing.assert_array_equal(np.array(lazy.eta_0), eager.eta_0)
+
+    def test_constant(self):
+        eager, lazy = self._rings(26e9)
+        self._compare(eager, lazy)
+
+    def test_ramp(self):
+        for interpolation in ['linear', 'cubic', 'akima', 'derivative']:
+            eager, lazy = self._rings(self.ramp, interpolation=interpolation,
+                                      flat_bottom=20, flat_top=30)
+            self.assertEqual(lazy.n_turns, eager.n_turns)
+            self._compare(eager, lazy)
+
+    def test_ramp_cut(self):
+        eager, lazy = self._rings(self.ramp, t_start=0.005, t_end=0.015)
+        self._compare(eager, lazy)
+
+    def test_sections(self):
+        momentum = [26e9, 26.5e9]
+        eager = Ring([self.circumference/2]*2, [self.alpha]*2, momentum,
+                     Proton(), self.n_turns, n_sections=2)
+        lazy = Ring([self.circumference/2]*2, [self.alpha]*2, momentum,
+                    Proton(), self.n_turns, n_sections=2,
+                    RingOptions=RingOptions(lazy=True, window=17))
+        self._compare(eager, lazy)
+
+
+class TestLazyRFStation(unittest.TestCase):
+
+    def setUp(self):
+        self.n_turns = 400
+        ramp = ([0, 0.01, 0.02], [2e9, 2.5e9, 2.6e9])
+        voltage = (([0, 0.02], [6e6, 8e6]), ([0, 0.02], [1e6, 0.5e6]))
+        self.ring = Ring(2*np.pi*100, 1/4.4**2, ramp, Proton(),
+                         self.n_turns)
+        self.rf = RFStation(self.ring, [8, 16], voltage, [np.pi, 0.],
+                            n_rf=2)
+        self.lazy_ring = Ring(2*np.pi*100, 1/4.4**2, ramp, Proton(),
+                              self.n_turns,
+                              RingOptions=RingOptions(lazy=True, window=7))
+        self.lazy_rf = RFStation(self.lazy_ring, [8, 16], voltage,
+                                 [np.pi, 0.], n_rf=2, RFStationOptions=
+                                 RFStationOptions(lazy=True, window=7))
+
+    def test_programs(self):
+        for name in ['voltage', 'harmonic', 'phi_rf_d', 'phi_rf', 'omega_rf',
+                     'omega_rf_d', 't_rf', 'phi_s', 'Q_s', 'omega_s0',
+                     'eta_0', 'delta_E']:
+            np.testing.assert_array_equal(
+                np.array(getattr(self.lazy_rf, name)),
+                getattr(self.rf, name), err_msg=name)
+
+    def test_tracking(self):
+        beams = []
+        for ring, rf in [(self.ring, self.rf),
+                         (self.lazy_ring, self.lazy_rf)]:
+            beam = Beam(ring, 1000, 1e10)
+            bigaussian(ring, rf, beam, 5e-9, seed=1)
+            tracker = RingAndRFTracker(rf, beam)
+            for turn in range(50):
+                tracker.track()
+            beams.append(beam)
+        np.testing.assert_array_equal(beams[0].dt, beams[1].dt)
+        np.testing.assert_array_equal(beams[0].dE, beams[1].dE)
+        np.testing.assert_array_equal(np.array(self.lazy_rf.phi_rf)[:, :52],
+                                      self.rf.phi_rf[:, :52])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -81,6 +81,37 @@ class test_preprocess(unittest.TestCase):
 
             RingOptions(sampling=0)
 
+    def test_ramp_solver_exception(self):
+        with self.assertRaisesRegex(
+            RuntimeError,
+            'ERROR: ramp_solver in PreprocessRamp not recognised. ' +
+            'Aborting...',
+                msg='No RuntimeError for wrong ramp_solver!'):
+
+            RingOptions(ramp_solver='newton')
+
+    def test_ramp_solvers_identical(self):
+        mass = 938.272e6
+        circumference = 2*np.pi*100
+        time = np.linspace(0, 0.05, 8)
+        momentum = 2e9 + 1e9*np.sin(np.linspace(0, 1.5, 8))**2
+
+        for interpolation in ['linear', 'cubic', 'akima', 'derivative']:
+            for options in [{}, {'flat_bottom': 20, 'flat_top': 30},
+                            {'t_start': 0.01, 't_end': 0.04}]:
+                chunked = RingOptions(
+                    interpolation=interpolation, ramp_solver='chunked',
+                    **options).preprocess(mass, circumference, time,
+                                          momentum)
+                turn_by_turn = RingOptions(
+                    interpolation=interpolation, ramp_solver='turn_by_turn',
+                    **options).preprocess(mass, circumference, time,
+                                          momentum)
+                for result, reference in zip(chunked, turn_by_turn):
+                    np.testing.assert_array_equal(
+                        result, reference,
+                        err_msg=interpolation + str(options))
+
 
 if __name__ == '__main__':
 
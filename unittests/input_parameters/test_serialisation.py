@@ -0,0 +1,136 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unit-test for input_parameters.serialisation.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.ring_options import RingOptions
+from blond.input_parameters.rf_parameters import RFStation
+from blond.input_parameters.rf_parameters_options import RFStationOptions
+from blond.input_parameters.serialisation import content_hash
+from blond.beam.beam import Beam, Proton
+from blond.beam.distributions import bigaussian
+from blond.trackers.tracker import RingAndRFTracker
+
+
+class TestSerialisation(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ramp = (np.array([0, 0.005, 0.01, 0.015, 0.02]),
+                     np.array([2e9, 2.2e9, 2.5e9, 2.58e9, 2.6e9]))
+        self.voltage = (([0, 0.02], [6e6, 8e6]), ([0, 0.02], [1e6, 0.5e6]))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _ring(self, **kwargs):
+        return Ring(2*np.pi*100, 1/4.4**2, self.ramp, Proton(), 1,
+                    RingOptions=RingOptions(flat_bottom=10, **kwargs))
+
+    def _rf(self, ring, **kwargs):
+        return RFStation(ring, [8, 16], self.voltage, [np.pi, 0.], n_rf=2,
+                         RFStationOptions=RFStationOptions(**kwargs))
+
+    def _assert_same(self, loaded, reference):
+        self.assertIs(type(loaded), type(reference))
+        self.assertEqual(sorted(vars(loaded)), sorted(vars(reference)))
+        for name, value in vars(reference).items():
+            if isinstance(value, (np.ndarray, float, int)):
+                np.testing.assert_array_equal(getattr(loaded, name), value,
+                                              err_msg=name)
+        self.assertEqual(type(loaded.Particle), type(reference.Particle))
+        self.assertEqual(loaded.Particle.mass, reference.Particle.mass)
+
+    def test_save_load(self):
+        ring = self._ring(interpolation='cubic')
+        rf = self._rf(ring)
+        for name in ['data.npz', 'data.h5', 'data']:
+            filename = os.path.join(self.directory, 'ring_' + name)
+            ring.save(filename)
+            loaded = Ring.load(filename)
+            self._assert_same(loaded, ring)
+            self.assertEqual(vars(loaded.RingOptions),
+                             vars(ring.RingOptions))
+
+            filename = os.path.join(self.directory, 'rf_' + name)
+            rf.save(filename)
+            self._assert_same(RFStation.load(filename), rf)
+
+    def test_wrong_class(self):
+        filename = os.path.join(self.directory, 'ring.npz')
+        self._ring().save(filename)
+        with self.assertRaises(RuntimeError):
+            RFStation.load(filename)
+
+    def test_content_hash(self):
+        filename = os.path.join(self.directory, 'ring')
+        self._ring().save(filename)
+        momentum = np.load(os.path.join(filename, 'momentum.npy'))
+        momentum[0, 3] *= 1.001
+        np.save(os.path.join(filename, 'momentum.npy'), momentum)
+        with self.assertRaises(RuntimeError):
+            Ring.load(filename)
+
+        self.assertEqual(content_hash(RingOptions(cache_dir='a')),
+                         content_hash(RingOptions(cache_dir='b')))
+        self.assertNotEqual(content_hash(RingOptions()),
+                            content_hash(RingOptions(flat_top=1)))
+
+    def test_cache(self):
+        ring = self._ring(cache_dir=self.directory)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        cached_ring = self._ring(cache_dir=self.directory)
+        self.assertIsInstance(cached_ring.momentum, np.memmap)
+        self._assert_same(cached_ring, ring)
+
+        rf = self._rf(ring, cache_dir=self.directory)
+        cached_rf = self._rf(cached_ring, cache_dir=self.directory)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self._assert_same(cached_rf, rf)
+
+        # Other inputs give another cache entry
+        self._ring(cache_dir=self.directory, flat_top=5)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+    def test_cached_tracking(self):
+        beams = []
+        for i in range(2):
+            ring = self._ring(cache_dir=self.directory)
+            rf = self._rf(ring, cache_dir=self.directory)
+            beam = Beam(ring, 1000, 1e10)
+            bigaussian(ring, rf, beam, 5e-9, seed=1)
+            tracker = RingAndRFTracker(rf, beam)
+            for turn in range(20):
+                tracker.track()
+            beams.append(beam)
+        np.testing.assert_array_equal(beams[0].dt, beams[1].dt)
+        np.testing.assert_array_equal(beams[0].dE, beams[1].dE)
+
+    def test_lazy_exception(self):
+        with self.assertRaises(RuntimeError):
+            RingOptions(lazy=True, cache_dir=self.directory)
+        with self.assertRaises(RuntimeError):
+            RFStationOptions(lazy=True, cache_dir=self.directory)
+        ring = self._ring(lazy=True)
+        with self.assertRaises(RuntimeError):
+            ring.save(os.path.join(self.directory, 'ring.npz'))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,112 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Bound the deviation of the single precision examples from double precision,
+comparing the test files generated by the __EXAMPLES main files.
+"""
+
+import unittest
+import os
+import subprocess
+import numpy as np
+
+this_directory = os.path.dirname(os.path.realpath(__file__)) + '/'
+main_files_dir = os.path.join(this_directory, '../../__EXAMPLES/main_files')
+out_dir = os.path.join(this_directory, '../../__EXAMPLES/output_files/')
+exec_args = ['python', '-c',
+             "import sys, runpy, matplotlib; matplotlib.use('Agg'); " +
+             "import blond.utils.bmath as bm; bm.use_precision(sys.argv[1]); " +
+             "runpy.run_path(sys.argv[2], run_name='__main__')"]
+
+
+class TestSinglePrecision(unittest.TestCase):
+
+    def _runExample(self, main_file, example, precision, timeout):
+        file = os.path.join(main_files_dir, main_file)
+        try:
+            ret = subprocess.call(exec_args + [precision, file],
+                                  timeout=timeout)
+            self.assertEqual(ret, 0)
+        except subprocess.TimeoutExpired as e:
+            raise unittest.SkipTest(
+                '[{}] Timed out (timeout={}s)'.format(example, e.timeout))
+
+        data = np.genfromtxt(os.path.join(out_dir, '{}_test_data.txt'.format(
+            example)), dtype=str, delimiter='\t')
+        if len(data) == 0:
+            raise unittest.SkipTest('[{}] {} precision test file empty'.format(
+                example, precision))
+        return data[0], np.array(data[1:], dtype=float)
+
+    def _testSingleClose(self, main_file, rtol=1e-4, timeout=300):
+        # The deviation of each column is bounded relatively to its maximum
+        example = main_file[:5]
+        header, data = self._runExample(main_file, example, 'double', timeout)
+        header_single, data_single = self._runExample(main_file, example,
+                                                      'single', timeout)
+
+        np.testing.assert_equal(header, header_single,
+                                err_msg='[{}] The headers of the test files disagree'.format(example))
+        self.assertEqual(data.shape, data_single.shape)
+
+        for h, x, x_single in zip(header, data.T, data_single.T):
+            np.testing.assert_allclose(x_single, x, rtol=0,
+                                       atol=rtol*np.max(np.abs(x)),
+                                       err_msg='[{}] Test failed in column {}'.format(example, h))
+
+    # Run before every test
+    def setUp(self):
+        pass
+
+    # Run after every test
+    def tearDown(self):
+        pass
+
+    def test_EX_01_Acceleration(self):
+        self._testSingleClose('EX_01_Acceleration.py')
+
+    def test_EX_02_Main_long_ps_booster(self):
+        self._testSingleClose('EX_02_Main_long_ps_booster.py')
+
+    def test_EX_03_RFnoise(self):
+        self._testSingleClose('EX_03_RFnoise.py')
+
+    def test_EX_04_Stationary_multistation(self):
+        self._testSingleClose('EX_04_Stationary_multistation.py')
+
+    def test_EX_05_Wake_impedance(self):
+        self._testSingleClose('EX_05_Wake_impedance.py')
+
+    def test_EX_07_Ions(self):
+        # The particles close to the separatrix are lost or not depending on
+        # the rounding
+        self._testSingleClose('EX_07_Ions.py', rtol=5e-3)
+
+    def test_EX_08_Phase_Loop(self):
+        self._testSingleClose('EX_08_Phase_Loop.py')
+
+    def test_EX_09_Radial_Loop(self):
+        self._testSingleClose('EX_09_Radial_Loop.py')
+
+    def test_EX_10_Fixed_frequency(self):
+        self._testSingleClose('EX_10_Fixed_frequency.py')
+
+    def test_EX_16_impedance_test(self):
+        self._testSingleClose('EX_16_impedance_test.py')
+
+    def test_EX_18_robinson_instability(self):
+        # The instability amplifies the rounding differences
+        self._testSingleClose('EX_18_robinson_instability.py', rtol=5e-3,
+                              timeout=600)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,236 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unittest for monitors.monitors
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import gc
+import weakref
+import h5py as hp
+import numpy as np
+
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.rf_parameters import RFStation
+from blond.beam.beam import Beam, Proton
+from blond.beam.distributions import bigaussian
+from blond.beam.profile import Profile, CutOptions, FitOptions
+from blond.trackers.tracker import RingAndRFTracker
+from blond.monitors.monitors import BunchMonitor, MultiBunchMonitor, \
+    AsyncWriter, PhaseSpaceMonitor, PhaseSpaceReader
+
+
+class TestAsyncMonitors(unittest.TestCase):
+
+    def setUp(self):
+
+        self.n_turns = 25
+        self.ring = Ring(2*np.pi*1100.009, 1/18.**2, 25.92e9, Proton(),
+                         self.n_turns)
+        self.rf = RFStation(self.ring, [4620], [6e6], [0])
+        self.beam = Beam(self.ring, 10000, 1e9)
+        np.random.seed(5)
+        bigaussian(self.ring, self.rf, self.beam, 0.4e-9, seed=5)
+        self.profile = Profile(self.beam,
+            CutOptions=CutOptions(cut_left=0, cut_right=5e-9, n_slices=50),
+            FitOptions=FitOptions(fit_option='fwhm'))
+        self.profile.track()
+        # Not set by the single node Beam
+        self.beam.losses = 0
+        self.tracker = RingAndRFTracker(self.rf, self.beam)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _track(self, monitors):
+        dt, dE = self.beam.dt.copy(), self.beam.dE.copy()
+        for turn in range(self.n_turns):
+            self.tracker.track()
+            self.profile.track()
+            for monitor in monitors:
+                monitor.track(*([turn] if isinstance(monitor, MultiBunchMonitor)
+                               else []))
+        self.beam.dt[:], self.beam.dE[:] = dt, dE
+        self.rf.counter[0] = 0
+        self.profile.track()
+
+    def _compare(self, name_sync, name_async, group):
+        with hp.File(os.path.join(self.directory, name_sync + '.h5'),
+                     'r') as h5sync, \
+            hp.File(os.path.join(self.directory, name_async + '.h5'),
+                    'r') as h5async:
+            self.assertEqual(set(h5sync[group]), set(h5async[group]))
+            for name in h5sync[group]:
+                np.testing.assert_array_equal(h5async[group][name][()],
+                                              h5sync[group][name][()])
+
+    def test_bunch_monitor(self):
+        for name, asynchronous in [('sync', False), ('async', True)]:
+            monitor = BunchMonitor(self.ring, self.rf, self.beam,
+                                   os.path.join(self.directory, name),
+                                   buffer_time=5, Profile=self.profile,
+                                   asynchronous=asynchronous,
+                                   compression_opts=1, chunks=10)
+            self._track([monitor])
+            monitor.flush()
+        self._compare('sync', 'async', 'Beam')
+
+        with hp.File(os.path.join(self.directory, 'async.h5'), 'r') as h5:
+            self.assertEqual(h5['Beam']['mean_dt'].chunks, (10,))
+            self.assertEqual(h5['Beam']['mean_dt'].compression_opts, 1)
+
+    def test_multi_bunch_monitor(self):
+        for name, asynchronous in [('sync', False), ('async', True)]:
+            monitor = MultiBunchMonitor(os.path.join(self.directory, name),
+                                        self.n_turns, self.profile, self.rf,
+                                        1, buffer_size=4,
+                                        asynchronous=asynchronous)
+            self._track([monitor])
+            monitor.close()
+        self._compare('sync', 'async', 'default')
+
+    def test_writer_stopped(self):
+        for name in ['finished', 'closed']:
+            monitor = BunchMonitor(self.ring, self.rf, self.beam,
+                                   os.path.join(self.directory, name),
+                                   buffer_time=5, asynchronous=True)
+            thread = monitor.writer.thread
+            writer = weakref.ref(monitor.writer)
+            if name == 'finished':
+                self._track([monitor])
+                self.assertFalse(thread.is_alive())
+            else:
+                monitor.track()
+                self.assertTrue(thread.is_alive())
+            monitor.close()
+            self.assertFalse(thread.is_alive())
+            del monitor
+            gc.collect()
+            self.assertIsNone(writer())
+
+    def test_writer_error(self):
+        def fail():
+            raise ValueError('write failed')
+        writer = AsyncWriter()
+        writer.submit(fail)
+        with self.assertRaises(ValueError):
+            writer.flush()
+        writer.close()
+
+
+class TestPhaseSpaceMonitor(unittest.TestCase):
+
+    def setUp(self):
+
+        ring = Ring(2*np.pi*1100.009, 1/18.**2, 25.92e9, Proton(), 10)
+        self.beam = Beam(ring, 1001, 1e9)
+        np.random.seed(6)
+        self.beam.dt = np.random.normal(1e-9, 0.1e-9, 1001)
+        self.beam.dE = np.random.normal(0, 1e6, 1001)
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'phase_space')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _track(self, monitor, n_turns):
+        coordinates = []
+        for turn in range(n_turns):
+            monitor.track()
+            coordinates.append((self.beam.dt.copy(), self.beam.dE.copy()))
+            self.beam.dt += 1e-12
+            self.beam.dE += 1e3
+        return coordinates
+
+    def test_snapshots(self):
+        monitor = PhaseSpaceMonitor(self.filename, self.beam, save_every=3,
+                                    stride=10, dtype=np.float64)
+        coordinates = self._track(monitor, 10)
+        monitor.close()
+
+        reader = PhaseSpaceReader(self.filename)
+        self.assertEqual(len(reader), 4)
+        self.assertEqual(reader.n_particles, 101)
+        np.testing.assert_array_equal(reader.turns, [0, 3, 6, 9])
+        self.assertIsInstance(reader.snapshots, np.memmap)
+        for i, turn in enumerate(reader.turns):
+            np.testing.assert_array_equal(reader.dt(i),
+                                          coordinates[turn][0][::10])
+            np.testing.assert_array_equal(reader.dE(i),
+                                          coordinates[turn][1][::10])
+
+    def test_single_precision_and_refresh(self):
+        monitor = PhaseSpaceMonitor(self.filename, self.beam)
+        coordinates = self._track(monitor, 2)
+        monitor.flush()
+
+        reader = PhaseSpaceReader(self.filename + '.bin')
+        self.assertEqual(reader.dtype, np.float32)
+        self.assertEqual(len(reader), 2)
+
+        coordinates += self._track(monitor, 3)
+        monitor.close()
+        reader.refresh()
+        self.assertEqual(len(reader), 5)
+        np.testing.assert_array_equal(
+            reader.dE(4), coordinates[4][1].astype(np.float32))
+
+    def test_lost_particles_and_compaction(self):
+        ring = Ring(2*np.pi*1100.009, 1/18.**2, 25.92e9, Proton(), 10)
+        beam = Beam(ring, 1001, 1e9, compaction_threshold=0.1)
+        beam.dt[:] = self.beam.dt
+        beam.dE[:] = self.beam.dE
+        monitor = PhaseSpaceMonitor(self.filename, beam, stride=10,
+                                    dtype=np.float64)
+        coordinates = []
+        for cut in [None, 1.2e-9, 1e-9, None]:
+            # A few particles lost, then enough to compact the beam
+            if cut is not None:
+                beam.losses_longitudinal_cut(0, cut)
+            monitor.track()
+            coordinates.append((beam.id.copy(), beam.dt.copy(),
+                                beam.dE.copy()))
+            beam.dt += 1e-12
+        monitor.close()
+        self.assertEqual(len(coordinates[1][0]), 1001)
+        self.assertLess(len(coordinates[2][0]), 1001)
+
+        reader = PhaseSpaceReader(self.filename)
+        self.assertEqual(len(reader), 4)
+        ids = np.arange(1, 1002)[::10]
+        np.testing.assert_array_equal(reader.id(0), ids)
+        for i in range(1, 4):
+            alive = reader.id(i) != 0
+            self.assertTrue(0 < np.count_nonzero(alive) < len(ids))
+            np.testing.assert_array_equal(reader.id(i)[alive], ids[alive])
+            self.assertTrue(np.all(np.isnan(reader.dt(i)[~alive])))
+            self.assertTrue(np.all(np.isnan(reader.dE(i)[~alive])))
+            # The coordinates of the same particles
+            beam_id, dt, dE = coordinates[i]
+            position = dict((particle, j) for j, particle
+                            in enumerate(beam_id) if particle != 0)
+            index = [position[particle] for particle in ids[alive]]
+            np.testing.assert_array_equal(reader.dt(i)[alive], dt[index])
+            np.testing.assert_array_equal(reader.dE(i)[alive], dE[index])
+
+    def test_wrong_file(self):
+        with open(self.filename + '.bin', 'wb') as f:
+            f.write(b'not a snapshot file')
+        with self.assertRaises(RuntimeError):
+            PhaseSpaceReader(self.filename)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,126 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unittest for plots.plot_stream
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import matplotlib
+matplotlib.use('Agg')
+import h5py as hp
+import numpy as np
+
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.rf_parameters import RFStation
+from blond.beam.beam import Beam, Proton
+from blond.beam.distributions import bigaussian
+from blond.trackers.tracker import RingAndRFTracker
+from blond.monitors.monitors import BunchMonitor
+from blond.plots.plot import Plot
+from blond.plots.plot_stream import StreamSeries
+
+
+class TestStreamSeries(unittest.TestCase):
+
+    def test_all_points_kept(self):
+        series = StreamSeries(max_points=10)
+        for turn in range(10):
+            series.append(turn, 2. * turn)
+        self.assertEqual(series.stride, 1)
+        np.testing.assert_array_equal(series.turns, np.arange(10))
+        np.testing.assert_array_equal(series.values, 2. * np.arange(10))
+
+    def test_decimation(self):
+        series = StreamSeries(max_points=10)
+        for turn in range(1000):
+            series.append(turn, 2. * turn)
+        self.assertLessEqual(series.n_points, 10)
+        self.assertEqual(series.turns[0], 0)
+        np.testing.assert_array_equal(np.diff(series.turns), series.stride)
+        self.assertGreater(series.turns[-1], 1000 - 2 * series.stride)
+        np.testing.assert_array_equal(series.values, 2. * series.turns)
+
+    def test_rows(self):
+        series = StreamSeries(max_points=4)
+        for turn in range(9):
+            series.append(turn, [turn, -turn])
+        self.assertEqual(series.values.shape, (series.n_points, 2))
+        np.testing.assert_array_equal(series.values[:, 1], -series.turns)
+
+    def test_max_points(self):
+        with self.assertRaises(RuntimeError):
+            StreamSeries(max_points=1)
+
+
+class TestStreamPlot(unittest.TestCase):
+
+    def setUp(self):
+
+        self.n_turns = 40
+        self.ring = Ring(2*np.pi*1100.009, 1/18.**2, 25.92e9, Proton(),
+                         self.n_turns)
+        self.rf = RFStation(self.ring, [4620], [6e6], [0])
+        self.beam = Beam(self.ring, 1000, 1e9)
+        bigaussian(self.ring, self.rf, self.beam, 0.4e-9, seed=5)
+        # Not set by the single node Beam
+        self.beam.losses = 0
+        self.tracker = RingAndRFTracker(self.rf, self.beam)
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'bunch')
+        self.figures = os.path.join(self.directory, 'fig')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run(self, subprocess_renderer):
+        monitor = BunchMonitor(self.ring, self.rf, self.beam, self.filename,
+                               buffer_time=10)
+        plot = Plot(self.ring, self.rf, self.beam, self.n_turns, 20,
+                    -1e-9, 3e-9, -1e8, 1e8, BunchMonitor=monitor,
+                    max_points=16, subprocess_renderer=subprocess_renderer,
+                    format_options={'dirname': self.figures})
+        for turn in range(self.n_turns):
+            self.tracker.track()
+            monitor.track()
+            plot.track()
+        plot.close()
+        return plot
+
+    def test_stream_matches_monitor(self):
+        plot = self._run(False)
+        with hp.File(self.filename + '.h5', 'r') as h5file:
+            for name, series in plot.stream.items():
+                self.assertLessEqual(series.n_points, 16)
+                # The last turn stays in the monitor buffers
+                written = series.turns < self.n_turns
+                np.testing.assert_allclose(
+                    series.values[written],
+                    h5file['Beam'][name][()][series.turns[written]],
+                    rtol=1e-6)
+        for fign in ['bunch_length', 'bunch_mean_position',
+                     'bunch_mean_energy', 'bunch_transmitted_particles',
+                     'COM_evolution']:
+            self.assertTrue(os.path.isfile(
+                os.path.join(self.figures, fign + '.png')))
+
+    def test_subprocess_renderer(self):
+        self._run(True)
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.figures, 'bunch_length.png')))
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.figures, 'COM_evolution.png')))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -26,6 +26,8 @@ from blond.beam.beam import Beam, Proton
 from blond.beam.distributions import bigaussian
 from blond.beam.profile import CutOptions, FitOptions, Profile
 from blond.llrf.rf_modulation import PhaseModulation as PMod
+from blond.impedances.impedance import InducedVoltageFreq, TotalInducedVoltage
+from blond.impedances.impedance_sources import Resonators
 import os
 
 
@@ -250,6 +252,204 @@ class TestRfVoltageCalcWCavityFB(unittest.TestCase):
                 """Phi modulation not added correctly in tracker""")
 
 
+class TestFusedKickDriftSlice(unittest.TestCase):
+    # Simulation parameters -------------------------------------------------------
+    # Bunch parameters
+    N_b = 1e11           # Intensity
+    N_p = 50000         # Macro-particles
+    tau_0 = 0.4e-9          # Initial bunch length, 4 sigma [s]
+    # Machine and RF parameters
+    C = 26658.883        # Machine circumference [m]
+    p_i = 450e9         # Synchronous momentum [eV/c]
+    p_f = 460.005e9      # Synchronous momentum, final
+    h = 35640            # Harmonic number
+    V = 6e6                # RF voltage [V]
+    dphi = 0             # Phase modulation/offset
+    gamma_t = 55.759505  # Transition gamma
+    alpha = 1./gamma_t/gamma_t        # First order mom. comp. factor
+    # Tracking details
+    N_t = 2000           # Number of turns of the RF programme
+    N_track = 100        # Number of turns to track
+
+    def _setup(self, solver='simple', interpolation=False, impedance=False,
+               fused=False, outside=False, nan=False):
+        ring = Ring(self.C, self.alpha, np.linspace(
+            self.p_i, self.p_f, self.N_t + 1), Proton(), self.N_t)
+        beam = Beam(ring, self.N_p, self.N_b)
+        rf = RFStation(ring, [self.h], [self.V], [self.dphi])
+        bigaussian(ring, rf, beam, self.tau_0/4, reinsertion=True, seed=1)
+        if outside:
+            # Particles on both sides of the profile, far from the frame
+            beam.dt[:100] -= 1e-6
+            beam.dt[100:200] += 1e-6
+        if nan:
+            # Particles with NaN coordinates are not counted in the profile
+            # (nor in its first bin)
+            beam.dt[200:210] = np.nan
+        profile = Profile(beam, CutOptions(n_slices=100, cut_left=0,
+                                           cut_right=rf.t_rf[0, 0]))
+        profile.track()
+        total_induced = None
+        if impedance:
+            resonator = Resonators(5e6, 1.2e9, 10)
+            induced = InducedVoltageFreq(beam, profile, [resonator],
+                                         frequency_resolution=5e5)
+            total_induced = TotalInducedVoltage(beam, profile, [induced])
+        tracker = RingAndRFTracker(rf, beam, solver=solver,
+                                   interpolation=interpolation,
+                                   Profile=profile,
+                                   TotalInducedVoltage=total_induced,
+                                   fused=fused)
+        if fused:
+            map_ = [tracker]
+        elif impedance and not interpolation:
+            map_ = [total_induced, tracker, profile]
+        elif impedance:
+            map_ = [tracker, profile]
+            total_induced.induced_voltage_sum()
+        else:
+            map_ = [tracker, profile]
+        return beam, profile, tracker, total_induced, map_
+
+    def _compare(self, **kwargs):
+        beam, profile, tracker, total_induced, map_ = self._setup(**kwargs)
+        beam_f, profile_f, tracker_f, _, map_f = \
+            self._setup(fused=True, **kwargs)
+
+        for i in range(self.N_track):
+            for m in map_:
+                m.track()
+            if kwargs.get('interpolation') and kwargs.get('impedance'):
+                total_induced.induced_voltage_sum()
+            for m in map_f:
+                m.track()
+
+        # The energy of the particles with NaN coordinates is not compared
+        finite = np.isfinite(beam.dt)
+        np.testing.assert_array_equal(np.isfinite(beam_f.dt), finite)
+        np.testing.assert_allclose(beam_f.dt[finite], beam.dt[finite],
+                                   rtol=1e-8, atol=0)
+        np.testing.assert_allclose(beam_f.dE[finite], beam.dE[finite],
+                                   rtol=1e-6,
+                                   atol=1e-6*np.max(np.abs(beam.dE[finite])))
+        self.assertLessEqual(np.sum(np.abs(profile_f.n_macroparticles -
+                                           profile.n_macroparticles)), 2)
+        self.assertEqual(tracker_f.counter[0], tracker.counter[0])
+
+    def test_simple_solver(self):
+        self._compare(solver='simple')
+
+    def test_exact_solver(self):
+        self._compare(solver='exact')
+
+    def test_legacy_solver(self):
+        self._compare(solver='legacy')
+
+    def test_interpolation(self):
+        self._compare(interpolation=True)
+
+    def test_induced_voltage(self):
+        self._compare(impedance=True)
+
+    def test_interpolation_induced_voltage(self):
+        self._compare(interpolation=True, impedance=True)
+
+    def test_interpolation_outside_frame(self):
+        self._compare(interpolation=True, impedance=True, outside=True)
+
+    def test_interpolation_nan_coordinates(self):
+        self._compare(interpolation=True, impedance=True, nan=True)
+
+    def test_work_arrays_reused(self):
+        beam, profile, tracker, _, map_ = self._setup(interpolation=True,
+                                                      fused=True)
+        tracker.track()
+        kick_coefficients = tracker._kick_coefficients
+        sub_histograms = profile.histogram_workspace._sub_histograms
+        tracker.track()
+        self.assertIs(tracker._kick_coefficients, kick_coefficients)
+        self.assertIs(profile.histogram_workspace._sub_histograms,
+                      sub_histograms)
+
+    def test_fused_without_profile(self):
+        ring = Ring(self.C, self.alpha, self.p_i, Proton(), self.N_t)
+        beam = Beam(ring, self.N_p, self.N_b)
+        rf = RFStation(ring, [self.h], [self.V], [self.dphi])
+        with self.assertRaises(RuntimeError):
+            RingAndRFTracker(rf, beam, fused=True)
+
+
+class TestPeriodicity(unittest.TestCase):
+    # Machine and RF parameters
+    C = 26658.883        # Machine circumference [m]
+    p_i = 450e9          # Synchronous momentum [eV/c]
+    p_f = 450.05e9       # Synchronous momentum, final
+    h = 4                # Harmonic number
+    V = 2e6              # RF voltage [V]
+    gamma_t = 55.759505  # Transition gamma
+    alpha = 1./gamma_t/gamma_t        # First order mom. comp. factor
+    N_p = 10000          # Macro-particles
+    N_t = 50             # Number of turns
+
+    def _setup(self, solver):
+        ring = Ring(self.C, self.alpha, np.linspace(
+            self.p_i, self.p_f, self.N_t + 1), Proton(), self.N_t)
+        beam = Beam(ring, self.N_p, 1e11)
+        rf = RFStation(ring, [self.h], [self.V], [0])
+        np.random.seed(1)
+        # Coasting beam overlapping both edges of the frame
+        beam.dt = np.random.uniform(-0.1, 1.1, self.N_p) * ring.t_rev[0]
+        beam.dE = np.random.uniform(-1e9, 1e9, self.N_p)
+        tracker = RingAndRFTracker(rf, beam, solver=solver, periodicity=True)
+        return beam, tracker
+
+    def _kick_drift(self, tracker, beam, indices, turn):
+        if len(indices) > 0:
+            dt = np.ascontiguousarray(beam.dt[indices])
+            dE = np.ascontiguousarray(beam.dE[indices])
+            tracker.kick(dt, dE, turn)
+            tracker.drift(dt, dE, turn + 1)
+            beam.dt[indices] = dt
+            beam.dE[indices] = dE
+
+    def _reference_track(self, tracker, beam):
+        # Periodic kick and drift through np.where gather/scatter
+        turn = tracker.counter[0]
+        t_rev = tracker.t_rev[turn + 1]
+        right = np.where(beam.dt > t_rev)[0]
+        inside = np.where(beam.dt <= t_rev)[0]
+        beam.dt[right] -= t_rev
+        self._kick_drift(tracker, beam, inside, turn)
+        left = np.where(beam.dt < 0)[0]
+        beam.dt[left] += t_rev
+        self._kick_drift(tracker, beam, left, turn)
+        tracker.counter[0] += 1
+
+    def _compare(self, solver):
+        beam, tracker = self._setup(solver)
+        beam_ref, tracker_ref = self._setup(solver)
+
+        for i in range(self.N_t):
+            tracker.track()
+            self._reference_track(tracker_ref, beam_ref)
+
+        np.testing.assert_allclose(beam.dt, beam_ref.dt, rtol=1e-8,
+                                   atol=1e-8*np.max(np.abs(beam_ref.dt)))
+        np.testing.assert_allclose(beam.dE, beam_ref.dE, rtol=1e-8,
+                                   atol=1e-8*np.max(np.abs(beam_ref.dE)))
+        # All particles are back in the frame
+        self.assertGreaterEqual(np.min(beam.dt), 0)
+
+    def test_simple_solver(self):
+        self._compare('simple')
+
+    def test_legacy_solver(self):
+        self._compare('legacy')
+
+    def test_exact_solver(self):
+        self._compare('exact')
+
+
 if __name__ == '__main__':
 
     unittest.main()
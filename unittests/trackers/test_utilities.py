@@ -0,0 +1,101 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unittest for trackers.utilities.py
+"""
+
+import unittest
+import numpy as np
+
+from blond.trackers.utilities import action_integrals
+
+
+def orig_action_integrals(time_potential, potential_well, hamiltonian_levels,
+                          eom_factor_dE, n_points=int(1e5)):
+    """Integration of the dE trajectories level by level, with the potential
+    well interpolated with high resolution.
+
+    """
+
+    time_high_res = np.linspace(time_potential[0], time_potential[-1],
+                                n_points)
+    potential_high_res = np.interp(time_high_res, time_potential,
+                                   potential_well)
+    action = np.zeros(len(hamiltonian_levels))
+    for i, level in enumerate(hamiltonian_levels):
+        dE_trajectory = np.sqrt(np.maximum(level - potential_high_res, 0) /
+                                eom_factor_dE)
+        action[i] = 1 / np.pi * np.trapz(dE_trajectory,
+                                         dx=time_high_res[1]-time_high_res[0])
+
+    return action
+
+
+class TestActionIntegrals(unittest.TestCase):
+
+    # Run before every test
+    def setUp(self):
+        self.eom_factor_dE = 2.5e-16
+        self.time_potential = np.linspace(-1.25e-9, 1.25e-9, 1001)
+        self.omega_rf = 2 * np.pi * 400e6
+
+    # Run after every test
+    def tearDown(self):
+        pass
+
+    def test_harmonic_well(self):
+        # J(H) = H / (2 sqrt(k eom_factor_dE)) for U(t) = k t^2
+        k = 1e24
+        potential_well = k * self.time_potential**2
+        hamiltonian_levels = np.linspace(0, potential_well.max(), 200)
+
+        action = action_integrals(self.time_potential, potential_well,
+                                  hamiltonian_levels, self.eom_factor_dE)
+        action_analytic = hamiltonian_levels / \
+            (2 * np.sqrt(k * self.eom_factor_dE))
+
+        np.testing.assert_allclose(action, action_analytic, rtol=0,
+                                   atol=1e-5*action_analytic.max())
+
+    def test_rf_well(self):
+        # Double RF potential well, with several minima
+        phase = self.omega_rf * self.time_potential
+        potential_well = 1 - np.cos(phase) - 0.4 * (1 - np.cos(2 * phase))
+        potential_well -= potential_well.min()
+        hamiltonian_levels = potential_well[::7]
+
+        action = action_integrals(self.time_potential, potential_well,
+                                  hamiltonian_levels, self.eom_factor_dE)
+        action_orig = orig_action_integrals(
+            self.time_potential, potential_well, hamiltonian_levels,
+            self.eom_factor_dE)
+
+        np.testing.assert_allclose(action, action_orig, rtol=0,
+                                   atol=1e-5*action_orig.max())
+
+    def test_batches(self):
+        phase = self.omega_rf * self.time_potential
+        potential_well = 1 - np.cos(phase)
+        hamiltonian_levels = np.random.RandomState(1234).permutation(
+            potential_well)
+
+        action = action_integrals(self.time_potential, potential_well,
+                                  hamiltonian_levels, self.eom_factor_dE)
+        action_batches = action_integrals(
+            self.time_potential, potential_well, hamiltonian_levels,
+            self.eom_factor_dE, batch_size=5000)
+
+        np.testing.assert_allclose(action_batches, action, rtol=1e-12,
+                                   atol=0)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
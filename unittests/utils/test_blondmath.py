@@ -334,6 +334,40 @@ class TestStd(unittest.TestCase):
         np.testing.assert_almost_equal(bm.std(a), np.std(a), decimal=8)
 
 
+class TestBeamStatistics(unittest.TestCase):
+
+    # Run before every test
+    def setUp(self):
+        np.random.seed(2)
+        self.dt = 1e-6 + 1e-9*np.random.randn(1000)
+        self.dE = 1e6*np.random.randn(1000)
+        self.id = np.arange(1, 1001)
+        self.id[[0, 5, 17, 999]] = 0
+    # Run after every test
+
+    def tearDown(self):
+        pass
+
+    def _reference(self, x):
+        x = x[self.id != 0]
+        return [np.mean(x), np.sum((x - np.mean(x))**2), np.min(x),
+                np.max(x)]
+
+    def test_beam_statistics_1(self):
+        stats = bm.beam_statistics(self.dt, self.dE, self.id)
+        self.assertEqual(stats[0], 996)
+        np.testing.assert_allclose(stats[1:5], self._reference(self.dt),
+                                   rtol=1e-10)
+        np.testing.assert_allclose(stats[5:], self._reference(self.dE),
+                                   rtol=1e-10)
+
+    def test_beam_statistics_2(self):
+        self.id[:] = 0
+        stats = bm.beam_statistics(self.dt, self.dE, self.id)
+        self.assertEqual(stats[0], 0)
+        self.assertTrue(np.all(np.isnan(stats[1:])))
+
+
 class TestSum(unittest.TestCase):
 
     # Run before every test
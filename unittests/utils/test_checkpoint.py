@@ -0,0 +1,186 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unittest for utils.checkpoint, comparing a simulation restarted from a
+checkpoint to the uninterrupted one
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.rf_parameters import RFStation
+from blond.beam.beam import Beam, Proton
+from blond.beam.distributions import bigaussian
+from blond.beam.profile import Profile, CutOptions
+from blond.impedances.impedance import InducedVoltageFreq, TotalInducedVoltage
+from blond.impedances.impedance_sources import Resonators
+from blond.llrf.beam_feedback import BeamFeedback
+from blond.trackers.tracker import RingAndRFTracker
+from blond.utils.checkpoint import Checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    n_turns = 40
+
+    # Run before every test
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'checkpoint.npz')
+
+    # Run after every test
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _simulation(self):
+        # Phase loop, multi-turn wake and random kicks, all with a state
+        # carried over the turns
+        ring = Ring(6911.56, 1/17.95**2, 25.92e9, Proton(), self.n_turns)
+        rf = RFStation(ring, [4620], [4.5e6], [0.])
+        beam = Beam(ring, 10000, 1e11)
+        bigaussian(ring, rf, beam, 0.2e-9, seed=1234)
+        beam.dt += 0.1e-9
+        profile = Profile(beam, CutOptions(cut_left=0, cut_right=rf.t_rf[0, 0],
+                                           n_slices=100))
+        induced = InducedVoltageFreq(
+            beam, profile, [Resonators(5e6, 200e6, 10)], RFParams=rf,
+            frequency_resolution=1e6, multi_turn_wake=True, mtw_mode='time')
+        total_induced = TotalInducedVoltage(beam, profile, [induced])
+        phase_loop = BeamFeedback(ring, rf, profile,
+                                  {'machine': 'SPS_RL', 'PL_gain': 1000})
+        tracker = RingAndRFTracker(rf, beam, Profile=profile,
+                                   TotalInducedVoltage=total_induced,
+                                   BeamFeedback=phase_loop)
+        np.random.seed(1)
+
+        return [tracker, profile, total_induced]
+
+    def _track(self, track_map, turns, checkpoint=None):
+        tracker, profile, total_induced = track_map
+        for turn in turns:
+            profile.track()
+            total_induced.induced_voltage_sum()
+            tracker.track()
+            tracker.beam.dE += np.random.normal(0, 1e3,
+                                                tracker.beam.n_macroparticles)
+            if checkpoint is not None:
+                checkpoint.track()
+
+    def _compare(self, track_map, reference):
+        tracker, profile, total_induced = track_map
+        tracker_ref, profile_ref, total_induced_ref = reference
+        np.testing.assert_array_equal(tracker.beam.dt, tracker_ref.beam.dt)
+        np.testing.assert_array_equal(tracker.beam.dE, tracker_ref.beam.dE)
+        np.testing.assert_array_equal(tracker.rf_params.phi_rf,
+                                      tracker_ref.rf_params.phi_rf)
+        np.testing.assert_array_equal(tracker.rf_params.dphi_rf,
+                                      tracker_ref.rf_params.dphi_rf)
+        np.testing.assert_array_equal(
+            total_induced.induced_voltage_list[0].mtw_memory,
+            total_induced_ref.induced_voltage_list[0].mtw_memory)
+        self.assertEqual(tracker.beamFB.domega_rf,
+                         tracker_ref.beamFB.domega_rf)
+        self.assertEqual(tracker.counter, tracker_ref.counter)
+
+    def _test_restart(self, asynchronous):
+        reference = self._simulation()
+        self._track(reference, range(self.n_turns))
+
+        track_map = self._simulation()
+        checkpoint = Checkpoint(self.filename, track_map, every=10,
+                                asynchronous=asynchronous)
+        self._track(track_map, range(25), checkpoint)
+        checkpoint.close()
+
+        # Restart from the checkpoint of turn 20 with new objects
+        track_map = self._simulation()
+        checkpoint = Checkpoint(self.filename, track_map, every=10,
+                                asynchronous=asynchronous)
+        start = checkpoint.restore()
+        self.assertEqual(start, 20)
+        self._track(track_map, range(start, self.n_turns), checkpoint)
+        checkpoint.close()
+
+        self._compare(track_map, reference)
+
+    def test_restart(self):
+        self._test_restart(asynchronous=False)
+
+    def test_restart_asynchronous(self):
+        self._test_restart(asynchronous=True)
+
+    def test_shared_objects(self):
+        track_map = self._simulation()
+        checkpoint = Checkpoint(self.filename,
+                                [element.track for element in track_map],
+                                every=1, asynchronous=False)
+        self._track(track_map, range(3), checkpoint)
+
+        tracker, profile, total_induced = self._simulation()
+        beam, counter = tracker.beam, tracker.counter
+        checkpoint = Checkpoint(self.filename,
+                                [tracker.track, profile.track, total_induced],
+                                asynchronous=False)
+        self.assertEqual(checkpoint.restore(), 3)
+        self.assertIs(tracker.beam, beam)
+        self.assertIs(profile.Beam, beam)
+        self.assertIs(tracker.counter, counter)
+        self.assertIs(tracker.rf_params.counter, counter)
+        self.assertEqual(counter, [3])
+
+    def test_dropped_container(self):
+        # The list is not saved (it holds a function), the array it shares
+        # with the profile is saved with the profile
+        tracker, profile, total_induced = self._simulation()
+        array = np.arange(5.)
+        tracker.extra = [array, np.sum]
+        profile.extra = array
+        checkpoint = Checkpoint(self.filename, [tracker, profile],
+                                asynchronous=False)
+        checkpoint.save()
+
+        tracker, profile, total_induced = self._simulation()
+        tracker.extra = [np.zeros(5), np.sum]
+        profile.extra = np.zeros(5)
+        checkpoint = Checkpoint(self.filename, [tracker, profile],
+                                asynchronous=False)
+        checkpoint.restore()
+        np.testing.assert_array_equal(profile.extra, array)
+        np.testing.assert_array_equal(tracker.extra[0], np.zeros(5))
+
+    def test_inputs_not_saved(self):
+        track_map = self._simulation()
+        checkpoint = Checkpoint(self.filename, track_map, every=1,
+                                asynchronous=False)
+        self._track(track_map, range(2), checkpoint)
+
+        with np.load(self.filename) as npzfile:
+            names = npzfile.files
+        # The tracking state of the RFStation, but not its programs, nor
+        # their copies in the tracker, nor the impedance sources
+        self.assertEqual(sorted(name.split('.')[-1] for name in names
+                                if '.rf_params.' in name),
+                         ['dphi_rf', 'omega_rf', 'phi_rf'])
+        for name in ['dt', 'dE', 'mtw_memory']:
+            self.assertIn(name, [name.split('.')[-1] for name in names])
+        for name in ['voltage', 'harmonic', 'phi_s', 't_rev', 'eta_0',
+                     'omega_rf_d', 'phi_rf_d']:
+            self.assertNotIn('map.0.' + name, names)
+        self.assertFalse([name for name in names
+                          if name.endswith('.impedance')])
+
+
+if __name__ == '__main__':
+
+    unittest.main()
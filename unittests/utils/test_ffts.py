@@ -14,6 +14,8 @@ Unittest for utils.bmath
 """
 
 import unittest
+import os
+import tempfile
 import numpy as np
 # import inspect
 from numpy import fft
@@ -321,6 +323,38 @@ class TestFFTS(unittest.TestCase):
         except ZeroDivisionError as e:
             self.assertTrue(True, 'This testcase should raise a ZeroDivisionError')
 
+    def test_max_plans(self):
+        try:
+            bm.fftw_destroy_plans()
+            bm.fftw_set_max_plans(2)
+        except AttributeError as e:
+            self.skipTest('Not compiled with FFTW')
+
+        for n in [10, 20, 30, 20]:
+            s = np.random.randn(n)
+            np.testing.assert_almost_equal(bm.rfft(s), fft.rfft(s), 8)
+        self.assertEqual(bm.fftw_n_plans(), 2)
+
+        bm.fftw_set_max_plans(1)
+        self.assertEqual(bm.fftw_n_plans(), 1)
+        bm.fftw_set_max_plans(64)
+        bm.fftw_destroy_plans()
+
+    def test_wisdom(self):
+        wisdom_file = os.path.join(tempfile.mkdtemp(), 'wisdom.dat')
+        try:
+            bm.fftw_n_plans()
+        except AttributeError as e:
+            self.skipTest('Not compiled with FFTW')
+
+        self.assertFalse(bm.fftw_import_wisdom(wisdom_file))
+        s = np.random.randn(128)
+        bm.rfft(s)
+        bm.fftw_export_wisdom(wisdom_file)
+        self.assertTrue(os.path.isfile(wisdom_file))
+        self.assertTrue(bm.fftw_import_wisdom(wisdom_file))
+        os.remove(wisdom_file)
+
 if __name__ == '__main__':
 
     unittest.main()
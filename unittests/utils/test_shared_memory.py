@@ -0,0 +1,199 @@
+# coding: utf8
+# Copyright 2014-2017 CERN. This software is distributed under the
+# terms of the GNU General Public Licence version 3 (GPL Version 3),
+# copied verbatim in the file LICENCE.md.
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization or
+# submit itself to any jurisdiction.
+# Project website: http://blond.web.cern.ch/
+
+"""
+Unittest for utils.shm_config, comparing the tracking with the shared memory
+workers to the single process one
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+
+this_directory = os.path.dirname(os.path.realpath(__file__)) + '/'
+
+# Arguments: number of workers (0 for a single process), turn of the load
+# balancing (-1 for none), output file
+main_file = '''
+import sys
+import numpy as np
+import blond.utils.bmath as bm
+n_workers, balance_turn = int(sys.argv[1]), int(sys.argv[2])
+if n_workers > 0:
+    bm.use_shared_memory(n_workers)
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.rf_parameters import RFStation
+from blond.beam.beam import Beam, Proton
+from blond.beam.distributions import bigaussian
+from blond.beam.profile import Profile, CutOptions
+from blond.trackers.tracker import RingAndRFTracker
+
+
+def in_shared_segment(array):
+    while array is not None and not isinstance(array, np.memmap):
+        array = array.base
+    return array is not None
+
+
+ring = Ring(6911.56, 1/18**2, np.linspace(25.92e9, 26.0e9, 51), Proton(), 50)
+rf = RFStation(ring, [4620], [0.9e6], [0.], 1)
+beam = Beam(ring, 20001, 1e9)
+bigaussian(ring, rf, beam, 2e-9/4, seed=1)
+profile = Profile(beam, CutOptions(cut_left=0, cut_right=5e-9, n_slices=64))
+tracker = RingAndRFTracker(rf, beam, Profile=profile)
+
+if n_workers > 0:
+    beam.split()
+for turn in range(50):
+    tracker.track()
+    profile.track()
+    beam.losses_longitudinal_cut(0.2e-9, 4.8e-9)
+    if turn == balance_turn:
+        beam.balance(tolerance=-1)
+
+beam.statistics()
+shared = np.array([all(in_shared_segment(array)
+                       for array in [beam.dt, beam.dE, beam.id])])
+if n_workers > 0:
+    shared = bm.get_worker().allgather(shared)
+    beam.gather_statistics()
+    beam.gather_losses()
+    n_lost = beam.n_total_macroparticles_lost
+    beam.gather()
+else:
+    n_lost = beam.n_macroparticles_lost
+
+if n_workers == 0 or bm.get_worker().isMaster:
+    np.savez(sys.argv[3], profile=profile.n_macroparticles,
+             statistics=[beam.mean_dt, beam.sigma_dt, beam.mean_dE,
+                         beam.sigma_dE], n_lost=n_lost,
+             dt=beam.dt[beam.id != 0], id=beam.id[beam.id != 0],
+             shared=shared)
+if n_workers > 0:
+    bm.get_worker().finalize()
+'''
+
+# Arguments: output file; the beam is balanced unequally (speeds 7:3) before
+# slicing with an exact reduction every second slicing
+reduce_file = '''
+import sys
+import numpy as np
+import blond.utils.bmath as bm
+bm.use_shared_memory(2)
+from blond.input_parameters.ring import Ring
+from blond.input_parameters.rf_parameters import RFStation
+from blond.beam.beam import Beam, Proton
+from blond.beam.distributions import bigaussian
+from blond.beam.profile import Profile, CutOptions, OtherSlicesOptions
+
+ring = Ring(6911.56, 1/18**2, 25.92e9, Proton(), 10)
+rf = RFStation(ring, [4620], [0.9e6], [0.], 1)
+beam = Beam(ring, 100000, 1e9)
+bigaussian(ring, rf, beam, 2e-9/4, seed=1)
+profile = Profile(beam, CutOptions(cut_left=0, cut_right=5e-9, n_slices=64),
+                  OtherSlicesOptions=OtherSlicesOptions(reduce_every=2))
+worker = bm.get_worker()
+beam.split(random=True)
+beam.tracked_particles = [7, 3][worker.rank]
+beam.tracking_time = 1.
+beam.balance(tolerance=-1)
+
+profile.track()
+exact = np.array(profile.n_macroparticles)
+profile.track()
+scaled = np.array(profile.n_macroparticles)
+# The non-blocking reduction is done at once, its time is exposed
+worker.wait(worker.iallreduce(np.ones(4), name='iallreduce'))
+calls, overlapped, exposed = worker.comm_timing['iallreduce']
+results = worker.allgather(np.array([len(beam.dt), np.sum(exact),
+                                     np.sum(scaled), profile.reduce_error[0],
+                                     overlapped, exposed]))
+if worker.isMaster:
+    np.save(sys.argv[1], results.reshape(2, -1))
+worker.finalize()
+'''
+
+
+class TestSharedMemory(unittest.TestCase):
+
+    # Run before every test
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'main.py'), 'w') as file:
+            file.write(main_file)
+
+    # Run after every test
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run(self, n_workers, balance_turn=-1):
+        output = os.path.join(self.directory, 'output_{}_{}.npz'.format(
+            n_workers, balance_turn))
+        env = dict(os.environ, OMP_NUM_THREADS='1',
+                   PYTHONPATH=os.path.join(this_directory, '../..'))
+        ret = subprocess.call([sys.executable,
+                               os.path.join(self.directory, 'main.py'),
+                               str(n_workers), str(balance_turn), output],
+                              env=env, timeout=300)
+        self.assertEqual(ret, 0)
+        return np.load(output)
+
+    def test_tracking(self):
+        single = self._run(0)
+        for n_workers in [2, 3]:
+            shared = self._run(n_workers)
+            np.testing.assert_array_equal(shared['profile'],
+                                          single['profile'])
+            np.testing.assert_allclose(shared['statistics'],
+                                       single['statistics'], rtol=1e-10)
+            self.assertEqual(shared['n_lost'], single['n_lost'])
+            np.testing.assert_array_equal(shared['id'], single['id'])
+            np.testing.assert_array_equal(shared['dt'], single['dt'])
+            self.assertTrue(np.all(shared['shared']))
+
+    def test_reduce_every_after_balance(self):
+        # Each worker scales its histogram by its share of the particles
+        with open(os.path.join(self.directory, 'reduce.py'), 'w') as file:
+            file.write(reduce_file)
+        output = os.path.join(self.directory, 'reduce.npy')
+        env = dict(os.environ, OMP_NUM_THREADS='1',
+                   PYTHONPATH=os.path.join(this_directory, '../..'))
+        ret = subprocess.call([sys.executable,
+                               os.path.join(self.directory, 'reduce.py'),
+                               output], env=env, timeout=300)
+        self.assertEqual(ret, 0)
+        n_particles, exact, scaled, reduce_error, overlapped, exposed = \
+            np.load(output).T
+
+        np.testing.assert_array_equal(n_particles, [70000, 30000])
+        np.testing.assert_array_equal(exact, exact[0])
+        np.testing.assert_allclose(scaled, exact, rtol=0.02)
+        self.assertLess(np.max(reduce_error), 0.05)
+        np.testing.assert_array_equal(overlapped, 0.)
+        self.assertTrue(np.all(exposed > 0))
+
+    def test_balance(self):
+        # The lost particles are removed by the balancing, the alive ones
+        # keep their order
+        single = self._run(0)
+        shared = self._run(3, balance_turn=25)
+        self.assertEqual(shared['n_lost'], single['n_lost'])
+        np.testing.assert_array_equal(shared['id'], single['id'])
+        np.testing.assert_array_equal(shared['dt'], single['dt'])
+        # The migrated coordinates are still in shared segments
+        self.assertTrue(np.all(shared['shared']))
+
+
+if __name__ == '__main__':
+
+    unittest.main()